@@ -1,8 +1,17 @@
+import os
+import sys
 from clarifai.client.model import Model
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.tracing import init_tracing
+
+tracer = init_tracing("clarifai-api")
+
 prompt = "What's the future of AI?"
 
 model_url="https://clarifai.com/deepseek-ai/deepseek-chat/models/DeepSeek-R1-0528-Qwen3-8B"
-model_prediction = Model(url=model_url, pat="your_pat_key").predict_by_bytes(prompt.encode())
+model = Model(url=model_url, pat="your_pat_key")
+with tracer.span("predict_by_bytes", model=model_url):
+    model_prediction = model.predict_by_bytes(prompt.encode())
 
 print(model_prediction.outputs[0].data.text.raw)
\ No newline at end of file
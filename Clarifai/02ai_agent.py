@@ -1,19 +1,48 @@
 import os
-from crewai import Agent, Task, Crew, Process, LLM
+import sys
+import time
+import importlib
+import threading
 from datetime import datetime
 
-def setup_llm():
-    api_key = os.getenv("CLARIFAI_PAT")
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.tracing import get_tracer, init_tracing
+from report_store import format_report, format_result, get_report_store
+
+DEFAULT_MODEL = "openai/deepseek-ai/deepseek-chat/models/DeepSeek-R1-Distill-Qwen-7B"
+DEFAULT_BASE_URL = "https://api.clarifai.com/v2/ext/openai/v1"
+# Reports are reused for near-identical topics for this long
+RESEARCH_CACHE_TTL = 7 * 24 * 3600
+
+def setup_llm(base_url=None, model=None, api_key=None):
+    """
+    Builds the LLM used by the research agent.
+
+    crewai is imported by the functions that use it rather than at the top of
+    the module: it takes seconds to load and the archive commands don't need it.
+
+    The endpoint can be swapped for any OpenAI-compatible server (e.g. a local
+    stub for load tests) with the arguments or the RESEARCH_LLM_BASE_URL /
+    RESEARCH_LLM_MODEL environment variables.
+    """
+    base_url = base_url or os.getenv("RESEARCH_LLM_BASE_URL") or DEFAULT_BASE_URL
+    model = model or os.getenv("RESEARCH_LLM_MODEL") or DEFAULT_MODEL
+    api_key = api_key or os.getenv("CLARIFAI_PAT")
     if not api_key:
-        raise ValueError("Please set the environment variable CLARIFAI_PAT with your Clarifai API key.")
+        if base_url == DEFAULT_BASE_URL:
+            raise ValueError("Please set the environment variable CLARIFAI_PAT with your Clarifai API key.")
+        # Local OpenAI-compatible stubs don't check the key
+        api_key = "local-stub"
     
+    from crewai import LLM
     return LLM(
-        model="openai/deepseek-ai/deepseek-chat/models/DeepSeek-R1-Distill-Qwen-7B",
-        base_url="https://api.clarifai.com/v2/ext/openai/v1",
+        model=model,
+        base_url=base_url,
         api_key=api_key
     )
 
 def create_research_agent(llm):
+    from crewai import Agent
     return Agent(
         role="Senior Research Analyst",
         goal="Uncover cutting-edge developments and facts on a given topic",
@@ -26,6 +55,7 @@ def create_research_agent(llm):
     )
 
 def create_research_task(topic, agent):
+    from crewai import Task
     return Task(
         description=f"""Conduct a comprehensive analysis of '{topic}'.
         Identify key trends, breakthrough technologies, important figures, and potential industry impacts.
@@ -35,6 +65,7 @@ def create_research_task(topic, agent):
     )
 
 def run_research(topic, agent):
+    from crewai import Crew, Process
     task = create_research_task(topic, agent)
     crew = Crew(
         agents=[agent],
@@ -42,28 +73,101 @@ def run_research(topic, agent):
         process=Process.sequential,
         verbose=False
     )
-    return crew.kickoff()
+    tracer = get_tracer()
+    with tracer.span("kickoff"):
+        result = crew.kickoff()
+    # CrewOutput reports the LLM token usage of the whole run
+    usage = getattr(result, "token_usage", None)
+    if usage is not None:
+        tracer.count("tokens.prompt", getattr(usage, "prompt_tokens", 0) or 0)
+        tracer.count("tokens.output", getattr(usage, "completion_tokens", 0) or 0)
+    return result
+
+def save_report(topic, report, output_dir=None, model=None, duration=None):
+    """
+    Files the report in the research archive (see report_store.py) and returns
+    its id. Token counts are taken from the CrewOutput when `report` is one.
+    With `output_dir`, a research_report_<topic>_<timestamp>.txt copy is
+    written there too.
+    """
+    usage = getattr(report, "token_usage", None)
+    report_id = get_report_store().add(
+        topic,
+        str(report),
+        model=model,
+        duration=duration,
+        prompt_tokens=getattr(usage, "prompt_tokens", None),
+        output_tokens=getattr(usage, "completion_tokens", None)
+    )
+
+    if output_dir is not None:
+        safe_topic = "".join(c if c.isalnum() else "_" for c in topic).lower()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = os.path.join(output_dir, f"research_report_{safe_topic}_{timestamp}.txt")
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(f"Research Report on: {topic}\n")
+            f.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write("="*40 + "\n\n")
+            f.write(str(report))
 
-def save_report(topic, report):
-    safe_topic = "".join(c if c.isalnum() else "_" for c in topic).lower()
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"research_report_{safe_topic}_{timestamp}.txt"
+    return report_id
 
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(f"Research Report on: {topic}\n")
-        f.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("="*40 + "\n\n")
+def cached_research(topic, agent, fresh=False):
+    """
+    Returns (report, hit). A report on a near-identical topic (e.g. "quantum
+    computing" vs. "Quantum Computing trends") is reused and `hit` describes
+    it; otherwise the crew runs and its report (the CrewOutput, with token
+    usage) is returned and remembered. `fresh=True` always runs the crew.
+    """
+    result = None
 
-        # Convert result to string explicitly
-        f.write(str(report))
+    def research():
+        nonlocal result
+        result = run_research(topic, agent)
+        return str(result)
 
-    return filename
+    # Imported here: numpy would otherwise load before the first prompt
+    from common.semantic_cache import get_semantic_cache
+    cache = get_semantic_cache("research", ttl=RESEARCH_CACHE_TTL)
+    report, hit = cache.get_or_compute(topic, research, fresh=fresh)
+    return (result if result is not None else report), hit
+
+def archive_command(command):
+    """
+    Runs one archive command typed at the topic prompt: /search <words>,
+    /show <id> or /recent.
+    """
+    store = get_report_store()
+    name, _, argument = command[1:].partition(" ")
+    if name == "search" and argument.strip():
+        results = store.search(argument)
+        print("\n".join(format_result(result) for result in results) or "No matching reports.")
+    elif name == "show" and argument.strip().isdigit():
+        report = store.get(int(argument))
+        print(format_report(report) if report else f"No report #{argument.strip()}.")
+    elif name == "recent":
+        print("\n".join(format_result(result) for result in store.recent()) or "The archive is empty.")
+    else:
+        print("Archive commands: /search <words>, /show <id>, /recent")
+    print()
+
+def _preload(module):
+    # A missing package is reported when it is actually needed, not from this thread
+    try:
+        importlib.import_module(module)
+    except ImportError:
+        pass
 
 
 def main():
     print("=== Welcome to the Research Assistant ===\n")
-    llm = setup_llm()
-    researcher = create_research_agent(llm)
+    init_tracing("research-assistant")
+    # Load crewai and the topic cache (numpy) while the user types the first topic
+    threading.Thread(target=_preload, args=("crewai",), daemon=True).start()
+    threading.Thread(target=_preload, args=("common.semantic_cache",), daemon=True).start()
+    llm = researcher = None
+
+    print("Past reports: /search <words>, /show <id>, /recent\n")
 
     while True:
         topic = input("Enter a research topic (or 'exit' to quit): ").strip()
@@ -73,15 +177,34 @@ def main():
         if not topic:
             print("Please enter a valid topic.")
             continue
+        if topic.startswith("/"):
+            archive_command(topic)
+            continue
         
+        from common.semantic_cache import get_semantic_cache
+        hit = get_semantic_cache("research", ttl=RESEARCH_CACHE_TTL).lookup(topic)
+        if hit is not None:
+            found_at = datetime.fromtimestamp(hit.created_at).strftime('%Y-%m-%d %H:%M')
+            answer = input(f"Found a report on '{hit.text}' from {found_at} ({hit.similarity:.0%} similar). "
+                           "Use it? [Y/n] ").strip().lower()
+            if answer not in ["n", "no"]:
+                print(f"\n{hit.value}\n")
+                continue
+
+        if researcher is None:
+            llm = setup_llm()
+            researcher = create_research_agent(llm)
+
         print(f"\nResearching '{topic}'...\nThis may take a moment, please wait...\n")
         try:
-            result = run_research(topic, researcher)
+            start = time.perf_counter()
+            result, _ = cached_research(topic, researcher, fresh=True)
+            duration = time.perf_counter() - start
             print("Research Completed!\n")
             print(result)
             
-            filename = save_report(topic, result)
-            print(f"\nReport saved to: {filename}\n")
+            report_id = save_report(topic, result, model=llm.model, duration=duration)
+            print(f"\nReport saved to the archive as #{report_id} (/show {report_id})\n")
         except Exception as e:
             print(f"Oops! Something went wrong during the research: {e}\n")
 
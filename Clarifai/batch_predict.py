@@ -0,0 +1,318 @@
+"""
+Scores a large set of prompts against a Clarifai model, many inputs per request.
+
+    python batch_predict.py prompts.jsonl results.jsonl --batch-size 64 --in-flight 4
+    python batch_predict.py prompts.jsonl results.jsonl --fake   # local fake model, no API calls
+
+Input lines are {"id": ..., "prompt": ...} objects or bare JSON strings.
+Output lines come back in input order, as {"id": ..., "text": ...} or
+{"id": ..., "error": ...}.
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.core import map_bounded, run_sync
+from common.ratelimit import backoff_delay, is_retryable_error, status_code
+from common.tracing import get_tracer, init_tracing
+
+DEFAULT_MODEL_URL = "https://clarifai.com/deepseek-ai/deepseek-chat/models/DeepSeek-R1-0528-Qwen3-8B"
+
+# The API rejects predict calls with more inputs than this
+MAX_INPUTS_PER_CALL = 128
+# status_code_pb2.SUCCESS
+SUCCESS = 10000
+
+# Failures no input can fix (bad PAT, missing permission)
+FATAL_ERROR = re.compile(
+    r"unauthori[sz]ed|unauthenticated|permission ?denied|forbidden|invalid (?:api )?(?:key|pat|token)|"
+    r"key_invalid|insufficient scopes",
+    re.IGNORECASE
+)
+# Not-found errors about the model itself (wrong model URL), not about an input
+MODEL_NOT_FOUND = re.compile(
+    r"\b(?:model|app|user|workflow)(?: ['\"]?[\w./:-]+['\"]?)? (?:was )?(?:not ?found|does not exist)",
+    re.IGNORECASE
+)
+# Failures caused by something in the request's inputs
+INPUT_ERROR = re.compile(
+    r"\b(?:400|413|422)\b|invalid ?(?:argument|input|request)|bad ?request|malformed|input_invalid",
+    re.IGNORECASE
+)
+
+
+def load_model(model_url: str = DEFAULT_MODEL_URL, pat: str = None):
+    """One Clarifai client for the whole run; it keeps its gRPC channel open."""
+    from clarifai.client.model import Model
+
+    pat = pat or os.getenv("CLARIFAI_PAT")
+    if not pat:
+        raise ValueError("Please set the environment variable CLARIFAI_PAT with your Clarifai API key.")
+    return Model(url=model_url, pat=pat)
+
+def is_fatal_error(error: Exception) -> bool:
+    """
+    Authentication, permission and model-not-found errors: every request would
+    fail the same way. The status code decides when the error has one; a 404
+    only counts when it is about the model, not an input.
+    """
+    text = f"{type(error).__name__} {error}"
+    status = status_code(error)
+    if status in (401, 403):
+        return True
+    if status == 404:
+        return MODEL_NOT_FOUND.search(text) is not None
+    return FATAL_ERROR.search(text) is not None or MODEL_NOT_FOUND.search(text) is not None
+
+def is_input_error(error: Exception) -> bool:
+    """Errors that point at a bad input, worth splitting the batch to find it."""
+    if is_fatal_error(error):
+        return False
+    status = status_code(error)
+    if status is not None:
+        return status in (400, 413, 422)
+    return INPUT_ERROR.search(f"{type(error).__name__} {error}") is not None
+
+def text_input(input_id: str, prompt: str):
+    from clarifai.client.input import Inputs
+
+    return Inputs.get_input_from_bytes(input_id, text_bytes=prompt.encode("utf-8"))
+
+
+class FakeModel:
+    """
+    Local stand-in for `clarifai.client.model.Model` with the same `predict`
+    shape: fixed per-request latency plus a little per input, and the whole
+    request fails if any prompt contains `fail_marker` (like a real batch with
+    one bad input).
+    """
+
+    def __init__(self, latency: float = 0.2, per_input_latency: float = 0.002, fail_marker: str = "FAIL"):
+        self.latency = latency
+        self.per_input_latency = per_input_latency
+        self.fail_marker = fail_marker
+        self.calls = 0
+
+    @staticmethod
+    def build_input(input_id: str, prompt: str):
+        return SimpleNamespace(id=input_id, data=SimpleNamespace(text=SimpleNamespace(raw=prompt)))
+
+    def predict(self, inputs, inference_params=None):
+        if len(inputs) > MAX_INPUTS_PER_CALL:
+            raise ValueError(f"Too many inputs. Max is {MAX_INPUTS_PER_CALL}.")
+        self.calls += 1
+        time.sleep(self.latency + self.per_input_latency * len(inputs))
+        if any(self.fail_marker in item.data.text.raw for item in inputs):
+            raise RuntimeError("Model Predict failed: invalid input in batch")
+        outputs = [
+            SimpleNamespace(
+                input=SimpleNamespace(id=item.id),
+                status=SimpleNamespace(code=SUCCESS, description="Ok"),
+                data=SimpleNamespace(text=SimpleNamespace(raw=f"Answer to: {item.data.text.raw}"))
+            )
+            for item in inputs
+        ]
+        return SimpleNamespace(status=SimpleNamespace(code=SUCCESS), outputs=outputs)
+
+
+class BatchPredictor:
+    """
+    Packs prompts into requests of up to `batch_size` inputs and keeps
+    `in_flight` requests running at once, all through one model client.
+
+    A request that fails with a retryable error (rate limit, 5xx, timeout) is
+    retried with backoff. A failure caused by a bad input is split in half and
+    retried until the bad input is isolated, so one bad prompt costs only its
+    own result. An authentication, permission or model-not-found error stops the run:
+    no further requests are sent and `predict_iter` raises it once the results
+    before it are out. Results always come back in input order, one per prompt.
+    """
+
+    def __init__(
+        self,
+        model,
+        batch_size: int = MAX_INPUTS_PER_CALL,
+        in_flight: int = 4,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        build_input=None,
+        inference_params: dict = None
+    ):
+        self.model = model
+        self.batch_size = max(1, min(batch_size, MAX_INPUTS_PER_CALL))
+        self.in_flight = in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.build_input = build_input or getattr(model, "build_input", None) or text_input
+        self.inference_params = inference_params or {}
+        self.stats = {"inputs": 0, "requests": 0, "retries": 0, "splits": 0, "failed": 0, "seconds": 0.0}
+        self._stats_lock = threading.Lock()
+        self.fatal_error = None
+
+    def _count(self, name: str):
+        # Requests run in worker threads
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    # --- One request ---
+
+    def _request(self, batch) -> list:
+        """
+        Sends one predict call for `batch` [(index, id, prompt), ...] and
+        returns its results in batch order. Retries retryable errors only.
+        """
+        inputs = [self.build_input(f"in-{index}", prompt) for index, _, prompt in batch]
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._count("requests")
+                with get_tracer().span("clarifai.predict_batch", inputs=len(inputs)):
+                    response = self.model.predict(inputs, inference_params=self.inference_params)
+                break
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable_error(e):
+                    raise
+                self._count("retries")
+                time.sleep(backoff_delay(attempt, e, self.base_delay, self.max_delay))
+
+        outputs = {output.input.id: output for output in response.outputs}
+        results = []
+        for position, (index, item_id, _) in enumerate(batch):
+            output = outputs.get(f"in-{index}")
+            if output is None and position < len(response.outputs):
+                output = response.outputs[position] # no input ids echoed back: rely on order
+            if output is None:
+                results.append({"id": item_id, "error": "missing from the response"})
+            elif output.status.code != SUCCESS:
+                results.append({"id": item_id, "error": output.status.description or f"status {output.status.code}"})
+            else:
+                results.append({"id": item_id, "text": output.data.text.raw})
+        return results
+
+    def _predict_batch(self, batch) -> list:
+        if self.fatal_error is not None:
+            raise self.fatal_error
+        try:
+            return self._request(batch)
+        except Exception as e:
+            if is_fatal_error(e):
+                self.fatal_error = self.fatal_error or e
+                raise
+            if len(batch) == 1 or not is_input_error(e):
+                return [{"id": item_id, "error": str(e)} for _, item_id, _ in batch]
+            # Find the input that breaks the request instead of failing all of them
+            self._count("splits")
+            middle = len(batch) // 2
+            return self._predict_batch(batch[:middle]) + self._predict_batch(batch[middle:])
+
+    # --- Many requests ---
+
+    async def predict_iter(self, prompts):
+        """
+        Yields one result dict per prompt, in input order, as soon as every
+        earlier batch has finished. `prompts` holds strings or {"id", "prompt"}
+        dicts; string prompts get their position as id.
+        """
+        items = [
+            (index, prompt.get("id", index), prompt["prompt"]) if isinstance(prompt, dict) else (index, index, prompt)
+            for index, prompt in enumerate(prompts)
+        ]
+        batches = [items[start:start + self.batch_size] for start in range(0, len(items), self.batch_size)]
+
+        async def run(number):
+            return await asyncio.to_thread(self._predict_batch, batches[number])
+
+        start = time.perf_counter()
+        finished = {}
+        next_batch = 0
+        async for number, results, error in map_bounded(run, range(len(batches)), self.in_flight):
+            if error is not None:
+                # A fatal error is raised when its batch's turn comes
+                results = error if is_fatal_error(error) else [
+                    {"id": item_id, "error": str(error)} for _, item_id, _ in batches[number]
+                ]
+            finished[number] = results
+            while next_batch in finished:
+                results = finished.pop(next_batch)
+                if isinstance(results, Exception):
+                    self.stats["seconds"] += time.perf_counter() - start
+                    raise results
+                for result in results:
+                    self.stats["inputs"] += 1
+                    self.stats["failed"] += "error" in result
+                    yield result
+                next_batch += 1
+        self.stats["seconds"] += time.perf_counter() - start
+
+    def predict(self, prompts) -> list:
+        async def collect():
+            return [result async for result in self.predict_iter(prompts)]
+        return run_sync(collect())
+
+    def throughput(self) -> dict:
+        seconds = self.stats["seconds"]
+        requests = self.stats["requests"]
+        return {
+            **self.stats,
+            "inputs_per_second": self.stats["inputs"] / seconds if seconds else 0.0,
+            "inputs_per_request": self.stats["inputs"] / requests if requests else 0.0
+        }
+
+# --- CLI ---
+
+def read_prompts(path: str) -> list:
+    prompts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                prompts.append(json.loads(line))
+    return prompts
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a JSONL file of prompts with batched Clarifai predictions.")
+    parser.add_argument("input", help="JSONL file: one {\"id\", \"prompt\"} object or string per line")
+    parser.add_argument("output", help="JSONL file for the results, in input order")
+    parser.add_argument("--model-url", default=DEFAULT_MODEL_URL)
+    parser.add_argument("--batch-size", type=int, default=MAX_INPUTS_PER_CALL)
+    parser.add_argument("--in-flight", type=int, default=4, help="Requests running at once")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--fake", action="store_true", help="Use a local fake model instead of the API")
+    args = parser.parse_args()
+
+    init_tracing("clarifai-batch")
+    model = FakeModel() if args.fake else load_model(args.model_url)
+    predictor = BatchPredictor(model, batch_size=args.batch_size, in_flight=args.in_flight, max_retries=args.retries)
+    prompts = read_prompts(args.input)
+
+    print(f"Scoring {len(prompts)} prompts, {predictor.batch_size} per request, {args.in_flight} in flight...")
+
+    async def write_results():
+        with open(args.output, "w", encoding="utf-8") as f:
+            async for result in predictor.predict_iter(prompts):
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    try:
+        run_sync(write_results())
+    except Exception as e:
+        if not is_fatal_error(e):
+            raise
+        print(f"Stopped after {predictor.stats['inputs']} results: {e}")
+        sys.exit(1)
+    report = predictor.throughput()
+    print(
+        f"Done in {report['seconds']:.1f}s: {report['inputs_per_second']:.1f} inputs/s, "
+        f"{report['requests']} requests ({report['inputs_per_request']:.1f} inputs each), "
+        f"{report['retries']} retries, {report['splits']} splits, {report['failed']} failed"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Archive of research reports: one SQLite file with full-text search.
+
+    python report_store.py import .          # one-time import of research_report_*.txt files
+    python report_store.py search "error correction"
+    python report_store.py show 12
+
+Reports are stored zlib-compressed with their metadata (topic, model, duration,
+token counts); an FTS5 index over topic and text answers searches with BM25
+ranking, so lookups stay fast with hundreds of thousands of reports.
+"""
+import os
+import re
+import sys
+import time
+import zlib
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from collections import namedtuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.cache import DEFAULT_CACHE_DIR
+
+Report = namedtuple(
+    "Report", ["id", "topic", "created_at", "model", "duration", "prompt_tokens", "output_tokens", "text"]
+)
+SearchResult = namedtuple("SearchResult", ["id", "topic", "created_at", "model", "snippet"])
+
+REPORT_HEADER = re.compile(
+    r"^Research Report on: (?P<topic>.*)\n(?:Generated on: (?P<generated>[^\n]*)\n)?=+\n\n?", re.MULTILINE
+)
+
+
+def _fts_query(text: str) -> str:
+    """Turns free text into an FTS5 query matching all its words (no syntax errors on quotes or dashes)."""
+    words = re.findall(r"\w+", text, re.UNICODE)
+    return " ".join(f'"{word}"' for word in words)
+
+def _snippet(text: str, query: str, width: int = 160) -> str:
+    words = [word.lower() for word in re.findall(r"\w+", query)]
+    lowered = text.lower()
+    positions = [lowered.find(word) for word in words if lowered.find(word) >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    snippet = " ".join(text[start:start + width].split())
+    return ("..." if start else "") + snippet + ("..." if start + width < len(text) else "")
+
+
+class ReportStore:
+    """
+    Research reports in SQLite: compressed text and metadata in `reports`,
+    words in the contentless FTS5 table `reports_fts` (same rowid), so the
+    index doesn't keep a second, uncompressed copy of every report.
+
+    Saving a report whose text is already stored returns the existing id.
+    """
+
+    def __init__(self, path: str = None):
+        if path is None:
+            path = os.path.join(os.getenv("GENAI_CACHE_DIR", DEFAULT_CACHE_DIR), "research_reports.sqlite3")
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS reports (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    topic TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    model TEXT,
+                    duration REAL,
+                    prompt_tokens INTEGER,
+                    output_tokens INTEGER,
+                    size INTEGER NOT NULL,
+                    digest TEXT NOT NULL UNIQUE,
+                    source_file TEXT,
+                    body BLOB NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS reports_created ON reports (created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS reports_topic ON reports (topic COLLATE NOCASE, created_at)")
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(topic, body, content='', tokenize='porter unicode61')"
+            )
+
+    # --- Writing ---
+
+    def add(self, topic: str, text: str, model: str = None, duration: float = None, prompt_tokens: int = None,
+            output_tokens: int = None, created_at: float = None, source_file: str = None) -> int:
+        """Stores a report and returns its id."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(topic.encode("utf-8") + b"\0" + data).hexdigest()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT id FROM reports WHERE digest = ?", (digest,)).fetchone()
+            if row is not None:
+                return row[0]
+            report_id = self._conn.execute(
+                """INSERT INTO reports (topic, created_at, model, duration, prompt_tokens, output_tokens, size,
+                                        digest, source_file, body)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (topic, created_at or time.time(), model, duration, prompt_tokens, output_tokens, len(data),
+                 digest, source_file, zlib.compress(data, 6))
+            ).lastrowid
+            self._conn.execute("INSERT INTO reports_fts (rowid, topic, body) VALUES (?, ?, ?)", (report_id, topic, text))
+        return report_id
+
+    def import_text_reports(self, directory: str = ".") -> dict:
+        """
+        One-time import of `research_report_*.txt` files written by older
+        versions of `save_report`. Files already imported are skipped; the
+        files themselves are left in place.
+        """
+        counts = {"imported": 0, "skipped": 0}
+        for name in sorted(os.listdir(directory)):
+            if not (name.startswith("research_report_") and name.endswith(".txt")):
+                continue
+            path = os.path.join(directory, name)
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+            match = REPORT_HEADER.match(content)
+            topic = match.group("topic").strip() if match else name[len("research_report_"):-len(".txt")]
+            text = content[match.end():] if match else content
+            created_at = os.path.getmtime(path)
+            if match and match.group("generated"):
+                try:
+                    created_at = datetime.strptime(match.group("generated").strip(), "%Y-%m-%d %H:%M:%S").timestamp()
+                except ValueError:
+                    pass
+            before = self.count()
+            self.add(topic, text, created_at=created_at, source_file=os.path.abspath(path))
+            counts["imported" if self.count() > before else "skipped"] += 1
+        return counts
+
+    # --- Reading ---
+
+    def _report(self, row) -> Report:
+        report_id, topic, created_at, model, duration, prompt_tokens, output_tokens, body = row
+        return Report(report_id, topic, created_at, model, duration, prompt_tokens, output_tokens,
+                      zlib.decompress(body).decode("utf-8"))
+
+    def get(self, report_id: int):
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT id, topic, created_at, model, duration, prompt_tokens, output_tokens, body
+                   FROM reports WHERE id = ?""", (report_id,)
+            ).fetchone()
+        return self._report(row) if row else None
+
+    def latest_for_topic(self, topic: str):
+        """The newest report filed under exactly this topic (case-insensitive), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT id, topic, created_at, model, duration, prompt_tokens, output_tokens, body
+                   FROM reports WHERE topic = ? COLLATE NOCASE ORDER BY created_at DESC LIMIT 1""", (topic,)
+            ).fetchone()
+        return self._report(row) if row else None
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """
+        Best matches for `query` in topics and report text, by BM25 (topic
+        matches weigh more), as `SearchResult`s with a snippet.
+        """
+        match = _fts_query(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT r.id, r.topic, r.created_at, r.model, r.body
+                   FROM (SELECT rowid, bm25(reports_fts, 5.0, 1.0) AS score FROM reports_fts
+                         WHERE reports_fts MATCH ? ORDER BY score LIMIT ?) AS hits
+                   JOIN reports AS r ON r.id = hits.rowid
+                   ORDER BY hits.score""",
+                (match, limit)
+            ).fetchall()
+        return [
+            SearchResult(report_id, topic, created_at, model, _snippet(zlib.decompress(body).decode("utf-8"), query))
+            for report_id, topic, created_at, model, body in rows
+        ]
+
+    def recent(self, limit: int = 10) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, topic, created_at, model FROM reports ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [SearchResult(report_id, topic, created_at, model, "") for report_id, topic, created_at, model in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            reports, text_bytes, stored_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(body)), 0) FROM reports"
+            ).fetchone()
+        return {"reports": reports, "text_bytes": text_bytes, "stored_bytes": stored_bytes,
+                "compression_ratio": text_bytes / stored_bytes if stored_bytes else 0.0}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_report_store(path: str = None) -> ReportStore:
+    """
+    Returns the shared store for this path (the default archive when None).
+    """
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ReportStore(path)
+        return _stores[path]
+
+# --- CLI ---
+
+def format_result(result: SearchResult) -> str:
+    when = datetime.fromtimestamp(result.created_at).strftime("%Y-%m-%d %H:%M")
+    line = f"#{result.id:<6} {when}  {result.topic}"
+    return line + (f"\n        {result.snippet}" if result.snippet else "")
+
+def format_report(report: Report) -> str:
+    when = datetime.fromtimestamp(report.created_at).strftime("%Y-%m-%d %H:%M:%S")
+    details = [f"Generated on: {when}"]
+    if report.model:
+        details.append(f"Model: {report.model}")
+    if report.duration:
+        details.append(f"Took: {report.duration:.1f}s")
+    if report.prompt_tokens or report.output_tokens:
+        details.append(f"Tokens: {report.prompt_tokens or 0} in / {report.output_tokens or 0} out")
+    return f"Research Report on: {report.topic}\n" + "\n".join(details) + "\n" + "=" * 40 + "\n\n" + report.text
+
+def main():
+    parser = argparse.ArgumentParser(description="Search and manage the research report archive.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_command = commands.add_parser("import", help="Import research_report_*.txt files from a directory")
+    import_command.add_argument("directory", nargs="?", default=".")
+    search_command = commands.add_parser("search", help="Full-text search")
+    search_command.add_argument("query")
+    search_command.add_argument("--limit", type=int, default=10)
+    show_command = commands.add_parser("show", help="Print one report")
+    show_command.add_argument("id", type=int)
+    commands.add_parser("recent", help="List the newest reports")
+    commands.add_parser("stats", help="Archive size and compression")
+    args = parser.parse_args()
+
+    store = get_report_store()
+    if args.command == "import":
+        counts = store.import_text_reports(args.directory)
+        print(f"Imported {counts['imported']} reports ({counts['skipped']} already archived) into {store.path}")
+    elif args.command == "search":
+        results = store.search(args.query, args.limit)
+        print("\n".join(format_result(result) for result in results) or "No matching reports.")
+    elif args.command == "show":
+        report = store.get(args.id)
+        print(format_report(report) if report else f"No report #{args.id}.")
+    elif args.command == "recent":
+        print("\n".join(format_result(result) for result in store.recent()) or "The archive is empty.")
+    else:
+        stats = store.stats()
+        print(f"{stats['reports']} reports, {stats['text_bytes'] / 1e6:.2f} MB of text stored in "
+              f"{stats['stored_bytes'] / 1e6:.2f} MB ({stats['compression_ratio']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import importlib
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.ratelimit import backoff_delay, is_rate_limit_error
+from common.tracing import init_tracing
+from report_store import get_report_store
+
+# The agent script's name starts with a digit, so it can't be imported with `import`
+ai_agent = importlib.import_module("02ai_agent")
+
+
+def read_topics(path: str) -> list:
+    """
+    One topic per line; blank lines and lines starting with '#' are skipped.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+class ResearchRunner:
+    """
+    Runs many research topics concurrently.
+
+    Topics go through an asyncio queue worked by `concurrency` workers. Each
+    `Crew.kickoff()` runs in a thread (crewai is synchronous), failures are
+    retried with exponential backoff (longer, or the server's Retry-After, for
+    rate limits), and every report is saved the moment its topic finishes.
+
+    `research_fn(topic) -> report` defaults to a (semantically cached) crew on
+    the configured LLM; pass your own to load-test the runner without crewai.
+    A topic answered from the cache is not archived again: its result points
+    at the archived report it was served from.
+    """
+
+    def __init__(
+        self,
+        llm=None,
+        research_fn=None,
+        concurrency: int = 4,
+        max_retries: int = 3,
+        base_delay: float = 2.0,
+        max_delay: float = 60.0,
+        output_dir: str = None,
+        fresh: bool = False
+    ):
+        # The default returns (report, hit) from the semantic cache; custom ones just the report
+        self._returns_hit = research_fn is None
+        if research_fn is None:
+            llm = llm or ai_agent.setup_llm()
+            # A fresh agent per topic: crewai agents keep per-run state. Reports on
+            # near-identical topics come from the semantic cache unless `fresh`.
+            research_fn = lambda topic: ai_agent.cached_research(
+                topic, ai_agent.create_research_agent(llm), fresh=fresh
+            )
+        self.research_fn = research_fn
+        self.model = getattr(llm, "model", None)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.output_dir = output_dir
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    async def _research(self, topic: str) -> dict:
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                report = await asyncio.to_thread(self.research_fn, topic)
+                report, hit = report if self._returns_hit else (report, None)
+                seconds = round(time.perf_counter() - start, 2)
+                if hit is not None:
+                    # Served from the cache: point at the archived original instead of filing a copy
+                    original = await asyncio.to_thread(get_report_store().latest_for_topic, hit.text)
+                    return {"topic": topic, "report_id": original.id if original else None,
+                            "cached_from": hit.text, "attempts": attempt + 1, "seconds": seconds}
+                report_id = await asyncio.to_thread(
+                    ai_agent.save_report, topic, report, self.output_dir, model=self.model, duration=seconds
+                )
+                return {"topic": topic, "report_id": report_id, "attempts": attempt + 1, "seconds": seconds}
+            except Exception as e:
+                if attempt == self.max_retries:
+                    return {"topic": topic, "error": str(e), "attempts": attempt + 1,
+                            "seconds": round(time.perf_counter() - start, 2)}
+                delay = backoff_delay(attempt, e, self.base_delay, self.max_delay)
+                kind = "Rate limited" if is_rate_limit_error(e) else "Failed"
+                print(f"{kind} on '{topic}' (attempt {attempt + 1}), retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+
+    async def _worker(self, queue: asyncio.Queue, results: list, on_result):
+        while True:
+            topic = await queue.get()
+            try:
+                result = await self._research(topic)
+                results.append(result)
+                if on_result:
+                    on_result(result)
+            finally:
+                queue.task_done()
+
+    async def run(self, topics, on_result=None) -> list:
+        """
+        Researches every topic and returns one result dict per topic, in
+        completion order. `on_result` is called as each one finishes.
+        """
+        queue = asyncio.Queue()
+        for topic in topics:
+            queue.put_nowait(topic)
+        results = []
+        workers = [
+            asyncio.create_task(self._worker(queue, results, on_result))
+            for _ in range(min(self.concurrency, max(1, len(topics))))
+        ]
+        await queue.join()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        return results
+
+
+def print_result(result: dict):
+    if "error" in result:
+        print(f"[failed] {result['topic']} after {result['attempts']} attempts: {result['error']}")
+    elif "cached_from" in result:
+        original = f"report #{result['report_id']}" if result["report_id"] else "a cached report"
+        print(f"[cached] {result['topic']} -> {original} on '{result['cached_from']}'")
+    else:
+        print(f"[done]   {result['topic']} -> report #{result['report_id']} ({result['seconds']}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Research a file of topics concurrently.")
+    parser.add_argument("topics_file", help="Text file with one research topic per line")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--output-dir", default=None, help="Also write .txt copies of the reports here")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible endpoint (e.g. a local stub)")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--fresh", action="store_true", help="Research every topic anew, ignoring cached reports")
+    args = parser.parse_args()
+
+    init_tracing("research-runner")
+    topics = read_topics(args.topics_file)
+    llm = ai_agent.setup_llm(base_url=args.base_url, model=args.model)
+    runner = ResearchRunner(
+        llm=llm,
+        concurrency=args.concurrency,
+        max_retries=args.retries,
+        output_dir=args.output_dir,
+        fresh=args.fresh
+    )
+
+    print(f"Researching {len(topics)} topics with concurrency {args.concurrency}...\n")
+    start = time.perf_counter()
+    results = asyncio.run(runner.run(topics, on_result=print_result))
+    failed = [r["topic"] for r in results if "error" in r]
+
+    print(f"\nFinished {len(results) - len(failed)}/{len(topics)} topics in {time.perf_counter() - start:.1f}s")
+    if failed:
+        failed_path = os.path.join(args.output_dir or "", "failed_topics.txt")
+        with open(failed_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(failed) + "\n")
+        print(f"Failed topics written to {failed_path} (pass it back in to retry them)")
+
+
+if __name__ == "__main__":
+    main()
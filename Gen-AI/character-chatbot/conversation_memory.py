@@ -0,0 +1,203 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.models import DEFAULT_MODEL, get_model
+from common.ratelimit import get_scheduler
+from common.tracing import get_tracer
+
+# Rough size of a token for English text. Only used to stay under the budget
+# locally; the real prompt size comes back from Gemini in `usage_metadata`.
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = """You keep the running memory of a role-play conversation between a user and a character.
+Update the summary below with the new exchanges. Keep names, facts the user shared, open questions
+and the overall mood. Write it in the third person, in at most {max_words} words.
+
+Current summary:
+{summary}
+
+New exchanges:
+{exchanges}
+
+Updated summary:"""
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+class ConversationMemory:
+    """
+    Drop-in replacement for a Gemini `ChatSession` that keeps the prompt under a
+    token budget.
+
+    Every request is made of:
+      * the persona, sent as the model's system instruction,
+      * a rolling summary of older turns,
+      * the last `keep_last_turns` to 2 x `keep_last_turns` turns verbatim,
+      * the new user message.
+
+    Once the verbatim window reaches twice `keep_last_turns`, its older half is
+    folded into the summary with one extra (small) model call, so the summarizer
+    runs every `keep_last_turns` turns rather than on every turn. That call runs
+    on a background thread after the reply has been returned; the next message
+    waits for it only if it is still running. `persona` is
+    the model's system instruction, used to estimate the prompt size. Per-turn
+    prompt sizes are kept in `turn_stats`.
+    """
+
+    def __init__(self, model, summary_model=None, token_budget: int = 4000, keep_last_turns: int = 6,
+                 persona: str = ""):
+        self.model = model
+        self.summary_model = summary_model
+        self.token_budget = token_budget
+        self.keep_last_turns = keep_last_turns
+        self.summary = ""
+        self.turns = [] # (user_text, model_text) pairs kept verbatim
+        self.turn_stats = []
+        self._persona_tokens = estimate_tokens(persona)
+        self._full_history_tokens = 0 # what resending everything would cost
+        self._lock = threading.Lock()
+        self._compaction = None # background summarizer thread
+
+    def restore(self, summary: str, turns):
+        """
+        Picks up a saved conversation: the rolling summary plus the turns that
+        were still kept verbatim, as (user_text, model_text) pairs.
+        """
+        self.summary = summary or ""
+        self.turns = list(turns)
+        self._full_history_tokens = estimate_tokens(self.summary) + sum(
+            estimate_tokens(user_text) + estimate_tokens(model_text) for user_text, model_text in self.turns
+        )
+
+    # --- Prompt building ---
+
+    def build_contents(self, user_input: str) -> list:
+        contents = []
+        if self.summary:
+            contents.append({"role": "user", "parts": [f"(Summary of our conversation so far: {self.summary})"]})
+            contents.append({"role": "model", "parts": ["Understood, I remember."]})
+        for user_text, model_text in self.turns:
+            contents.append({"role": "user", "parts": [user_text]})
+            contents.append({"role": "model", "parts": [model_text]})
+        contents.append({"role": "user", "parts": [user_input]})
+        return contents
+
+    def estimated_prompt_tokens(self, user_input: str = "") -> int:
+        tokens = self._persona_tokens + estimate_tokens(self.summary) + estimate_tokens(user_input)
+        for user_text, model_text in self.turns:
+            tokens += estimate_tokens(user_text) + estimate_tokens(model_text)
+        return tokens
+
+    def state(self) -> tuple:
+        """(summary, number of verbatim turns), consistent even while a compaction runs."""
+        with self._lock:
+            return self.summary, len(self.turns)
+
+    # --- ChatSession-compatible API ---
+
+    def send_message(self, user_input: str, stream: bool = False):
+        """
+        Same call shape as `ChatSession.send_message`. With `stream=True` this
+        returns a generator of chunks; the turn is recorded once it is exhausted.
+        """
+        self.wait_for_compaction()
+        contents = self.build_contents(user_input)
+        stats = {
+            "prompt_tokens_estimate": self.estimated_prompt_tokens(user_input),
+            "full_history_tokens_estimate": self._persona_tokens + self._full_history_tokens + estimate_tokens(user_input),
+            "verbatim_turns": len(self.turns),
+            "summarized": bool(self.summary)
+        }
+        if stream:
+            return self._stream(user_input, contents, stats)
+        response = get_scheduler().call(self.model.generate_content, contents)
+        self._record(user_input, response.text, response, stats)
+        return response
+
+    def _stream(self, user_input, contents, stats):
+        reply = ""
+        last_chunk = None
+        for chunk in get_scheduler().call(self.model.generate_content, contents, stream=True):
+            reply += chunk.text
+            last_chunk = chunk
+            yield chunk
+        self._record(user_input, reply, last_chunk, stats)
+
+    def _record(self, user_input, reply, response, stats):
+        usage = getattr(response, "usage_metadata", None)
+        stats["prompt_tokens"] = getattr(usage, "prompt_token_count", None) or None
+        # Persona tokens served from the server-side prompt cache, if any
+        stats["cached_tokens"] = getattr(usage, "cached_content_token_count", None) or 0
+        get_tracer().record_usage(response)
+        self.turn_stats.append(stats)
+        self.turns.append((user_input, reply))
+        self._full_history_tokens += estimate_tokens(user_input) + estimate_tokens(reply)
+        fold = self._fold_count()
+        if fold:
+            # The reply is already out; summarize without holding it up
+            self._compaction = threading.Thread(
+                target=self._compact, args=(fold,), name="memory-compaction", daemon=True
+            )
+            self._compaction.start()
+
+    # --- Summarization ---
+
+    def wait_for_compaction(self):
+        """Blocks until a running background compaction has finished."""
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+            self._compaction = None
+
+    def _fold_count(self) -> int:
+        """
+        How many of the oldest turns to fold into the summary: once the verbatim
+        window has grown to twice `keep_last_turns`, or earlier when the token
+        budget requires it (the newest turn is always kept). Either way at least
+        half the window is folded, so summarizer calls stay rare.
+        """
+        fold = len(self.turns) - self.keep_last_turns if len(self.turns) >= 2 * self.keep_last_turns else 0
+        while fold < len(self.turns) - 1 and self._estimate_after_fold(fold) > self.token_budget:
+            fold += 1
+        if fold == 0:
+            return 0
+        return min(len(self.turns) - 1, max(fold, len(self.turns) // 2))
+
+    def _compact(self, fold: int):
+        summary = self._summarize(self.turns[:fold])
+        with self._lock:
+            self.summary, self.turns = summary, self.turns[fold:]
+
+    def _estimate_after_fold(self, fold: int) -> int:
+        kept = self.turns[fold:]
+        tokens = self._persona_tokens + self._max_summary_tokens()
+        for user_text, model_text in kept:
+            tokens += estimate_tokens(user_text) + estimate_tokens(model_text)
+        return tokens
+
+    def _max_summary_tokens(self) -> int:
+        # Leave most of the budget for the verbatim turns
+        return max(50, self.token_budget // 5)
+
+    def _summarize(self, old_turns) -> str:
+        exchanges = "\n".join(f"User: {u}\nCharacter: {m}" for u, m in old_turns)
+        if self.summary_model is None:
+            self.summary_model = get_model(DEFAULT_MODEL)
+        prompt = SUMMARY_PROMPT.format(
+            max_words=int(self._max_summary_tokens() * 0.75),
+            summary=self.summary or "(none yet)",
+            exchanges=exchanges
+        )
+        try:
+            with get_tracer().span("summarize_history", turns=len(old_turns)):
+                response = get_scheduler().call(self.summary_model.generate_content, prompt)
+            get_tracer().record_usage(response)
+            return response.text.strip()
+        except Exception:
+            # Losing detail is better than losing the turn: keep a truncated transcript
+            limit = self._max_summary_tokens() * CHARS_PER_TOKEN
+            return (self.summary + "\n" + exchanges)[-limit:]
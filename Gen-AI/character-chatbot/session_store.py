@@ -0,0 +1,182 @@
+import os
+import sys
+import time
+import sqlite3
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.cache import DEFAULT_CACHE_DIR
+
+# Messages loaded at once; older ones are paged in on request
+PAGE_SIZE = 50
+
+
+class SessionStore:
+    """
+    Persistent chat history, keyed by (user, character).
+
+    Messages are append-only: every user message and every reply is one INSERT,
+    so a refresh or server restart loses nothing and no write ever rewrites the
+    transcript. Each conversation also keeps the conversation memory's state
+    (rolling summary + number of verbatim turns) so the model context can be
+    rebuilt without replaying the whole history.
+
+    Example:
+        store = SessionStore()
+        conversation_id = store.get_or_create_conversation("user-1", "Einstein")
+        store.append_message(conversation_id, "user", "Hello!")
+        page = store.load_messages(conversation_id)
+    """
+
+    def __init__(self, path: str = None):
+        if path is None:
+            path = os.path.join(os.getenv("GENAI_CACHE_DIR", DEFAULT_CACHE_DIR), "chat_sessions.sqlite3")
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Streamlit runs each session in its own thread, so share one connection behind a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS conversations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    character TEXT NOT NULL,
+                    started_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    memory_summary TEXT NOT NULL DEFAULT '',
+                    memory_turns INTEGER NOT NULL DEFAULT 0
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    conversation_id INTEGER NOT NULL REFERENCES conversations (id),
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS conversations_user ON conversations (user_id, character, updated_at)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS messages_conversation ON messages (conversation_id, id)")
+
+    # --- Conversations ---
+
+    def new_conversation(self, user_id: str, character: str) -> int:
+        now = time.time()
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "INSERT INTO conversations (user_id, character, started_at, updated_at) VALUES (?, ?, ?, ?)",
+                (user_id, character, now, now)
+            ).lastrowid
+
+    def get_or_create_conversation(self, user_id: str, character: str) -> int:
+        """
+        Returns the user's most recent conversation with this character,
+        starting one if there is none.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM conversations WHERE user_id = ? AND character = ? ORDER BY updated_at DESC LIMIT 1",
+                (user_id, character)
+            ).fetchone()
+        if row is not None:
+            return row[0]
+        return self.new_conversation(user_id, character)
+
+    def last_character(self, user_id: str):
+        """The character this user talked to most recently, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT character FROM conversations WHERE user_id = ? ORDER BY updated_at DESC LIMIT 1",
+                (user_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    # --- Messages ---
+
+    def append_message(self, conversation_id: int, role: str, content: str) -> int:
+        now = time.time()
+        with self._lock, self._conn:
+            message_id = self._conn.execute(
+                "INSERT INTO messages (conversation_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                (conversation_id, role, content, now)
+            ).lastrowid
+            self._conn.execute("UPDATE conversations SET updated_at = ? WHERE id = ?", (now, conversation_id))
+        return message_id
+
+    def load_messages(self, conversation_id: int, before_id: int = None, limit: int = PAGE_SIZE) -> list:
+        """
+        Returns up to `limit` messages older than `before_id` (the newest ones
+        when it is None), oldest first, as {"id", "role", "content"} dicts.
+        """
+        query = "SELECT id, role, content FROM messages WHERE conversation_id = ?"
+        params = [conversation_id]
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [{"id": id_, "role": role, "content": content} for id_, role, content in reversed(rows)]
+
+    def count_messages(self, conversation_id: int, before_id: int = None) -> int:
+        query = "SELECT COUNT(*) FROM messages WHERE conversation_id = ?"
+        params = [conversation_id]
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    # --- Conversation memory ---
+
+    def save_memory_state(self, conversation_id: int, summary: str, verbatim_turns: int):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE conversations SET memory_summary = ?, memory_turns = ? WHERE id = ?",
+                (summary, verbatim_turns, conversation_id)
+            )
+
+    def load_memory_state(self, conversation_id: int):
+        """
+        Returns (summary, [(user_text, reply), ...]) for the turns the memory
+        keeps verbatim, read from the tail of the transcript.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT memory_summary, memory_turns FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+        if row is None:
+            return "", []
+        summary, verbatim_turns = row
+        if not verbatim_turns:
+            return summary, []
+        # A turn is a user message followed by a reply; skip greetings and unanswered messages
+        turns = []
+        pending_user = None
+        for message in self.load_messages(conversation_id, limit=verbatim_turns * 2 + 2):
+            if message["role"] == "user":
+                pending_user = message["content"]
+            elif pending_user is not None:
+                turns.append((pending_user, message["content"]))
+                pending_user = None
+        return summary, turns[-verbatim_turns:]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(path: str = None) -> SessionStore:
+    """
+    Returns the shared store for this path (the default database when None).
+    """
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = SessionStore(path)
+        return _stores[path]
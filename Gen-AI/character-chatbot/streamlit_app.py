@@ -1,20 +1,41 @@
 import streamlit as st
 import os
+import sys
+import time
+import uuid
 from dotenv import load_dotenv
-import google.generativeai as genai
 import textwrap # For formatting output
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.models import DEFAULT_MODEL, configure, get_model, start_warm_up
+from common.prompt_cache import get_prefix_model
+from common.tracing import init_tracing, render_streamlit_panel
+from common.core import chat, run_sync
+from common.core.streamlit_adapter import stream_markdown
+from conversation_memory import ConversationMemory
+from session_store import get_store
+from transcript import TranscriptRenderer
+
 # --- Configuration ---
 # Load API key from environment variable
 load_dotenv()
 
 try:
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    configure(api_key=os.getenv("GEMINI_API_KEY"))
 except KeyError:
     st.error("Error: GOOGLE_API_KEY environment variable not set.")
     st.info("Please set it before running the app (e.g., in your terminal: export GOOGLE_API_KEY='YOUR_API_KEY' or set GOOGLE_API_KEY=...).")
     st.stop() # Stop the app if API key is not set
 
+tracer = init_tracing("character-chatbot")
+# Warm the Gemini client up in the background while the first page renders
+start_warm_up(DEFAULT_MODEL)
+
+# Conversation memory: keep the prompt under this many tokens by sending only the
+# last few turns verbatim and a rolling summary of everything older
+MEMORY_TOKEN_BUDGET = 4000
+MEMORY_VERBATIM_TURNS = 6
+
 # Define characters and their initial "system instructions"
 CHARACTERS = {
     "Einstein": {
@@ -36,6 +57,73 @@ CHARACTERS = {
     }
 }
 
+# --- Persistent Sessions ---
+
+@st.cache_resource(show_spinner=False)
+def load_store():
+    """
+    One session store (SQLite connection) per server process, shared by every session.
+    """
+    return get_store()
+
+def get_user_id() -> str:
+    """
+    There is no login, so each browser gets an id kept in the URL (?user=...),
+    which survives refreshes and server restarts.
+    """
+    user_id = st.query_params.get("user")
+    if not user_id:
+        user_id = uuid.uuid4().hex
+        st.query_params["user"] = user_id
+    return user_id
+
+def open_conversation(character: str, new: bool = False):
+    """
+    Resumes the user's latest conversation with `character` (or starts a new
+    one): the newest page of messages and the conversation memory are loaded
+    from the store; older messages are paged in on request.
+    """
+    store = load_store()
+    user_id = get_user_id()
+    if new:
+        conversation_id = store.new_conversation(user_id, character)
+    else:
+        conversation_id = store.get_or_create_conversation(user_id, character)
+
+    persona_prompt = CHARACTERS[character]["persona"]
+    chat_session = ConversationMemory(
+        # The persona is uploaded once as cached content and shared by every session
+        get_prefix_model(DEFAULT_MODEL, persona_prompt),
+        summary_model=get_model(DEFAULT_MODEL),
+        token_budget=MEMORY_TOKEN_BUDGET,
+        keep_last_turns=MEMORY_VERBATIM_TURNS,
+        persona=persona_prompt
+    )
+    chat_session.restore(*store.load_memory_state(conversation_id))
+
+    messages = store.load_messages(conversation_id)
+    if not messages:
+        # Add initial greeting from character
+        store.append_message(conversation_id, "assistant", CHARACTERS[character]["start_chat"])
+        messages = store.load_messages(conversation_id)
+
+    st.session_state.current_character = character
+    st.session_state.conversation_id = conversation_id
+    st.session_state.chat_session = chat_session
+    st.session_state.messages = messages
+
+# --- Response Streaming ---
+
+def stream_reply(chat_session, user_input, placeholder):
+    """
+    Sends a message with streaming and renders each chunk into `placeholder`
+    as soon as it arrives.
+
+    Returns:
+        tuple: (full reply text, seconds to first token, total seconds)
+    """
+    return stream_markdown(placeholder, chat.stream_chat_turn(chat_session, user_input))
+
 # --- Streamlit App Layout and Logic ---
 
 st.set_page_config(page_title="Imaginary Character Chatbot", layout="centered")
@@ -50,6 +138,12 @@ if "current_character" not in st.session_state:
     st.session_state.current_character = None
 if "chat_session" not in st.session_state:
     st.session_state.chat_session = None
+if "turn_metrics" not in st.session_state:
+    st.session_state.turn_metrics = [] # Latency of each assistant turn
+if "conversation_id" not in st.session_state:
+    st.session_state.conversation_id = None
+if "transcript_renderer" not in st.session_state:
+    st.session_state.transcript_renderer = TranscriptRenderer()
 
 # Sidebar for character selection and chat controls
 with st.sidebar:
@@ -57,87 +151,135 @@ with st.sidebar:
     
     # Dropdown to select character
     character_options = ["Select a character"] + list(CHARACTERS.keys())
+    # After a refresh, come back to the character this user talked to last
+    last_character = None
+    if "character_selector" not in st.session_state:
+        last_character = load_store().last_character(get_user_id())
     selected_character_name = st.selectbox(
         "Who would you like to chat with?",
         character_options,
+        index=character_options.index(last_character) if last_character in character_options else 0,
         key="character_selector"
     )
 
-    # Logic to switch characters
+    # Logic to switch characters (each character keeps its own saved conversation)
     if selected_character_name != "Select a character" and selected_character_name != st.session_state.current_character:
-        st.session_state.current_character = selected_character_name
-        
-        # Reset chat for a new character
-        st.session_state.messages = [] 
-        st.session_state.chat_session = None # Reset the Gemini chat session
-
-        # Initialize new chat session with persona
-        persona_prompt = CHARACTERS[selected_character_name]["persona"]
-        model = genai.GenerativeModel(
-            model_name='gemini-2.0-flash',
-            system_instruction=persona_prompt
-        )
-        st.session_state.chat_session = model.start_chat(history=[])
-        
-        # Add initial greeting from character
-        initial_greeting = CHARACTERS[selected_character_name]["start_chat"]
-        st.session_state.messages.append({"role": "assistant", "content": initial_greeting})
+        open_conversation(selected_character_name)
         st.rerun() # Rerun to update the main chat window -- CHANGED FROM st.experimental_rerun()
 
+    stream_responses = st.toggle(
+        "Stream responses",
+        value=True,
+        help="Show the reply word by word as it is generated instead of waiting for the full answer."
+    )
+
     st.markdown("---")
     if st.button("Start New Chat", help="Clear the current conversation and start fresh with the selected character."):
         if st.session_state.current_character:
-            st.session_state.messages = []
-            
-            # Re-initialize the chat session with the current character's persona
-            persona_prompt = CHARACTERS[st.session_state.current_character]["persona"]
-            model = genai.GenerativeModel(
-                model_name='gemini-pro',
-                system_instruction=persona_prompt
-            )
-            st.session_state.chat_session = model.start_chat(history=[])
-            
-            # Add initial greeting again
-            initial_greeting = CHARACTERS[st.session_state.current_character]["start_chat"]
-            st.session_state.messages.append({"role": "assistant", "content": initial_greeting})
+            # The old conversation stays in the store; this starts a fresh one
+            open_conversation(st.session_state.current_character, new=True)
             st.info(f"New chat started with {st.session_state.current_character}!")
             st.rerun() # Rerun to update the main chat window -- CHANGED FROM st.experimental_rerun()
         else:
             st.warning("Please select a character first to start a new chat.")
 
+    # Latency of recent turns, so streaming vs. blocking can be compared
+    if st.session_state.turn_metrics:
+        st.markdown("---")
+        st.subheader("Response Latency")
+        recent = st.session_state.turn_metrics[-20:]
+        first_tokens = [m["first_token_seconds"] for m in recent if m["first_token_seconds"] is not None]
+        totals = [m["total_seconds"] for m in recent]
+        if first_tokens:
+            st.metric("Avg. time to first token", f"{sum(first_tokens) / len(first_tokens):.2f}s")
+        st.metric("Avg. total reply time", f"{sum(totals) / len(totals):.2f}s")
+
+    render_streamlit_panel(st)
+
 # --- Main Chat Display Area ---
 
 if st.session_state.current_character:
     st.subheader(f"Conversation with {st.session_state.current_character}")
 
-    # Display chat messages from history
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+    # Older messages stay in the store until asked for
+    if st.session_state.messages:
+        oldest_id = st.session_state.messages[0]["id"]
+        older = load_store().count_messages(st.session_state.conversation_id, before_id=oldest_id)
+        if older and st.button(f"Load earlier messages ({older} more)"):
+            st.session_state.messages = load_store().load_messages(
+                st.session_state.conversation_id, before_id=oldest_id
+            ) + st.session_state.messages
+            st.rerun()
+
+    # Display chat messages from history: recent ones as bubbles, older ones paged
+    renderer = st.session_state.transcript_renderer
+    renderer.role_labels["assistant"] = st.session_state.current_character
+    with tracer.span("render_history", messages=len(st.session_state.messages)):
+        renderer.render(st, st.session_state.messages, key=f"transcript_{st.session_state.conversation_id}")
 
     # Chat input for user
     user_input = st.chat_input("Say something to your character...")
 
     if user_input:
-        # Add user message to history
-        st.session_state.messages.append({"role": "user", "content": user_input})
+        # Add user message to history (saved right away, so a failed reply doesn't lose it)
+        message_id = load_store().append_message(st.session_state.conversation_id, "user", user_input)
+        st.session_state.messages.append({"id": message_id, "role": "user", "content": user_input})
         with st.chat_message("user"):
             st.markdown(user_input)
 
         # Generate assistant response using Gemini
         if st.session_state.chat_session:
-            with st.spinner(f"{st.session_state.current_character} is thinking..."):
+            with st.chat_message("assistant"):
+                placeholder = st.empty()
+                first_token_seconds = None
+                start = time.perf_counter()
                 try:
-                    response = st.session_state.chat_session.send_message(user_input)
-                    assistant_response = response.text
+                    if stream_responses:
+                        assistant_response, first_token_seconds, total_seconds = stream_reply(
+                            st.session_state.chat_session, user_input, placeholder
+                        )
+                    else:
+                        with st.spinner(f"{st.session_state.current_character} is thinking..."):
+                            assistant_response = run_sync(chat.chat_turn(st.session_state.chat_session, user_input))
+                        total_seconds = time.perf_counter() - start
+                        # Without streaming the first token shows up with the whole reply
+                        first_token_seconds = total_seconds
+                        placeholder.markdown(assistant_response)
                 except Exception as e:
-                    assistant_response = f"An error occurred: {e}"
-                    st.error("There was an error getting a response. Please try again.")
-            
+                    total_seconds = time.perf_counter() - start
+                    tracer.count("send_message.errors")
+                    # The error is shown as such and never stored as the character's reply
+                    assistant_response = None
+                    placeholder.empty()
+                    st.error(f"There was an error getting a response. Please try again. ({e})")
+
+            tracer.observe("send_message", total_seconds)
+            if first_token_seconds is not None:
+                tracer.observe("first_token", first_token_seconds)
+
             # Add assistant message to history
-            st.session_state.messages.append({"role": "assistant", "content": assistant_response})
-            with st.chat_message("assistant"):
-                st.markdown(assistant_response)
+            if assistant_response is not None:
+                store = load_store()
+                message_id = store.append_message(st.session_state.conversation_id, "assistant", assistant_response)
+                st.session_state.messages.append({"id": message_id, "role": "assistant", "content": assistant_response})
+                # Saved as of before a compaction still running in the background; the next turn saves its result
+                store.save_memory_state(st.session_state.conversation_id, *st.session_state.chat_session.state())
+            st.session_state.turn_metrics.append({
+                "character": st.session_state.current_character,
+                "streamed": stream_responses,
+                "first_token_seconds": first_token_seconds,
+                "total_seconds": total_seconds
+            })
+            if first_token_seconds is not None:
+                st.caption(f"First token after {first_token_seconds:.2f}s · full reply in {total_seconds:.2f}s")
+            turn_stats = st.session_state.chat_session.turn_stats
+            if assistant_response is not None and turn_stats:
+                tokens = turn_stats[-1]
+                sent = tokens["prompt_tokens"] or tokens["prompt_tokens_estimate"]
+                cached = f", {tokens['cached_tokens']} from the prompt cache" if tokens.get("cached_tokens") else ""
+                st.caption(
+                    f"Prompt: {sent} tokens{cached} (full history would be ~{tokens['full_history_tokens_estimate']})"
+                )
         else:
             st.warning("Please select a character from the sidebar to start chatting.")
 
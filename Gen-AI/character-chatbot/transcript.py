@@ -0,0 +1,76 @@
+from collections import OrderedDict
+
+# Newest messages rendered one chat bubble each; everything older is paged
+LIVE_WINDOW = 20
+HISTORY_PAGE_SIZE = 50
+
+ROLE_LABELS = {"user": "You", "assistant": "Character"}
+
+
+class TranscriptRenderer:
+    """
+    Renders a chat transcript in time that doesn't grow with its length.
+
+    Only the last `live_window` messages get their own `st.chat_message`
+    bubble. Older messages are collapsed into an "Earlier messages" expander
+    that shows one page at a time as a single Markdown block; each page's
+    Markdown is built once and cached by the ids of its messages, so a rerun
+    costs one cached lookup for the whole history instead of one element per
+    message.
+
+    Keep one renderer per session (e.g. in `st.session_state`).
+    """
+
+    def __init__(self, live_window: int = LIVE_WINDOW, page_size: int = HISTORY_PAGE_SIZE,
+                 role_labels: dict = None, max_cached_pages: int = 64):
+        self.live_window = live_window
+        self.page_size = page_size
+        self.role_labels = dict(ROLE_LABELS, **(role_labels or {}))
+        self.max_cached_pages = max_cached_pages
+        self._pages = OrderedDict()
+        self.page_builds = 0 # pages rendered to Markdown (cache misses)
+
+    def split(self, messages):
+        """Returns (older messages, live messages)."""
+        if len(messages) <= self.live_window:
+            return [], messages
+        return messages[:-self.live_window], messages[-self.live_window:]
+
+    def page_markdown(self, page) -> str:
+        key = (page[0].get("id", id(page[0])), page[-1].get("id", id(page[-1])), len(page))
+        markdown = self._pages.get(key)
+        if markdown is None:
+            markdown = "\n\n".join(
+                f"**{self.role_labels.get(message['role'], message['role'])}:** {message['content']}"
+                for message in page
+            )
+            self._pages[key] = markdown
+            self.page_builds += 1
+            while len(self._pages) > self.max_cached_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(key)
+        return markdown
+
+    def render(self, st, messages, key: str = "transcript"):
+        older, live = self.split(messages)
+        if older:
+            # As a fragment, flipping pages reruns only the history view, not the app
+            fragment = getattr(st, "fragment", None)
+            (fragment(self._render_older) if fragment else self._render_older)(st, older, key)
+        for message in live:
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+
+    def _render_older(self, st, older, key: str):
+        # Pages are counted from the newest, so page 1 sits right above the live window
+        pages = (len(older) + self.page_size - 1) // self.page_size
+        with st.expander(f"Earlier messages ({len(older)})"):
+            page_number = 1
+            if pages > 1:
+                page_number = st.number_input(
+                    f"Page (1 = most recent, {pages} = oldest)", min_value=1, max_value=pages, value=1, key=f"{key}_page"
+                )
+            end = len(older) - (page_number - 1) * self.page_size
+            page = older[max(0, end - self.page_size):end]
+            st.markdown(self.page_markdown(page))
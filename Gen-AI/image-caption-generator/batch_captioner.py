@@ -0,0 +1,158 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+# Importing image_captioner also configures the Gemini API key
+import image_captioner
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.models import get_model
+from common.images import preprocess_image
+from common.ratelimit import BATCH, use_priority
+from common.core import captions, map_bounded, run_sync
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif")
+
+# --- Input ---
+
+def iter_image_paths(directory: str, recursive: bool = True):
+    """
+    Yields image paths under `directory` one at a time, so huge folders are
+    never listed into memory all at once.
+    """
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        with os.scandir(current) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        stack.append(entry.path)
+                elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield entry.path
+
+def load_completed(output_path: str, caption_style: str) -> set:
+    """
+    Reads an existing JSONL results file and returns the paths that were already
+    captioned successfully in this style. Failed rows are retried on resume.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A killed run can leave a half-written last line
+                continue
+            if record.get("style") == caption_style and "caption" in record:
+                completed.add(record["path"])
+    return completed
+
+# --- Pipeline stages ---
+
+def load_image(image_path: str, max_side: int = 1024) -> dict:
+    """
+    Decodes, downscales and re-encodes an image. Runs in a worker thread, off
+    the event loop.
+    """
+    return preprocess_image(image_path, max_side).blob
+
+# --- Batch driver ---
+
+def caption_directory(
+    directory: str,
+    output_path: str,
+    caption_style: str = "descriptive",
+    model=None,
+    workers: int = 8,
+    decode_workers: int = None,
+    max_side: int = 1024,
+    recursive: bool = True
+) -> dict:
+    """
+    Captions every image in a directory and appends one JSON line per image to
+    `output_path`. Images already captioned in that file are skipped, so a
+    killed run can simply be started again.
+
+    Args:
+        directory (str): Folder to scan for images.
+        output_path (str): JSONL file to append results to.
+        caption_style (str): "descriptive", "fun" or "quirky".
+        model: Model client shared by all workers. Defaults to one Gemini model;
+               any object with `generate_content` (e.g. a local fake) works.
+        workers (int): Number of images in flight (decoding or waiting on the model).
+        decode_workers (int): Number of images decoded at once.
+        max_side (int): Longest image side sent to the model.
+    Returns:
+        dict: Counts of captioned, failed and skipped images plus elapsed seconds.
+    """
+    if model is None:
+        model = get_model('gemini-pro-vision')
+    if decode_workers is None:
+        decode_workers = os.cpu_count() or 4
+
+    completed = load_completed(output_path, caption_style)
+    stats = {"captioned": 0, "failed": 0, "skipped": 0}
+    start = time.perf_counter()
+
+    def todo():
+        # Paths are listed lazily; at most `workers` decoded images are held at once
+        for path in iter_image_paths(directory, recursive):
+            if path in completed:
+                stats["skipped"] += 1
+            else:
+                yield path
+
+    async def caption_all(out):
+        decoding = asyncio.Semaphore(max(1, decode_workers))
+
+        async def caption_one(path):
+            async with decoding:
+                blob = await asyncio.to_thread(load_image, path, max_side)
+            # Batch work waits behind interactive requests in the shared scheduler
+            with use_priority(BATCH):
+                return await captions.caption_image(model, blob, caption_style)
+
+        async for path, caption, error in map_bounded(caption_one, todo(), workers):
+            if error is not None:
+                record = {"path": path, "style": caption_style, "error": str(error)}
+                stats["failed"] += 1
+            else:
+                record = {"path": path, "style": caption_style, "caption": caption}
+                stats["captioned"] += 1
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        run_sync(caption_all(out))
+
+    stats["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Caption every image in a directory.")
+    parser.add_argument("directory", help="Folder containing the images")
+    parser.add_argument("--output", default="captions.jsonl", help="JSONL file to write (appended to on resume)")
+    parser.add_argument("--style", default="descriptive", choices=["descriptive", "fun", "quirky"])
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent model requests")
+    parser.add_argument("--decode-workers", type=int, default=None, help="Threads used to decode images")
+    parser.add_argument("--max-side", type=int, default=1024, help="Downscale images to this longest side")
+    parser.add_argument("--no-recursive", action="store_true", help="Only caption the top-level folder")
+    args = parser.parse_args()
+
+    summary = caption_directory(
+        args.directory,
+        args.output,
+        caption_style=args.style,
+        workers=args.workers,
+        decode_workers=args.decode_workers,
+        max_side=args.max_side,
+        recursive=not args.no_recursive
+    )
+    print(f"Done: {summary}")
@@ -1,19 +1,29 @@
 import os
+import sys
 from dotenv import load_dotenv
-import google.generativeai as genai
-from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.models import configure, get_model
+from common.core import captions
+from common.core.runtime import run_sync
+# Prompt building lives in the shared core; re-exported for existing callers
+from common.core.captions import (
+    CAPTION_STYLES, STYLE_DESCRIPTIONS, build_caption_prompt, build_multi_style_request, parse_multi_style_response
+)
 
 # 1. Configure the Gemini API key
 # It's best practice to load the API key from environment variables
 load_dotenv()
 try:
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    configure(api_key=os.getenv("GEMINI_API_KEY"))
 except KeyError:
     print("Error: GOOGLE_API_KEY environment variable not set.")
     print("Please set it before running the script (e.g., export GOOGLE_API_KEY='YOUR_API_KEY').")
     exit()
 
-def generate_image_caption(image_path: str, caption_style: str = "descriptive") -> str:
+# --- Sync wrappers around common.core.captions ---
+
+def generate_image_caption(image_path: str, caption_style: str = "descriptive", model=None) -> str:
     """
     Generates an AI caption for the given image using the Gemini Pro Vision model.
 
@@ -21,34 +31,33 @@ def generate_image_caption(image_path: str, caption_style: str = "descriptive")
         image_path (str): The path to the image file.
         caption_style (str): The desired style of the caption. 
                              Options: "descriptive", "fun", "quirky".
+        model: Optional model client to reuse. Anything with a
+               `generate_content` method works, so a fake can be passed in.
     Returns:
         str: The AI-generated caption.
+    Raises:
+        FileNotFoundError: If the image doesn't exist.
+        Exception: API errors, after the shared scheduler's retries.
     """
-    try:
-        # Load the Gemini Pro Vision model
-        model = genai.GenerativeModel('gemini-pro-vision')
-
-        # Open the image using Pillow
-        img = Image.open(image_path)
-
-        # Craft the prompt based on the desired style
-        if caption_style == "fun":
-            prompt = "Generate a fun and lighthearted caption for this image:"
-        elif caption_style == "quirky":
-            prompt = "Generate a quirky, imaginative, and slightly unusual caption for this image:"
-        else: # descriptive
-            prompt = "Generate a detailed and descriptive caption for this image:"
+    # Load the Gemini Pro Vision model
+    if model is None:
+        model = get_model('gemini-pro-vision')
+    return run_sync(captions.caption_image_file(image_path, (caption_style,), model))[caption_style]
 
-        # Generate content with the image and text prompt
-        response = model.generate_content([prompt, img])
-
-        # Return the generated text
-        return response.text
+def generate_image_captions(image_path: str, styles=CAPTION_STYLES, model=None) -> dict:
+    """
+    Generates captions in several styles for one image file in a single round trip.
 
-    except FileNotFoundError:
-        return f"Error: Image file not found at {image_path}"
-    except Exception as e:
-        return f"An error occurred: {e}"
+    Args:
+        image_path (str): The path to the image file.
+        styles: Caption styles to generate, e.g. ("descriptive", "fun", "quirky").
+        model: Optional model client to reuse.
+    Returns:
+        dict: {style: caption}. Errors are raised as in `generate_image_caption`.
+    """
+    if model is None:
+        model = get_model('gemini-pro-vision')
+    return run_sync(captions.caption_image_file(image_path, tuple(styles), model))
 
 if __name__ == "__main__":
     # Example Usage:
@@ -59,22 +68,20 @@ if __name__ == "__main__":
     
     sample_image_path = "sample_image.jpg" # Replace with your image path
 
-    # --- Descriptive Caption ---
-    print(f"\n--- Generating Descriptive Caption for {sample_image_path} ---")
-    descriptive_caption = generate_image_caption(sample_image_path, "descriptive")
-    print(descriptive_caption)
-
-    # --- Fun Caption ---
-    print(f"\n--- Generating Fun Caption for {sample_image_path} ---")
-    fun_caption = generate_image_caption(sample_image_path, "fun")
-    print(fun_caption)
-
-    # --- Quirky Caption ---
-    print(f"\n--- Generating Quirky Caption for {sample_image_path} ---")
-    quirky_caption = generate_image_caption(sample_image_path, "quirky")
-    print(quirky_caption)
+    # --- Descriptive, Fun and Quirky Captions (one request) ---
+    print(f"\n--- Generating Descriptive, Fun and Quirky Captions for {sample_image_path} ---")
+    try:
+        captions = generate_image_captions(sample_image_path, CAPTION_STYLES)
+        for style, caption in captions.items():
+            print(f"\n[{style.capitalize()}]\n{caption}")
+    except FileNotFoundError:
+        print(f"Error: Image file not found at {sample_image_path}")
+    except Exception as e:
+        print(f"An error occurred: {e}")
 
     # Example with a non-existent file
     print(f"\n--- Testing with a non-existent image ---")
-    non_existent_caption = generate_image_caption("non_existent_image.png")
-    print(non_existent_caption)
\ No newline at end of file
+    try:
+        print(generate_image_caption("non_existent_image.png"))
+    except FileNotFoundError:
+        print("Error: Image file not found at non_existent_image.png")
\ No newline at end of file
@@ -1,37 +1,27 @@
 import streamlit as st
 from dotenv import load_dotenv
 import os
-import google.generativeai as genai
-from PIL import Image
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.models import DEFAULT_MODEL, configure, get_model, start_warm_up
+from common.images import preprocess_image, bytes_saved, latency_saved
+from common.tracing import init_tracing, render_streamlit_panel
+from common.core import captions
+from common.core.streamlit_adapter import run_or_error
 
 # Configure the Gemini API key
 load_dotenv()
 try:
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    configure(api_key=os.getenv("GEMINI_API_KEY"))
 except KeyError:
     st.error("Error: GOOGLE_API_KEY environment variable not set.")
     st.info("Please set it before running the app (e.g., in your terminal: export GOOGLE_API_KEY='YOUR_API_KEY').")
     st.stop() # Stop the app if API key is not set
 
-def generate_caption(image_data, caption_style: str) -> str:
-    """
-    Generates an AI caption for the given image using the Gemini Pro Vision model.
-    """
-    model = genai.GenerativeModel('gemini-2.0-flash')
-
-    # Craft the prompt based on the desired style
-    if caption_style == "Fun":
-        prompt = "Generate a fun and lighthearted caption for this image:"
-    elif caption_style == "Quirky":
-        prompt = "Generate a quirky, imaginative, and slightly unusual caption for this image:"
-    else: # Descriptive
-        prompt = "Generate a detailed and descriptive caption for this image:"
-
-    try:
-        response = model.generate_content([prompt, image_data])
-        return response.text
-    except Exception as e:
-        return f"An error occurred while generating caption: {e}"
+tracer = init_tracing("image-caption-generator")
+# Load the SDK and PIL in the background while the uploader renders
+start_warm_up(DEFAULT_MODEL, modules=("PIL.Image",))
 
 st.set_page_config(page_title="AI Image Captioner with Gemini", layout="centered")
 st.title("📸 AI Image Captioner")
@@ -42,26 +32,50 @@ uploaded_file = st.file_uploader("Choose an image...", type=["jpg", "jpeg", "png
 
 if uploaded_file is not None:
     # Display the uploaded image
-    image = Image.open(uploaded_file)
-    st.image(image, caption="Uploaded Image", use_column_width=True)
+    with tracer.span("image_decode"):
+        from PIL import Image
+        image = Image.open(uploaded_file)
+        image.load()
+    with tracer.span("render_image"):
+        st.image(image, caption="Uploaded Image", use_column_width=True)
 
     # Caption Style Selection
-    caption_style = st.radio(
-        "Choose your caption style:",
-        ("Descriptive", "Fun", "Quirky")
+    caption_styles = st.multiselect(
+        "Choose your caption styles:",
+        ["Descriptive", "Fun", "Quirky"],
+        default=["Descriptive"],
+        help="Several styles are generated together in a single request."
     )
 
-    if st.button("Generate Caption"):
+    if st.button("Generate Caption", disabled=not caption_styles):
         with st.spinner("Generating caption..."):
-            caption = generate_caption(image, caption_style)
+            # Send a downscaled copy: the model doesn't need the full-resolution photo
+            prepared = preprocess_image(uploaded_file)
+            model = get_model(DEFAULT_MODEL)
+            # Several styles are generated together in a single request
+            styled = run_or_error(
+                st,
+                captions.styled_captions(model, prepared.blob, [style.lower() for style in caption_styles]),
+                "Couldn't generate a caption"
+            )
+            if styled is None:
+                render_streamlit_panel(st)
+                st.stop()
             st.success("Caption Generated!")
             st.write("---")
-            st.subheader(f"{caption_style} Caption:")
-            st.write(caption)
+            for caption_style in caption_styles:
+                st.subheader(f"{caption_style} Caption:")
+                st.write(styled[caption_style.lower()])
+            st.caption(
+                f"Uploaded {prepared.sent_bytes / 1024:.0f} KB instead of {prepared.original_bytes / 1024:.0f} KB "
+                f"({bytes_saved(prepared) / 1024:.0f} KB saved, ~{max(0.0, latency_saved(prepared)):.2f}s faster)"
+            )
             st.write("---")
 
 else:
     st.info("Please upload an image to get started.")
 
+render_streamlit_panel(st)
+
 st.markdown("---")
 st.markdown("Powered by Google Gemini AI")
\ No newline at end of file
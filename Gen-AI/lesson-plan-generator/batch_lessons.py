@@ -0,0 +1,194 @@
+import os
+import re
+import sys
+import csv
+import json
+import time
+import hashlib
+import zipfile
+import argparse
+from io import StringIO
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from dotenv import load_dotenv
+from common.models import configure
+from common.ratelimit import BATCH, get_scheduler, use_priority
+from common.core import lessons, map_bounded, run_sync
+
+FIELDS = ["topic", "grade_level", "duration", "learning_style", "notes"]
+
+# --- Input ---
+
+def read_rows(path: str) -> list:
+    """
+    Reads lesson rows from a .csv file (header row with FIELDS) or a .yaml/.yml
+    file (a list of mappings). `learning_style` defaults to Standard.
+    """
+    if path.lower().endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise SystemExit("Reading YAML needs PyYAML: pip install pyyaml")
+        with open(path, "r", encoding="utf-8") as f:
+            raw_rows = yaml.safe_load(f) or []
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            raw_rows = list(csv.DictReader(f))
+
+    rows = []
+    for raw in raw_rows:
+        row = {field: str(raw.get(field) or "").strip() for field in FIELDS}
+        row["learning_style"] = row["learning_style"] or "Standard"
+        if row["topic"] and row["grade_level"] and row["duration"]:
+            rows.append(row)
+    return rows
+
+def row_key(row: dict) -> str:
+    """
+    Identity of a plan request; identical rows (ignoring case and spacing) share one plan.
+    """
+    normalized = "\0".join(" ".join(row[field].lower().split()) for field in FIELDS)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+def plan_filename(row: dict, number: int) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "_", f"{row['topic']} {row['grade_level']}".lower()).strip("_")[:60]
+    return f"{number:03d}_{slug}.md"
+
+# --- Checkpoint ---
+
+def load_checkpoint(path: str) -> dict:
+    """
+    Returns {row key: {"file": ..., "markdown": ...}} for plans finished by earlier runs.
+    """
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A killed run can leave a half-written last line
+                continue
+            done[entry["key"]] = entry
+    return done
+
+# --- Batch driver ---
+
+def generate_curriculum(
+    rows,
+    output_zip: str,
+    workers: int = 4,
+    requests_per_minute: float = None,
+    mode: str = "standard",
+    model=None
+) -> dict:
+    """
+    Generates one plan per unique row and streams them into `output_zip`
+    together with index.csv and index.md.
+
+    Up to `workers` plans are generated at once on the shared async engine;
+    every model call queues in the shared scheduler, whose request budget
+    `requests_per_minute` resets (default: keep GENAI_RPM).
+    Finished plans are appended to `<output_zip>.checkpoint.jsonl` as they
+    complete, so rerunning after a crash rebuilds the zip from the checkpoint
+    and only generates what is missing.
+    """
+    generate = lessons.generate_lesson_plan_fanout if mode == "fanout" else lessons.generate_lesson_plan
+    checkpoint_path = output_zip + ".checkpoint.jsonl"
+    done = load_checkpoint(checkpoint_path)
+    if requests_per_minute:
+        get_scheduler().set_rate(requests_per_minute=requests_per_minute)
+
+    # Deduplicate: every unique row gets a number and a file name
+    unique = {}
+    for row in rows:
+        key = row_key(row)
+        if key not in unique:
+            unique[key] = (row, plan_filename(row, len(unique) + 1))
+    todo = {key: value for key, value in unique.items() if key not in done}
+
+    stats = {"rows": len(rows), "unique": len(unique), "resumed": len(unique) - len(todo), "generated": 0, "failed": 0}
+    errors = {}
+    start = time.perf_counter()
+
+    async def generate_one(key):
+        row = unique[key][0]
+        with use_priority(BATCH):
+            return await generate(
+                row["topic"], row["grade_level"], row["duration"], row["learning_style"], row["notes"], model=model
+            )
+
+    async def generate_all(bundle, checkpoint):
+        async for key, markdown, error in map_bounded(generate_one, list(todo), workers):
+            row, filename = unique[key]
+            if error is not None:
+                errors[key] = str(error)
+                stats["failed"] += 1
+                print(f"[failed] {row['topic']} ({row['grade_level']}): {error}")
+                continue
+            bundle.writestr(filename, markdown)
+            checkpoint.write(json.dumps({"key": key, "file": filename, "markdown": markdown}) + "\n")
+            checkpoint.flush()
+            stats["generated"] += 1
+            print(f"[done]   {row['topic']} ({row['grade_level']}) -> {filename}")
+
+    with zipfile.ZipFile(output_zip, "w", compression=zipfile.ZIP_DEFLATED) as bundle, \
+            open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+        # Plans from earlier runs go straight into the new bundle
+        for key, (row, filename) in unique.items():
+            if key in done:
+                bundle.writestr(filename, done[key]["markdown"])
+
+        run_sync(generate_all(bundle, checkpoint))
+
+        bundle.writestr("index.csv", build_index_csv(rows, unique, errors))
+        bundle.writestr("index.md", build_index_markdown(unique, errors))
+
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    return stats
+
+# --- Index ---
+
+def build_index_csv(rows, unique, errors) -> str:
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["row"] + FIELDS + ["file", "status"])
+    for number, row in enumerate(rows, start=1):
+        key = row_key(row)
+        filename = unique[key][1]
+        status = f"failed: {errors[key]}" if key in errors else "ok"
+        writer.writerow([number] + [row[field] for field in FIELDS] + ["" if key in errors else filename, status])
+    return buffer.getvalue()
+
+def build_index_markdown(unique, errors) -> str:
+    lines = ["# Lesson Plans", ""]
+    for key, (row, filename) in unique.items():
+        label = f"{row['topic']} — {row['grade_level']}, {row['duration']} ({row['learning_style']})"
+        lines.append(f"- {label}: failed" if key in errors else f"- [{label}]({filename})")
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate lesson plans for a whole curriculum.")
+    parser.add_argument("input", help="CSV or YAML with topic, grade_level, duration, learning_style, notes")
+    parser.add_argument("--output", default="lesson_plans.zip", help="Zip bundle to write")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rpm", type=float, default=None, help="Model requests per minute across all workers (default: GENAI_RPM)")
+    parser.add_argument("--mode", default="standard", choices=["standard", "fanout"])
+    args = parser.parse_args()
+
+    load_dotenv()
+    configure()
+
+    lesson_rows = read_rows(args.input)
+    summary = generate_curriculum(
+        lesson_rows,
+        args.output,
+        workers=args.workers,
+        requests_per_minute=args.rpm,
+        mode=args.mode
+    )
+    print(f"\nDone: {summary}")
+    print(f"Bundle: {args.output}")
@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.core import lessons
+from common.core.runtime import iter_sync, run_sync
+# Prompt building lives in the shared core; re-exported for existing callers
+from common.core.lessons import (
+    SECTIONS, OUTLINE_SECTIONS, FANOUT_SECTIONS, OUTLINE_MARKER, LESSON_TEMPLATE,
+    style_instructions, build_context, build_lesson_details, build_lesson_prompt, build_outline_prompt, build_section_prompt, split_outline
+)
+
+# --- Sync wrappers around common.core.lessons ---
+
+def generate_lesson_plan(topic, grade_level, duration, learning_style="standard", additional_notes="", model=None) -> str:
+    """
+    Generates the whole plan with one blocking request. Raises on API errors.
+    """
+    return run_sync(lessons.generate_lesson_plan(topic, grade_level, duration, learning_style, additional_notes, model))
+
+def stream_lesson_plan(topic, grade_level, duration, learning_style="standard", additional_notes="", model=None):
+    """
+    Yields the plan's Markdown in chunks as the model produces them.
+    """
+    return iter_sync(lessons.stream_lesson_plan(topic, grade_level, duration, learning_style, additional_notes, model))
+
+def generate_lesson_plan_fanout(topic, grade_level, duration, learning_style="standard", additional_notes="",
+                                model=None, max_workers: int = len(FANOUT_SECTIONS), on_update=None) -> str:
+    """
+    Outline first, then sections 3-9 concurrently. `on_update(markdown)` is
+    called from the calling thread as parts finish.
+    """
+    return run_sync(lessons.generate_lesson_plan_fanout(
+        topic, grade_level, duration, learning_style, additional_notes,
+        model=model, max_workers=max_workers, on_update=on_update
+    ))
@@ -1,95 +1,71 @@
 import streamlit as st
 import os
+import sys
+import time
 from dotenv import load_dotenv
-import google.generativeai as genai
 import textwrap # For formatting output
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.models import DEFAULT_MODEL, configure, get_model, start_warm_up
+from common.tracing import init_tracing, render_streamlit_panel
+from common.core import lessons, run_sync
+from common.core.streamlit_adapter import stream_markdown
+
 # --- Configuration ---
 # Load API key from environment variable
 load_dotenv()
 try:
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    configure(api_key=os.getenv("GEMINI_API_KEY"))
 except KeyError:
     st.error("Error: GOOGLE_API_KEY environment variable not set.")
     st.info("Please set it before running the app (e.g., export GOOGLE_API_KEY='YOUR_API_KEY' or set GOOGLE_API_KEY=...).")
     st.stop() # Stop the app if API key is not set
 
-# --- Lesson Plan Generation Function (from previous section) ---
-def generate_lesson_plan(
-    topic: str,
-    grade_level: str,
-    duration: str,
-    learning_style: str = "standard",
-    additional_notes: str = ""
-) -> str:
-    model = genai.GenerativeModel('gemini-2.0-flash')
-
-    base_prompt = f"""
-    You are an expert educator and curriculum designer. Your task is to generate a comprehensive and engaging lesson plan based on the following details.
-
-    **Topic:** {topic}
-    **Grade Level:** {grade_level}
-    **Duration:** {duration}
-    """
-
-    style_prompt = ""
-    if learning_style == "Active Learning":
-        style_prompt = "Emphasize active student participation, group work, and hands-on activities."
-    elif learning_style == "Project-Based":
-        style_prompt = "Design the lesson around a central project or investigation, with students building or creating something."
-    elif learning_style == "Inquiry-Based":
-        style_prompt = "Focus on student-led questions, exploration, and discovery."
-    elif learning_style == "Discussion-Heavy":
-        style_prompt = "Structure the lesson around facilitated discussions and debates."
-    else: # "Standard" or default
-        style_prompt = "Provide a balanced lesson plan suitable for a general classroom setting."
-
-    notes_prompt = f"Additional notes/requirements: {additional_notes}" if additional_notes else ""
-
-    full_prompt = f"""
-    {base_prompt}
-    **Learning Style Emphasis:** {style_prompt}
-    {notes_prompt}
-
-    Please structure the lesson plan clearly with the following sections using Markdown formatting:
-
-    ## Lesson Plan: [Your Suggested Lesson Title]
-
-    ### 1. Learning Objectives
-    * [List 3-5 clear, measurable learning objectives (e.g., "Students will be able to explain...", "Students will be able to identify...")]
-
-    ### 2. Materials and Resources
-    * [List all necessary materials, e.g., whiteboard, markers, handouts, projector, specific websites/videos, physical objects]
-
-    ### 3. Introduction (Engage) - [Suggested Time: X min]
-    * [Brief activity or discussion to hook students and activate prior knowledge]
-
-    ### 4. Direct Instruction (Explore/Explain) - [Suggested Time: X min]
-    * [Core content delivery, key concepts, explanations]
+tracer = init_tracing("lesson-plan-generator")
+# Import the SDK and open its connection in the background while the form renders
+start_warm_up(DEFAULT_MODEL)
 
-    ### 5. Guided Practice (Elaborate) - [Suggested Time: X min]
-    * [Activities where students practice with teacher support, e.g., group work, guided exercises]
+# --- Lesson Plan Generation (prompts and modes live in common/core/lessons.py) ---
+GENERATION_MODES = ["Standard", "Streaming", "Outline + parallel sections"]
 
-    ### 6. Independent Practice (Evaluate) - [Suggested Time: X min]
-    * [Activities where students apply knowledge independently, e.g., worksheets, short assignments]
-
-    ### 7. Assessment
-    * [How student understanding will be checked (formative/summative, e.g., quick quiz, observation, exit ticket, project rubric)]
-
-    ### 8. Differentiation Strategies
-    * [Ideas for supporting struggling learners and challenging advanced learners]
+def generate_with_mode(mode: str, placeholder, **details) -> str:
+    """
+    Generates the plan with the chosen mode, showing partial Markdown in
+    `placeholder` as it arrives, and records time to first content and total time.
+    """
+    # Single-request modes send only the lesson details; the fixed template is
+    # the prefix-cached system instruction of `lesson_model()`
+    model = get_model(DEFAULT_MODEL)
+    start = time.perf_counter()
+    first_content = [None]
 
-    ### 9. Homework/Extension Activities (Optional)
-    * [Suggestions for follow-up work or deeper exploration]
+    def show(markdown):
+        if first_content[0] is None:
+            first_content[0] = time.perf_counter() - start
+        placeholder.markdown(markdown)
 
-    Ensure the suggested times for each section add up approximately to the total lesson duration.
-    """
-    
     try:
-        response = model.generate_content(full_prompt)
-        return response.text
+        if mode == "Streaming":
+            plan, first_content[0], _ = stream_markdown(placeholder, lessons.stream_lesson_plan(model=lessons.lesson_model(), **details))
+        elif mode == "Outline + parallel sections":
+            plan = run_sync(lessons.generate_lesson_plan_fanout(model=model, on_update=show, **details))
+        else:
+            plan = run_sync(lessons.generate_lesson_plan(model=lessons.lesson_model(), **details))
     except Exception as e:
-        return f"An error occurred while generating the lesson plan: {e}"
+        # Show the failure as an error, never as the lesson plan itself
+        tracer.count("lesson_plan.errors")
+        placeholder.empty()
+        st.error(f"Couldn't generate the lesson plan: {e}")
+        return None
+
+    total = time.perf_counter() - start
+    st.session_state.generation_timings.append({
+        "mode": mode,
+        "first content (s)": round(first_content[0] if first_content[0] is not None else total, 2),
+        "total (s)": round(total, 2)
+    })
+    tracer.observe(f"lesson_plan.{mode.split()[0].lower()}", total)
+    return plan
 
 # --- Streamlit App Layout ---
 
@@ -102,6 +78,8 @@ if 'lesson_plan_text' not in st.session_state:
     st.session_state.lesson_plan_text = ""
 if 'current_topic' not in st.session_state:
     st.session_state.current_topic = ""
+if 'generation_timings' not in st.session_state:
+    st.session_state.generation_timings = []
 
 
 # Input fields for lesson plan details
@@ -129,6 +107,13 @@ with st.form("lesson_plan_form"):
         "e.g., 'Include a hands-on activity.', 'Focus on real-world applications.', 'Keep language simple for ESL students.'"
     )
 
+    generation_mode = st.radio(
+        "Generation mode:",
+        GENERATION_MODES,
+        horizontal=True,
+        help="Streaming shows the plan as it is written. Outline + parallel sections writes the outline first, then all remaining sections at once."
+    )
+
     submitted = st.form_submit_button("Generate Lesson Plan")
 
     if submitted:
@@ -136,23 +121,27 @@ with st.form("lesson_plan_form"):
             st.error("Please fill in the Topic, Grade Level, and Duration.")
         else:
             with st.spinner("Generating your lesson plan... This might take a moment."):
-                generated_plan = generate_lesson_plan(
+                generated_plan = generate_with_mode(
+                    generation_mode,
+                    st.empty(),
                     topic=topic,
                     grade_level=grade_level,
                     duration=duration,
                     learning_style=learning_style,
                     additional_notes=additional_notes
                 )
-            # Store the generated plan and topic in session state
-            st.session_state.lesson_plan_text = generated_plan
-            st.session_state.current_topic = topic
-            st.rerun() # Rerun to display the generated plan and download button outside the form
+            if generated_plan:
+                # Store the generated plan and topic in session state
+                st.session_state.lesson_plan_text = generated_plan
+                st.session_state.current_topic = topic
+                st.rerun() # Rerun to display the generated plan and download button outside the form
 
 # Display the lesson plan and download button outside the form, conditioned on content
 if st.session_state.lesson_plan_text:
     st.subheader("Generated Lesson Plan:")
     # Use st.markdown with a code block for better readability of the generated Markdown
-    st.markdown(st.session_state.lesson_plan_text)
+    with tracer.span("render_plan"):
+        st.markdown(st.session_state.lesson_plan_text)
     
     # Place the download button outside the form
     st.download_button(
@@ -162,5 +151,20 @@ if st.session_state.lesson_plan_text:
         mime="text/markdown"
     )
 
+# Compare the generation modes
+if st.session_state.generation_timings:
+    with st.expander("Generation timings"):
+        st.table(st.session_state.generation_timings[-10:])
+        template_cache = lessons.lesson_model().stats()
+        if template_cache["last_request"]:
+            last = template_cache["last_request"]
+            st.caption(
+                f"Prompt cache: last request sent {last['prompt_tokens']} input tokens, {last['cached_tokens']} "
+                f"served from the cached template ({last['reduction']:.0%}); "
+                f"{template_cache['input_token_reduction']:.0%} across {template_cache['requests']} requests."
+            )
+
+render_streamlit_panel(st)
+
 st.markdown("---")
 st.markdown("Powered by Google Gemini AI")
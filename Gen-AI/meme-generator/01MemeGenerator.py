@@ -1,120 +1,78 @@
 import os
-import google.generativeai as genai
+import sys
+import threading
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.core import memes
+from common.core.runtime import run_sync
+# Caption splitting lives in the shared core; re-exported for existing callers
+from common.core.memes import split_caption
+from common.models import configure
+from common.tracing import get_tracer, init_tracing
+from template_store import default_catalog, default_image_store
+
 load_dotenv()
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+configure(api_key=os.getenv("GEMINI_API_KEY"))
+init_tracing("meme-generator")
 
-def generate_meme_caption(topic):
+def generate_meme_caption(topic, fresh=False):
     """
-    Generates a humorous meme caption using the Google Gemini API.
+    Generates a humorous meme caption using the Google Gemini API. Topics close
+    to one captioned before reuse that caption unless `fresh` is set.
     """
-    model = genai.GenerativeModel('gemini-2.0-flash')
-    prompt = f"Generate a short, witty, and humorous meme caption about '{topic}' in two parts. Just return the top text and bottom text as two lines, without labels like 'Top text' or 'Bottom text'."
-    response = model.generate_content(prompt)
-    return response.text
-
-import requests
+    return run_sync(memes.meme_caption(topic, fresh=fresh))
 
-def get_popular_meme_templates():
+def get_popular_meme_templates(catalog=None):
     """
-    Fetches popular meme templates from the Imgflip API.
+    Returns popular meme templates from the Imgflip API, served from the local
+    catalog copy and only revalidated with imgflip once it has gone stale.
     """
-    url = "https://api.imgflip.com/get_memes"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()['data']['memes']
-    else:
-        return None
+    catalog = catalog or default_catalog()
+    return catalog.get_templates()
 
 
-from PIL import Image, ImageDraw, ImageFont
-import requests
-from io import BytesIO
-import textwrap
-
-def create_meme(image_url, top_text, bottom_text, font_path="impact.ttf", font_size=50):
+def create_meme(image_url, top_text, bottom_text, font_path="impact.ttf", font_size=50, image_store=None, output_path="meme.png"):
     """
     Creates a meme by adding top and bottom text to an image.
+
+    Returns the PNG bytes of the meme. It is also written to `output_path`
+    unless that is None.
     """
     try:
-        response = requests.get(image_url)
-        img = Image.open(BytesIO(response.content))
-        draw = ImageDraw.Draw(img)
-
-        try:
-            # Try to load the Impact font
-            font = ImageFont.truetype(font_path, font_size)
-        except IOError:
-            # If Impact font is not found, use the default font
-            print("Impact font not found. Using default font.")
-            font = ImageFont.load_default(size=font_size)
-
-        img_width, img_height = img.size
-
-        # Function to draw text with a black outline for better readability
-        def draw_text_with_outline(draw_object, text, x, y, font, fill_color, outline_color):
-            # Draw outline
-            draw_object.text((x-2, y-2), text, font=font, fill=outline_color)
-            draw_object.text((x+2, y-2), text, font=font, fill=outline_color)
-            draw_object.text((x-2, y+2), text, font=font, fill=outline_color)
-            draw_object.text((x+2, y+2), text, font=font, fill=outline_color)
-            # Draw text fill
-            draw_object.text((x, y), text, font=font, fill=fill_color)
-
-        # Wrap text to fit the image width
-        wrapper = textwrap.TextWrapper(width=25)
-
-        # --- Top Text ---
-        top_lines = wrapper.wrap(top_text.upper())
-        y_text = 10
-        for line in top_lines:
-            # --- THIS IS THE FIX ---
-            # Get the bounding box of the text
-            bbox = font.getbbox(line)
-            line_width = bbox[2] - bbox[0]  # width = right - left
-            line_height = bbox[3] - bbox[1] # height = bottom - top
-            # ----------------------
-            x = (img_width - line_width) / 2
-            draw_text_with_outline(draw, line, x, y_text, font, "white", "black")
-            y_text += line_height + 5 # Add a small gap between lines
-
-        # --- Bottom Text ---
-        bottom_lines = wrapper.wrap(bottom_text.upper())
-        # Calculate the total height of the bottom text block to position it correctly
-        total_bottom_text_height = sum([(font.getbbox(line)[3] - font.getbbox(line)[1]) + 5 for line in bottom_lines])
-        y_text = img_height - total_bottom_text_height - 15
-
-        for line in bottom_lines:
-            # --- THIS IS THE FIX ---
-            bbox = font.getbbox(line)
-            line_width = bbox[2] - bbox[0]
-            line_height = bbox[3] - bbox[1]
-            # ----------------------
-            x = (img_width - line_width) / 2
-            draw_text_with_outline(draw, line, x, y_text, font, "white", "black")
-            y_text += line_height + 5
+        # Templates are downloaded once and then read from the local image store
+        tracer = get_tracer()
+        image_store = image_store or default_image_store()
+        with tracer.span("template_load"):
+            img = image_store.get_image(image_url)
+            img.load()
+
+        # The shared renderer keeps fonts and text metrics cached between memes
+        from meme_renderer import get_renderer
+        renderer = get_renderer(font_path, font_size)
+        with tracer.span("render_meme"):
+            meme_bytes = renderer.render_bytes(img, top_text, bottom_text, format="PNG")
 
         # Save the final meme
-        img.save("meme.png")
-        print("\n Meme created successfully as meme.png!")
+        if output_path:
+            with tracer.span("save_meme"), open(output_path, "wb") as f:
+                f.write(meme_bytes)
+            print(f"\n Meme created successfully as {output_path}!")
+        return meme_bytes
 
     except Exception as e:
         print(f"An error occurred: {e}")
+        return None
 
 
 if __name__ == "__main__":
-    topic = input("Enter a topic for your meme: ")
+    topic = input("Enter a topic for your meme (start with '!' for a brand-new caption): ").strip()
     print("Generating a witty caption for your meme...")
-    caption = generate_meme_caption(topic)
+    caption = generate_meme_caption(topic.lstrip("!").strip(), fresh=topic.startswith("!"))
 
     if caption:
-        try:
-            top_text, bottom_text = caption.split('\n', 1)
-        except ValueError:
-            top_text = caption
-            bottom_text = ""
+        top_text, bottom_text = split_caption(caption)
 
         print(f"\nGenerated Caption:\nTop: {top_text}\nBottom: {bottom_text}\n")
 
@@ -122,6 +80,13 @@ if __name__ == "__main__":
         templates = get_popular_meme_templates()
 
         if templates:
+            # Download and decode the choices in the background while the user picks
+            threading.Thread(
+                target=default_image_store().prefetch_thumbnails,
+                args=(templates[:10],),
+                daemon=True
+            ).start()
+
             print("Please choose a meme template by entering its number:")
             for i, template in enumerate(templates[:10]):  # Display top 10 templates
                 print(f"{i+1}. {template['name']}")
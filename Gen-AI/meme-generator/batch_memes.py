@@ -0,0 +1,243 @@
+import os
+import re
+import sys
+import csv
+import json
+import time
+import random
+import asyncio
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.ratelimit import BATCH, get_scheduler, use_priority
+from common.core import map_bounded, memes, run_sync
+from meme_renderer import get_renderer
+from template_store import default_catalog, default_image_store
+
+# The interactive script's name starts with a digit, so it can't be imported with `import`
+meme_generator = importlib.import_module("01MemeGenerator")
+
+# --- Input ---
+
+def read_topics(csv_path: str) -> list:
+    """
+    Reads a CSV with a `topic` column and an optional `template` column
+    (template name or imgflip id) that pins a row to a template.
+    """
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        rows = [row for row in csv.DictReader(f) if (row.get("topic") or "").strip()]
+    return [{"topic": row["topic"].strip(), "template": (row.get("template") or "").strip()} for row in rows]
+
+# --- Template assignment ---
+
+def assign_templates(rows, templates, rule: str = "random", seed: int = None) -> list:
+    """
+    Picks a template for every row.
+
+    Rules:
+        random       - uniformly random template
+        round-robin  - cycle through the templates in catalog order
+        keyword      - template whose name shares the most words with the topic,
+                       random when nothing matches
+    A `template` value in the CSV always wins over the rule.
+    """
+    rng = random.Random(seed)
+    by_key = {}
+    for template in templates:
+        by_key[template["name"].lower()] = template
+        by_key[str(template.get("id", "")).lower()] = template
+    words = [set(re.findall(r"[a-z0-9]+", t["name"].lower())) for t in templates]
+
+    assigned = []
+    for i, row in enumerate(rows):
+        template = by_key.get(row["template"].lower()) if row["template"] else None
+        if template is None:
+            if rule == "round-robin":
+                template = templates[i % len(templates)]
+            elif rule == "keyword":
+                topic_words = set(re.findall(r"[a-z0-9]+", row["topic"].lower()))
+                overlap = [len(topic_words & w) for w in words]
+                best = max(overlap)
+                template = templates[overlap.index(best)] if best else rng.choice(templates)
+            else:
+                template = rng.choice(templates)
+        assigned.append(template)
+    return assigned
+
+# --- Stages ---
+
+async def caption_topic(topic, caption_fn=None):
+    """
+    Captions one topic at batch priority; a plain function `caption_fn` (an
+    offline stand-in) runs in a worker thread. Returns (caption, seconds).
+    """
+    start = time.perf_counter()
+    with use_priority(BATCH):
+        if caption_fn is None:
+            caption = await memes.meme_caption(topic)
+        else:
+            caption = await asyncio.to_thread(caption_fn, topic)
+    return caption, time.perf_counter() - start
+
+
+def render_meme_job(template_path, top_text, bottom_text, output_path, font_path, font_size):
+    """
+    Runs in a worker process: render one meme from a local template file.
+    """
+    from PIL import Image
+
+    start = time.perf_counter()
+    with Image.open(template_path) as img:
+        meme_bytes = get_renderer(font_path, font_size).render_bytes(img, top_text, bottom_text)
+    with open(output_path, "wb") as f:
+        f.write(meme_bytes)
+    return time.perf_counter() - start
+
+
+def slugify(text: str, limit: int = 40) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")[:limit] or "meme"
+
+# --- Batch driver ---
+
+def generate_memes(
+    rows,
+    output_dir: str,
+    rule: str = "random",
+    caption_workers: int = 8,
+    render_workers: int = None,
+    requests_per_minute: float = None,
+    font_path: str = "impact.ttf",
+    font_size: int = 50,
+    seed: int = None,
+    catalog=None,
+    image_store=None,
+    caption_fn=None
+) -> dict:
+    """
+    Generates one meme per row: up to `caption_workers` captions are requested
+    at once on the shared async engine, each finished caption is handed straight
+    to a process pool for rendering, and every result is recorded in
+    `manifest.jsonl`.
+
+    `requests_per_minute` resets the shared scheduler's request budget
+    (default: keep GENAI_RPM).
+
+    `catalog`, `image_store` and `caption_fn` default to the live imgflip/Gemini
+    versions and can be swapped for offline stand-ins (`caption_fn` is a plain
+    function of the topic).
+    """
+    catalog = catalog or default_catalog()
+    image_store = image_store or default_image_store()
+    os.makedirs(output_dir, exist_ok=True)
+    timings = {"templates": 0.0, "caption_wait": 0.0, "caption": 0.0, "render": 0.0}
+    counts = {"memes": 0, "failed": 0}
+    wall_start = time.perf_counter()
+
+    # Resolve templates and make sure every one we need is on local disk
+    start = time.perf_counter()
+    templates = catalog.get_templates()
+    if not templates:
+        raise RuntimeError("Could not fetch meme templates.")
+    assigned = assign_templates(rows, templates, rule, seed)
+    template_paths = {}
+    for template in assigned:
+        if template["url"] not in template_paths:
+            template_paths[template["url"]] = image_store.get_path(template["url"])
+    timings["templates"] = time.perf_counter() - start
+
+    scheduler = get_scheduler()
+    if requests_per_minute:
+        scheduler.set_rate(requests_per_minute=requests_per_minute)
+    waited_before = scheduler.stats()["wait_seconds"]
+    manifest_path = os.path.join(output_dir, "manifest.jsonl")
+
+    with ProcessPoolExecutor(render_workers) as renderers, \
+            open(manifest_path, "w", encoding="utf-8") as manifest:
+
+        render_futures = {}
+
+        def record(i, **fields):
+            entry = {"index": i, "topic": rows[i]["topic"], "template": assigned[i]["name"], **fields}
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+
+        async def caption_all():
+            async def caption_row(i):
+                return await caption_topic(rows[i]["topic"], caption_fn)
+
+            async for i, result, error in map_bounded(caption_row, range(len(rows)), caption_workers):
+                if error is not None:
+                    record(i, error=f"caption failed: {error}")
+                    counts["failed"] += 1
+                    continue
+                caption, took = result
+                timings["caption"] += took
+                top_text, bottom_text = meme_generator.split_caption(caption)
+                output_path = os.path.join(output_dir, f"{i:05d}_{slugify(rows[i]['topic'])}.png")
+                job = renderers.submit(
+                    render_meme_job, template_paths[assigned[i]["url"]], top_text, bottom_text,
+                    output_path, font_path, font_size
+                )
+                render_futures[job] = (i, top_text, bottom_text, output_path)
+
+        run_sync(caption_all())
+
+        # Time spent queued in the scheduler is reported apart from the model calls
+        timings["caption_wait"] = scheduler.stats()["wait_seconds"] - waited_before
+        timings["caption"] = max(0.0, timings["caption"] - timings["caption_wait"])
+
+        for future in as_completed(render_futures):
+            i, top_text, bottom_text, output_path = render_futures[future]
+            try:
+                timings["render"] += future.result()
+            except Exception as e:
+                record(i, top_text=top_text, bottom_text=bottom_text, error=f"render failed: {e}")
+                counts["failed"] += 1
+                continue
+            record(i, top_text=top_text, bottom_text=bottom_text, file=os.path.basename(output_path))
+            counts["memes"] += 1
+
+    wall = time.perf_counter() - wall_start
+    return {
+        **counts,
+        "wall_seconds": round(wall, 3),
+        "memes_per_second": round(counts["memes"] / wall, 2) if wall else 0.0,
+        "stage_seconds": {name: round(value, 3) for name, value in timings.items()},
+        "manifest": manifest_path
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate memes in bulk from a CSV of topics.")
+    parser.add_argument("csv_path", help="CSV with a 'topic' column and optional 'template' column")
+    parser.add_argument("--output-dir", default="memes_out")
+    parser.add_argument("--rule", default="random", choices=["random", "round-robin", "keyword"])
+    parser.add_argument("--caption-workers", type=int, default=8)
+    parser.add_argument("--render-workers", type=int, default=None, help="Render processes (default: CPU count)")
+    parser.add_argument("--rpm", type=float, default=None, help="Caption requests per minute (default: GENAI_RPM)")
+    parser.add_argument("--font", default="impact.ttf")
+    parser.add_argument("--font-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    topics = read_topics(args.csv_path)
+    print(f"Generating {len(topics)} memes...")
+    summary = generate_memes(
+        topics,
+        args.output_dir,
+        rule=args.rule,
+        caption_workers=args.caption_workers,
+        render_workers=args.render_workers,
+        requests_per_minute=args.rpm,
+        font_path=args.font,
+        font_size=args.font_size,
+        seed=args.seed
+    )
+    print(f"\nDone: {summary['memes']} memes, {summary['failed']} failed in {summary['wall_seconds']}s "
+          f"({summary['memes_per_second']} memes/s)")
+    for stage, seconds in summary["stage_seconds"].items():
+        print(f"  {stage:<14}{seconds:>9.2f}s")
+    print(f"Manifest: {summary['manifest']}")
@@ -0,0 +1,138 @@
+import textwrap
+import functools
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+
+class MemeRenderer:
+    """
+    Reusable meme text renderer.
+
+    Loaded fonts and per-line text metrics are cached on the instance, the
+    outline is drawn in one pass with Pillow's `stroke_width`, and the font size
+    is shrunk (binary search) until the longest line fits the image width.
+    Create one renderer and reuse it for every meme.
+    """
+
+    def __init__(
+        self,
+        font_path: str = "impact.ttf",
+        max_font_size: int = 50,
+        min_font_size: int = 12,
+        wrap_width: int = 25,
+        margin: int = 10,
+        line_spacing: int = 5,
+        stroke_width: int = 2
+    ):
+        self.font_path = font_path
+        self.max_font_size = max_font_size
+        self.min_font_size = min_font_size
+        self.wrap_width = wrap_width
+        self.margin = margin
+        self.line_spacing = line_spacing
+        self.stroke_width = stroke_width
+        self._wrapper = textwrap.TextWrapper(width=wrap_width)
+        self._warned_about_font = False
+        self.font = functools.lru_cache(maxsize=64)(self._load_font)
+        self.line_size = functools.lru_cache(maxsize=4096)(self._measure_line)
+
+    # --- Cached resources ---
+
+    def _load_font(self, size: int):
+        try:
+            return ImageFont.truetype(self.font_path, size)
+        except IOError:
+            # If Impact font is not found, use the default font
+            if not self._warned_about_font:
+                print("Impact font not found. Using default font.")
+                self._warned_about_font = True
+            return ImageFont.load_default(size=size)
+
+    def _measure_line(self, line: str, size: int):
+        """Returns (width, height) of one line, including the outline."""
+        left, top, right, bottom = self.font(size).getbbox(line, stroke_width=self.stroke_width)
+        return right - left, bottom - top
+
+    # --- Layout ---
+
+    def wrap(self, text: str) -> list:
+        return self._wrapper.wrap(text.upper()) if text else []
+
+    def fit_font_size(self, lines, img_width: int) -> int:
+        """
+        Largest font size (between min and max) at which every line fits
+        inside the image width.
+        """
+        available = img_width - 2 * self.margin
+        low, high = self.min_font_size, self.max_font_size
+        best = low
+        while low <= high:
+            mid = (low + high) // 2
+            if all(self.line_size(line, mid)[0] <= available for line in lines):
+                best = mid
+                low = mid + 1
+            else:
+                high = mid - 1
+        return best
+
+    # --- Rendering ---
+
+    def render(self, img: Image.Image, top_text: str, bottom_text: str) -> Image.Image:
+        """
+        Draws the captions onto a copy of `img` and returns it.
+        """
+        img = img.convert("RGB") if img.mode not in ("RGB", "RGBA") else img.copy()
+        draw = ImageDraw.Draw(img)
+        img_width, img_height = img.size
+
+        top_lines = self.wrap(top_text)
+        bottom_lines = self.wrap(bottom_text)
+        size = self.fit_font_size(top_lines + bottom_lines, img_width)
+        font = self.font(size)
+
+        # --- Top Text ---
+        y_text = self.margin
+        for line in top_lines:
+            line_width, line_height = self.line_size(line, size)
+            self._draw_line(draw, line, (img_width - line_width) / 2, y_text, font)
+            y_text += line_height + self.line_spacing
+
+        # --- Bottom Text ---
+        total_bottom_text_height = sum(self.line_size(line, size)[1] + self.line_spacing for line in bottom_lines)
+        y_text = img_height - total_bottom_text_height - 15
+        for line in bottom_lines:
+            line_width, line_height = self.line_size(line, size)
+            self._draw_line(draw, line, (img_width - line_width) / 2, y_text, font)
+            y_text += line_height + self.line_spacing
+
+        return img
+
+    def _draw_line(self, draw, line, x, y, font):
+        draw.text(
+            (x, y), line, font=font, fill="white",
+            stroke_width=self.stroke_width, stroke_fill="black"
+        )
+
+    def render_bytes(self, img: Image.Image, top_text: str, bottom_text: str, format: str = "PNG") -> bytes:
+        """
+        Renders the meme and returns the encoded image without touching disk.
+        """
+        meme = self.render(img, top_text, bottom_text)
+        if format.upper() == "JPEG" and meme.mode == "RGBA":
+            meme = meme.convert("RGB")
+        buffer = BytesIO()
+        meme.save(buffer, format=format)
+        return buffer.getvalue()
+
+
+_renderers = {}
+
+def get_renderer(font_path: str = "impact.ttf", max_font_size: int = 50) -> MemeRenderer:
+    """
+    Returns a shared renderer for this font, so its caches survive between memes.
+    """
+    key = (font_path, max_font_size)
+    if key not in _renderers:
+        _renderers[key] = MemeRenderer(font_path=font_path, max_font_size=max_font_size)
+    return _renderers[key]
@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from io import BytesIO
+from collections import namedtuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.cache import DEFAULT_CACHE_DIR
+
+IMGFLIP_MEMES_URL = os.getenv("IMGFLIP_MEMES_URL", "https://api.imgflip.com/get_memes")
+MEME_CACHE_DIR = os.getenv("MEME_CACHE_DIR", os.path.join(DEFAULT_CACHE_DIR, "memes"))
+
+FetchResult = namedtuple("FetchResult", ["status", "headers", "content"])
+
+# --- Fetchers ---
+
+class HttpFetcher:
+    """
+    Fetches URLs through one pooled `requests.Session`, so keep-alive connections
+    to imgflip are reused across the catalog and every template download.
+    """
+
+    def __init__(self, pool_size: int = 8, timeout: float = 15):
+        # requests (and urllib3) load with the first fetcher, not with the app
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def fetch(self, url: str, headers: dict = None) -> FetchResult:
+        response = self.session.get(url, headers=headers or {}, timeout=self.timeout)
+        return FetchResult(response.status_code, dict(response.headers), response.content)
+
+
+class LocalFetcher:
+    """
+    Offline stand-in for `HttpFetcher`. Serves `catalog.json` for the imgflip
+    catalog URL and any other URL from `root` by its file name.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.requests = 0
+
+    def fetch(self, url: str, headers: dict = None) -> FetchResult:
+        self.requests += 1
+        name = "catalog.json" if url == IMGFLIP_MEMES_URL else url.rstrip("/").rsplit("/", 1)[-1]
+        path = os.path.join(self.root, name)
+        if not os.path.exists(path):
+            return FetchResult(404, {}, b"")
+        with open(path, "rb") as f:
+            content = f.read()
+        etag = '"' + hashlib.sha256(content).hexdigest()[:16] + '"'
+        if headers and headers.get("If-None-Match") == etag:
+            return FetchResult(304, {"ETag": etag}, b"")
+        return FetchResult(200, {"ETag": etag}, content)
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+# --- Template catalog ---
+
+class TemplateCatalog:
+    """
+    Local copy of the imgflip template list.
+
+    Within `ttl` seconds the saved copy is used without any request. After that
+    it is revalidated with If-None-Match / If-Modified-Since, so an unchanged
+    catalog costs one empty 304 response. If imgflip can't be reached the stale
+    copy is served.
+    """
+
+    def __init__(self, cache_dir: str = MEME_CACHE_DIR, fetcher=None, ttl: float = 24 * 3600, url: str = IMGFLIP_MEMES_URL):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "catalog.json")
+        self.fetcher = fetcher or HttpFetcher()
+        self.ttl = ttl
+        self.url = url
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, entry):
+        _write_atomic(self.path, json.dumps(entry).encode("utf-8"))
+
+    def get_templates(self, force_refresh: bool = False):
+        with self._lock:
+            entry = self._load()
+            if entry and not force_refresh and time.time() - entry["fetched_at"] < self.ttl:
+                return entry["memes"]
+
+            headers = {}
+            if entry and entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry and entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+            try:
+                result = self.fetcher.fetch(self.url, headers)
+            except Exception:
+                return entry["memes"] if entry else None
+
+            if result.status == 304 and entry:
+                entry["fetched_at"] = time.time()
+                self._save(entry)
+                return entry["memes"]
+            if result.status != 200:
+                return entry["memes"] if entry else None
+
+            memes = json.loads(result.content)["data"]["memes"]
+            self._save({
+                "fetched_at": time.time(),
+                "etag": result.headers.get("ETag"),
+                "last_modified": result.headers.get("Last-Modified"),
+                "memes": memes
+            })
+            return memes
+
+# --- Template images ---
+
+class ImageStore:
+    """
+    Content-addressed on-disk store for template images.
+
+    Images are saved under the SHA-256 of their bytes and looked up through a
+    URL -> hash index, so a template is downloaded once and every later meme on
+    it is served from disk. Picker thumbnails are decoded once and saved
+    alongside the originals.
+    """
+
+    def __init__(self, cache_dir: str = MEME_CACHE_DIR, fetcher=None):
+        self.image_dir = os.path.join(cache_dir, "images")
+        self.thumb_dir = os.path.join(cache_dir, "thumbnails")
+        os.makedirs(self.image_dir, exist_ok=True)
+        os.makedirs(self.thumb_dir, exist_ok=True)
+        self.index_path = os.path.join(self.image_dir, "index.json")
+        self.fetcher = fetcher or HttpFetcher()
+        self._lock = threading.Lock()
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.image_dir, digest[:2], digest)
+
+    def get_path(self, url: str) -> str:
+        """
+        Returns the local path of the image at `url`, downloading it only if it
+        has never been stored.
+        """
+        with self._lock:
+            digest = self._index.get(url)
+        if digest and os.path.exists(self._blob_path(digest)):
+            return self._blob_path(digest)
+
+        result = self.fetcher.fetch(url)
+        if result.status != 200:
+            raise IOError(f"Could not download template image ({result.status}): {url}")
+        digest = hashlib.sha256(result.content).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_atomic(path, result.content)
+
+        with self._lock:
+            self._index[url] = digest
+            _write_atomic(self.index_path, json.dumps(self._index).encode("utf-8"))
+        return path
+
+    def get_bytes(self, url: str) -> bytes:
+        with open(self.get_path(url), "rb") as f:
+            return f.read()
+
+    def get_image(self, url: str):
+        """Returns the template as an opened PIL image."""
+        from PIL import Image
+        return Image.open(BytesIO(self.get_bytes(url)))
+
+    def thumbnail_path(self, url: str, size=(160, 160)) -> str:
+        """
+        Returns a small pre-decoded PNG of the template for pickers.
+        """
+        source = self.get_path(url)
+        path = os.path.join(self.thumb_dir, f"{os.path.basename(source)}_{size[0]}x{size[1]}.png")
+        if not os.path.exists(path):
+            from PIL import Image
+            with Image.open(source) as img:
+                img.draft("RGB", size)
+                thumb = img.convert("RGB")
+                thumb.thumbnail(size)
+                buffer = BytesIO()
+                thumb.save(buffer, format="PNG")
+            _write_atomic(path, buffer.getvalue())
+        return path
+
+    def prefetch_thumbnails(self, templates, size=(160, 160)):
+        """
+        Warms the store for the given templates. Failures are skipped; the
+        template will simply be downloaded again when it is used.
+        """
+        for template in templates:
+            try:
+                self.thumbnail_path(template["url"], size)
+            except Exception:
+                pass
+
+# --- Shared instances ---
+
+_defaults = {}
+_defaults_lock = threading.Lock()
+
+def _default(name, factory):
+    with _defaults_lock:
+        if name not in _defaults:
+            _defaults[name] = factory()
+        return _defaults[name]
+
+def default_fetcher() -> HttpFetcher:
+    return _default("fetcher", HttpFetcher)
+
+def default_catalog() -> TemplateCatalog:
+    return _default("catalog", lambda: TemplateCatalog(fetcher=default_fetcher()))
+
+def default_image_store() -> ImageStore:
+    return _default("image_store", lambda: ImageStore(fetcher=default_fetcher()))
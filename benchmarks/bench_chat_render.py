@@ -0,0 +1,68 @@
+"""
+Chatbot rerun time at 10, 100 and 1,000 messages: the original loop that
+renders every message as a chat bubble versus the incremental
+`TranscriptRenderer` (recent bubbles + one cached Markdown block per page).
+
+Runs the transcript through Streamlit's headless `AppTest`, so no browser or
+server is needed. The time includes building the element tree Streamlit would
+send to the browser, but not the browser's own layout work.
+
+    python benchmarks/bench_chat_render.py --reruns 5
+"""
+import os
+import sys
+import time
+import argparse
+
+CHATBOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Gen-AI", "character-chatbot"))
+
+
+def transcript_app(mode: str, count: int, chatbot_dir: str):
+    # Runs as a standalone Streamlit script: everything it needs is imported here
+    import sys
+    import streamlit as st
+    sys.path.append(chatbot_dir)
+    from transcript import TranscriptRenderer
+
+    if "messages" not in st.session_state:
+        st.session_state.messages = [
+            {"id": i, "role": "user" if i % 2 else "assistant",
+             "content": f"Message {i}: " + "a few words of chat with some *markdown* in it " * 3}
+            for i in range(count)
+        ]
+        st.session_state.renderer = TranscriptRenderer()
+
+    if mode == "loop":
+        for message in st.session_state.messages:
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+    else:
+        st.session_state.renderer.render(st, st.session_state.messages)
+
+
+def rerun_seconds(mode: str, count: int, reruns: int) -> float:
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_function(transcript_app, args=(mode, count, CHATBOT_DIR), default_timeout=120)
+    app.run() # first run builds the session state
+    start = time.perf_counter()
+    for _ in range(reruns):
+        app.run()
+    return (time.perf_counter() - start) / reruns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--reruns", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'messages':>9}{'loop (ms/rerun)':>18}{'incremental (ms/rerun)':>25}{'speedup':>10}")
+    for count in args.sizes:
+        before = rerun_seconds("loop", count, args.reruns) * 1000
+        after = rerun_seconds("incremental", count, args.reruns) * 1000
+        print(f"{count:>9}{before:>18.1f}{after:>25.1f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
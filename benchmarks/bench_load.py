@@ -0,0 +1,328 @@
+"""
+Load test of every app against the offline stub APIs (benchmarks/stub_server.py).
+
+Each scenario drives the app's own entry point from `--concurrency` threads:
+  lesson    generate_lesson_plan (lesson planner)
+  caption   preprocess_image + captions.styled_captions (image captioner)
+  chat      one ConversationMemory turn (character chatbot)
+  meme      generate_meme_caption + template fetch + create_meme (meme generator)
+  research  run_research on the OpenAI-compatible stub (needs crewai)
+
+and reports throughput, p50/p99 latency and how much RSS grew while the
+scenario ran (sampled from /proc on Linux). Every scenario runs in its own
+process against the same stub, so its memory isn't skewed by the others. Save a run as the
+baseline and compare later runs against it to catch regressions before deploy:
+
+    python benchmarks/bench_load.py --requests 50 --concurrency 8 --save baseline.json
+    python benchmarks/bench_load.py --requests 50 --concurrency 8 --baseline baseline.json   # exits 1 on regression
+"""
+import gc
+import io
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import argparse
+import importlib
+import threading
+import subprocess
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+for app_dir in ("Gen-AI/lesson-plan-generator", "Gen-AI/image-caption-generator", "Gen-AI/character-chatbot",
+                "Gen-AI/meme-generator", "Clarifai"):
+    sys.path.append(os.path.join(ROOT, app_dir))
+
+from stub_server import StubServer
+
+SCENARIOS = ("lesson", "caption", "chat", "meme", "research")
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+# RSS growth below this is noise, not a regression
+MEMORY_NOISE_MB = 5.0
+
+def current_rss_mb():
+    """Resident memory of this process right now, or None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class RssSampler:
+    """
+    Samples the process RSS every `interval` seconds inside the `with` block, so
+    each scenario reports its own peak instead of the process-wide high-water
+    mark (`ru_maxrss`) left by earlier scenarios.
+    """
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.start_mb = self.peak_mb = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, current_rss_mb() or 0.0)
+
+    def __enter__(self):
+        gc.collect()
+        self.start_mb = self.peak_mb = current_rss_mb()
+        if self.start_mb is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start_mb is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak_mb = max(self.peak_mb, current_rss_mb() or 0.0)
+
+    @property
+    def growth_mb(self):
+        return None if self.start_mb is None else self.peak_mb - self.start_mb
+
+# --- Scenarios ---
+# Each builder returns `call(i)`; every i asks for something new so the
+# response cache never answers for the stub.
+
+def lesson_scenario(stub, workdir):
+    import lesson_planner
+
+    def call(i):
+        return lesson_planner.generate_lesson_plan(f"Load test topic {i}", "5th Grade", "45 minutes", "Visual")
+    return call
+
+def caption_scenario(stub, workdir):
+    from PIL import Image
+    from common.core import captions, run_sync
+    from common.images import preprocess_image
+    from common.models import DEFAULT_MODEL, get_model
+
+    model = get_model(DEFAULT_MODEL)
+
+    def call(i):
+        # What the app does with an upload: downscale it, then caption the blob in the chosen styles
+        upload = io.BytesIO()
+        Image.new("RGB", (640, 480), (i % 256, (i * 7) % 256, (i * 13) % 256)).save(upload, format="PNG")
+        upload.seek(0)
+        prepared = preprocess_image(upload)
+        return run_sync(captions.styled_captions(model, prepared.blob, ["descriptive"]))
+    return call
+
+def chat_scenario(stub, workdir):
+    from conversation_memory import ConversationMemory
+    from common.models import DEFAULT_MODEL, get_model
+
+    persona = "You are Ada Lovelace. Stay in character and answer in a few sentences."
+    model = get_model(DEFAULT_MODEL, persona)
+    sessions = threading.local() # one conversation per simulated user
+
+    def call(i):
+        if not hasattr(sessions, "memory"):
+            sessions.memory = ConversationMemory(model, persona=persona)
+        return sessions.memory.send_message(f"Tell me about your work, question {i}").text
+    return call
+
+def meme_scenario(stub, workdir):
+    from template_store import ImageStore, TemplateCatalog
+    meme_generator = importlib.import_module("01MemeGenerator")
+
+    catalog = TemplateCatalog(cache_dir=os.path.join(workdir, "memes"), url=f"{stub.url}/get_memes")
+    image_store = ImageStore(cache_dir=os.path.join(workdir, "memes"))
+
+    def call(i):
+        top, bottom = meme_generator.split_caption(meme_generator.generate_meme_caption(f"load test topic {i}", fresh=True))
+        templates = meme_generator.get_popular_meme_templates(catalog)
+        template = templates[i % len(templates)]
+        meme = meme_generator.create_meme(template["url"], top, bottom, image_store=image_store, output_path=None)
+        if meme is None:
+            raise RuntimeError("create_meme failed")
+        return meme
+    return call
+
+def research_scenario(stub, workdir):
+    try:
+        ai_agent = importlib.import_module("02ai_agent")
+    except ImportError as e:
+        raise RuntimeError(f"needs crewai ({e})")
+    llm = ai_agent.setup_llm(base_url=f"{stub.url}/v1", model="openai/stub-model", api_key="local-stub")
+
+    def call(i):
+        return ai_agent.run_research(f"Load test topic {i}", ai_agent.create_research_agent(llm))
+    return call
+
+BUILDERS = {
+    "lesson": lesson_scenario,
+    "caption": caption_scenario,
+    "chat": chat_scenario,
+    "meme": meme_scenario,
+    "research": research_scenario,
+}
+
+# --- Runner ---
+
+def run_scenario(name: str, call, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = []
+
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            call(i)
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+
+    # Runs of the same scenario must not share prompts, or later runs hit the cache
+    offset = random.randrange(1_000_000_000)
+    # One untimed request first, so lazy imports and first-use setup (fonts,
+    # template downloads) don't depend on which scenarios ran before
+    try:
+        call(offset - 1)
+    except Exception:
+        pass
+    with RssSampler() as memory:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(timed, range(offset, offset + requests)))
+        seconds = time.perf_counter() - start
+    return {
+        "scenario": name,
+        "requests": requests,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "throughput": len(latencies) / seconds if seconds else 0.0,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "peak_rss_mb": memory.peak_mb,
+        "rss_growth_mb": memory.growth_mb,
+    }
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """Returns a message for every metric worse than the baseline by more than `tolerance`."""
+    regressions = []
+    for result in results:
+        before = baseline.get(result["scenario"])
+        if not before or "skipped" in result or "skipped" in before:
+            continue
+        if result["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: throughput {result['throughput']:.2f}/s "
+                               f"(baseline {before['throughput']:.2f}/s)")
+        if result["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: p99 {result['p99_ms']:.0f} ms (baseline {before['p99_ms']:.0f} ms)")
+        growth, before_growth = result.get("rss_growth_mb"), before.get("rss_growth_mb")
+        if growth is not None and before_growth is not None and growth > max(
+                before_growth * (1 + tolerance), before_growth + MEMORY_NOISE_MB):
+            regressions.append(f"{result['scenario']}: RSS grew {growth:.1f} MB (baseline {before_growth:.1f} MB)")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{result['scenario']}: {result['errors']} errors (baseline {before['errors']})")
+    return regressions
+
+def run_child(args):
+    """
+    Runs one scenario against the stub at `args.stub_url` in this process and
+    prints its result as JSON (the parent runs every scenario this way, so each
+    one's memory is measured on its own).
+    """
+    name = args.scenarios[0]
+    # Point the SDK at the stub; the apps' own configure() calls are then no-ops
+    os.environ["GEMINI_API_ENDPOINT"] = args.stub_url
+    os.environ["GEMINI_API_KEY"] = "stub"
+    from common.models import configure, sdk
+    configure()
+    sdk()
+
+    try:
+        call = BUILDERS[name](SimpleNamespace(url=args.stub_url), os.environ["GENAI_CACHE_DIR"])
+    except Exception as e:
+        print(json.dumps({"scenario": name, "skipped": f"skipped: {e}"}))
+        return
+    import common.cache as cache
+    import common.ratelimit as ratelimit
+    cache._default_cache = cache.ResponseCache(path=":memory:")
+    # Measure the apps, not the client-side rate limit; retries still apply
+    ratelimit._scheduler = ratelimit.ModelScheduler(requests_per_minute=1_000_000, tokens_per_minute=1e12,
+                                                    base_delay=0.1, max_delay=2)
+    print(json.dumps(run_scenario(name, call, args.requests, args.concurrency)))
+
+def run_isolated(name: str, stub, args) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--scenarios", name, "--stub-url", stub.url,
+               "--requests", str(args.requests), "--concurrency", str(args.concurrency)]
+    process = subprocess.run(command, capture_output=True, text=True)
+    lines = process.stdout.strip().splitlines()
+    if process.returncode != 0 or not lines:
+        error = (process.stderr.strip().splitlines() or [f"exit code {process.returncode}"])[-1]
+        return {"scenario": name, "skipped": f"failed: {error}"}
+    # Anything before the result line is the app's own output
+    return json.loads(lines[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=40, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", default="lognormal:0.2,0.4", help="Stub latency distribution (see stub_server.py)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of stub requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of stub requests answered with 503")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a saved run and exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown vs. the baseline")
+    parser.add_argument("--stub-url", help=argparse.SUPPRESS) # set for the per-scenario child processes
+    args = parser.parse_args()
+
+    if args.stub_url:
+        run_child(args)
+        return
+
+    stub = StubServer(latency=args.latency, chunk_delay=0.01, rate_limit_rate=args.rate_limit_rate,
+                      error_rate=args.error_rate, retry_after=0.2, seed=args.seed).start()
+    os.environ["GENAI_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_load_")
+
+    print(f"Stub at {stub.url}, latency {args.latency}, {args.requests} requests per scenario, "
+          f"concurrency {args.concurrency}, one process per scenario\n")
+    print(f"{'scenario':<10}{'req/s':>8}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'RSS growth MB':>15}{'peak RSS MB':>13}")
+    results = []
+    for name in args.scenarios:
+        result = run_isolated(name, stub, args)
+        results.append(result)
+        if "skipped" in result:
+            print(f"{name:<10}  {result['skipped']}")
+            continue
+        memory = (f"{result['rss_growth_mb']:>15.1f}{result['peak_rss_mb']:>13.1f}"
+                  if result["rss_growth_mb"] is not None else f"{'n/a':>15}{'n/a':>13}")
+        print(f"{name:<10}{result['throughput']:>8.2f}{result['p50_ms']:>9.0f}{result['p99_ms']:>9.0f}"
+              f"{result['errors']:>8}" + memory)
+        if result["first_error"]:
+            print(f"{'':<10}  first error: {result['first_error']}")
+    print(f"\nStub requests: {json.dumps(stub.counts, sort_keys=True)}")
+    stub.stop()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({result["scenario"]: result for result in results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Renders 1,000 memes against a local template set, comparing the original
+`create_meme` drawing code with the cached `MemeRenderer`.
+
+Templates are generated into a temporary folder and served through the
+offline `LocalFetcher`, so no network is used.
+
+    python benchmarks/bench_meme_render.py --memes 1000 --font /path/to/impact.ttf
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import textwrap
+from io import BytesIO
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Gen-AI", "meme-generator")))
+
+from PIL import Image, ImageDraw, ImageFont
+from meme_renderer import MemeRenderer
+from template_store import ImageStore, LocalFetcher
+
+CAPTIONS = [
+    ("When the code works on the first try", "Suspicious but I'll take it"),
+    ("Me explaining recursion", "To someone explaining recursion"),
+    ("Nobody:", "Absolutely nobody: the build server at 3am"),
+    ("One does not simply", "Deploy on a Friday"),
+    ("Tests passing locally", "CI has other plans"),
+]
+
+
+def make_templates(folder: str, count: int):
+    rng = random.Random(0)
+    memes = []
+    for i in range(count):
+        size = rng.choice([(500, 500), (600, 400), (800, 600), (1200, 900)])
+        color = tuple(rng.randrange(256) for _ in range(3))
+        name = f"template_{i}.jpg"
+        Image.new("RGB", size, color).save(os.path.join(folder, name), quality=90)
+        memes.append({"name": f"Template {i}", "url": f"https://i.imgflip.com/{name}"})
+    with open(os.path.join(folder, "catalog.json"), "w") as f:
+        json.dump({"data": {"memes": memes}}, f)
+    return memes
+
+
+def legacy_render(img, top_text, bottom_text, font_path, font_size=50) -> bytes:
+    """The drawing code `create_meme` used before MemeRenderer, minus the download."""
+    draw = ImageDraw.Draw(img)
+    try:
+        font = ImageFont.truetype(font_path, font_size)
+    except IOError:
+        font = ImageFont.load_default(size=font_size)
+    img_width, img_height = img.size
+
+    def draw_text_with_outline(text, x, y):
+        for dx, dy in ((-2, -2), (2, -2), (-2, 2), (2, 2)):
+            draw.text((x + dx, y + dy), text, font=font, fill="black")
+        draw.text((x, y), text, font=font, fill="white")
+
+    wrapper = textwrap.TextWrapper(width=25)
+    y_text = 10
+    for line in wrapper.wrap(top_text.upper()):
+        bbox = font.getbbox(line)
+        draw_text_with_outline(line, (img_width - (bbox[2] - bbox[0])) / 2, y_text)
+        y_text += bbox[3] - bbox[1] + 5
+    bottom_lines = wrapper.wrap(bottom_text.upper())
+    total = sum([(font.getbbox(line)[3] - font.getbbox(line)[1]) + 5 for line in bottom_lines])
+    y_text = img_height - total - 15
+    for line in bottom_lines:
+        bbox = font.getbbox(line)
+        draw_text_with_outline(line, (img_width - (bbox[2] - bbox[0])) / 2, y_text)
+        y_text += bbox[3] - bbox[1] + 5
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def run(label, render_one, jobs):
+    start = time.perf_counter()
+    for template_url, top, bottom in jobs:
+        render_one(template_url, top, bottom)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34}{elapsed:>8.2f}s{len(jobs) / elapsed:>10.1f} memes/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Meme rendering benchmark")
+    parser.add_argument("--memes", type=int, default=1000)
+    parser.add_argument("--templates", type=int, default=20)
+    parser.add_argument("--font", default="impact.ttf", help="TrueType font (falls back to Pillow's default font)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        source = os.path.join(folder, "source")
+        os.makedirs(source)
+        templates = make_templates(source, args.templates)
+        fetcher = LocalFetcher(source)
+        store = ImageStore(os.path.join(folder, "cache"), fetcher=fetcher)
+
+        rng = random.Random(1)
+        jobs = [(rng.choice(templates)["url"], *rng.choice(CAPTIONS)) for _ in range(args.memes)]
+
+        renderer = MemeRenderer(font_path=args.font)
+        # Warm the image store so both runs read templates from local disk
+        for template in templates:
+            store.get_path(template["url"])
+
+        print(f"{args.memes} memes over {args.templates} templates")
+        run("legacy (5-pass outline, no cache)", lambda url, t, b: legacy_render(store.get_image(url), t, b, args.font), jobs)
+        run("MemeRenderer", lambda url, t, b: renderer.render_bytes(store.get_image(url), t, b), jobs)
+        print(f"template downloads: {fetcher.requests}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Per-call overhead of building a fresh `GenerativeModel` (the old pattern in every
+app) versus looking it up in the shared registry.
+
+No network calls are made: this measures only the client-side cost paid before
+each request goes out.
+
+    python benchmarks/bench_model_registry.py --calls 5000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import google.generativeai as genai
+from common.models import DEFAULT_MODEL, get_model, clear
+
+PERSONA = (
+    "You are Albert Einstein. Respond as if you are the brilliant physicist, thoughtful, sometimes "
+    "whimsical, and always curious about the universe. Use scientific analogies where appropriate, "
+    "but explain them simply. You appreciate deep questions and can be a bit philosophical."
+)
+
+
+def per_call_microseconds(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args()
+
+    genai.configure(api_key="benchmark-key")
+    clear()
+
+    cases = [
+        ("plain model", None),
+        ("model + persona", PERSONA),
+    ]
+    print(f"{'case':<18}{'fresh (us/call)':>18}{'registry (us/call)':>21}{'speedup':>10}")
+    for label, instruction in cases:
+        before = per_call_microseconds(
+            lambda: genai.GenerativeModel(model_name=DEFAULT_MODEL, system_instruction=instruction),
+            args.calls
+        )
+        after = per_call_microseconds(lambda: get_model(DEFAULT_MODEL, instruction), args.calls)
+        print(f"{label:<18}{before:>18.2f}{after:>21.2f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
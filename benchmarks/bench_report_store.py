@@ -0,0 +1,75 @@
+"""
+Research report archive at scale: insert rate, full-text search and lookup
+latency, and on-disk size with `--reports` synthetic reports.
+
+    python benchmarks/bench_report_store.py --reports 100000
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Clarifai")))
+
+from report_store import ReportStore
+
+VOCABULARY_SIZE = 5000
+
+
+def words(rng: random.Random, vocabulary: list, count: int) -> str:
+    # Zipf-like: a few common words, a long tail of rare ones
+    return " ".join(vocabulary[min(int(rng.paretovariate(1.1)) - 1, len(vocabulary) - 1)] for _ in range(count))
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reports", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=400, help="Words per report")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [f"term{i}" for i in range(VOCABULARY_SIZE)]
+    rng.shuffle(vocabulary)
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_reports_"), "reports.sqlite3")
+    store = ReportStore(path)
+
+    start = time.perf_counter()
+    topics = []
+    for i in range(args.reports):
+        topic = words(rng, vocabulary[:500], 3)
+        topics.append(topic)
+        store.add(topic, words(rng, vocabulary, args.words), model="bench", duration=rng.uniform(30, 300),
+                  prompt_tokens=rng.randint(500, 3000), output_tokens=rng.randint(500, 3000))
+    insert_seconds = time.perf_counter() - start
+
+    def timed(fn, inputs):
+        latencies = []
+        for value in inputs:
+            started = time.perf_counter()
+            fn(value)
+            latencies.append((time.perf_counter() - started) * 1000)
+        return percentile(latencies, 0.5), percentile(latencies, 0.99)
+
+    queries = [" ".join(rng.sample(vocabulary[:2000], rng.randint(1, 3))) for _ in range(args.queries)]
+    ids = [rng.randint(1, args.reports) for _ in range(args.queries)]
+    search = timed(lambda query: store.search(query, 10), queries)
+    get = timed(store.get, ids)
+    latest = timed(store.latest_for_topic, rng.sample(topics, min(args.queries, len(topics))))
+    stats = store.stats()
+
+    print(f"{args.reports} reports inserted in {insert_seconds:.1f}s ({args.reports / insert_seconds:.0f}/s)")
+    print(f"on disk: {os.path.getsize(path) / 1e6:.1f} MB database; report text {stats['text_bytes'] / 1e6:.1f} MB "
+          f"stored as {stats['stored_bytes'] / 1e6:.1f} MB ({stats['compression_ratio']:.1f}x)")
+    print(f"{'operation':<22}{'p50 ms':>9}{'p99 ms':>9}")
+    for name, (p50, p99) in (("search (top 10)", search), ("get by id", get), ("latest for topic", latest)):
+        print(f"{name:<22}{p50:>9.2f}{p99:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Semantic cache lookup cost and hit rate as the number of stored topics grows.
+
+Fills an in-memory `SemanticCache` with synthetic research topics, then looks
+up reworded versions of stored topics ("<topic> trends", "latest developments
+in <topic>", ...) and unrelated ones. Reports lookup latency and how many
+rewordings were served from the cache (and how many unrelated topics wrongly were).
+
+    python benchmarks/bench_semantic_cache.py --sizes 100 1000 5000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common.semantic_cache import SemanticCache
+
+SUBJECTS = ("quantum", "solar", "battery", "protein", "neural", "satellite", "vaccine", "graphene", "fusion",
+            "microbiome", "blockchain", "robotics", "ocean", "soil", "urban", "language", "climate", "gene")
+OBJECTS = ("computing", "storage", "folding", "networks", "imaging", "therapy", "materials", "policy",
+           "sensors", "farming", "mobility", "models", "security", "manufacturing", "forecasting", "editing")
+REWORDINGS = ("{} trends", "latest developments in {}", "{} overview", "The future of {}", "{} News")
+
+
+def topics(count: int, rng: random.Random) -> list:
+    result = set()
+    while len(result) < count:
+        words = rng.sample(SUBJECTS, 2) + [rng.choice(OBJECTS)]
+        result.add(" ".join(words[:rng.randint(2, 3)]))
+    return sorted(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 3000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'entries':>8}{'lookup ms':>11}{'reworded hits':>15}{'false hits':>12}")
+    for size in args.sizes:
+        stored = topics(size, rng)
+        cache = SemanticCache("bench", path=":memory:")
+        for topic in stored:
+            cache.add(topic, f"report on {topic}")
+
+        reworded = [rng.choice(REWORDINGS).format(rng.choice(stored)) for _ in range(args.queries)]
+        unrelated = [f"history of {rng.choice(['jazz', 'the printing press', 'rome', 'chess'])} {i}"
+                     for i in range(args.queries)]
+        start = time.perf_counter()
+        hits = sum(cache.lookup(query) is not None for query in reworded)
+        false_hits = sum(cache.lookup(query) is not None for query in unrelated)
+        per_lookup = (time.perf_counter() - start) / (2 * args.queries) * 1000
+        print(f"{size:>8}{per_lookup:>11.2f}{hits / args.queries:>15.0%}{false_hits / args.queries:>12.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Cold-start stampede: many sessions submit the same lesson topic at once.
+
+Each "session" is a thread calling `cached_generate` on an empty cache with a
+fake model that takes `--latency` seconds per call. Without coalescing every
+session would pay for its own call; with it they share one.
+
+    python benchmarks/bench_singleflight.py --sessions 30 --topics 3
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common.cache import ResponseCache, cached_generate
+from common.ratelimit import ModelScheduler
+import common.ratelimit as ratelimit
+from common.singleflight import get_singleflight
+
+
+class SlowModel:
+    model_name = "fake-slow"
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, contents, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return type("Response", (), {"text": f"plan for {contents}", "usage_metadata": None})()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--topics", type=int, default=1, help="Distinct prompts shared by the sessions")
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    # Don't let the default rate limits throttle the fake model
+    ratelimit._scheduler = ModelScheduler(requests_per_minute=1_000_000, tokens_per_minute=1e12)
+    cache = ResponseCache(path=":memory:")
+    model = SlowModel(args.latency)
+    barrier = threading.Barrier(args.sessions)
+
+    def session(i):
+        barrier.wait()
+        cached_generate(model, f"Lesson plan: topic {i % args.topics}", cache=cache)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    stats = get_singleflight().stats()
+    print(f"sessions:          {args.sessions}")
+    print(f"model calls:       {model.calls} (without coalescing: {args.sessions})")
+    print(f"coalescing ratio:  {stats['coalescing_ratio']:.0%}")
+    print(f"wall time:         {wall:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
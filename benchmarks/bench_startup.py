@@ -0,0 +1,95 @@
+"""
+Cold-start cost of every app entry point, measured with `python -X importtime`.
+
+Each target starts in a fresh interpreter that imports the CLI module, or runs
+the Streamlit script in bare mode. The benchmark reports the wall time to get
+that far, the total import time, and which heavy third-party packages were
+imported before the app could show anything.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from statistics import median
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Caches the apps open at import time go here, not into the user's cache
+CACHE_DIR = tempfile.mkdtemp(prefix="bench_startup_")
+
+# (name, app directory, how to start it)
+TARGETS = [
+    ("lesson planner CLI", "Gen-AI/lesson-plan-generator", "import lesson_planner"),
+    ("lesson batch CLI", "Gen-AI/lesson-plan-generator", "import batch_lessons"),
+    ("lesson streamlit", "Gen-AI/lesson-plan-generator", "script:streamlit_app.py"),
+    ("image captioner CLI", "Gen-AI/image-caption-generator", "import image_captioner"),
+    ("caption streamlit", "Gen-AI/image-caption-generator", "script:streamlit_app.py"),
+    ("chatbot streamlit", "Gen-AI/character-chatbot", "script:streamlit_app.py"),
+    ("meme CLI", "Gen-AI/meme-generator", "import importlib; importlib.import_module('01MemeGenerator')"),
+    ("research assistant", "Clarifai", "import importlib; importlib.import_module('02ai_agent')"),
+    ("research runner", "Clarifai", "import research_runner"),
+]
+
+# Third-party packages worth deferring, reported by their own import time
+HEAVY_PACKAGES = ("google.generativeai", "crewai", "clarifai", "streamlit", "numpy", "PIL", "requests", "dotenv")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def command_for(app_dir: str, start: str) -> str:
+    setup = f"import sys; sys.path[:0] = [{app_dir!r}, {ROOT!r}]; "
+    if start.startswith("script:"):
+        # Bare mode: Streamlit calls run without a server
+        path = os.path.join(app_dir, start[len("script:"):])
+        return setup + f"import runpy; runpy.run_path({path!r}, run_name='__main__')"
+    return setup + start
+
+def measure(app_dir: str, start: str) -> dict:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="0", GENAI_CACHE_DIR=CACHE_DIR)
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", command_for(app_dir, start)],
+        cwd=app_dir, env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+    top_level = 0
+    heavy = {}
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, module = int(match.group(2)), len(match.group(3)), match.group(4)
+        if depth == 1: # imported by the entry point itself, not as a dependency
+            top_level += cumulative
+        if module in HEAVY_PACKAGES:
+            heavy[module] = cumulative
+    error = None
+    if process.returncode != 0:
+        lines = [line for line in process.stderr.splitlines() if not line.startswith("import time:")]
+        error = lines[-1] if lines else f"exit code {process.returncode}"
+    return {"wall": wall, "imports": top_level / 1e6, "heavy": heavy, "error": error}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3, help="Runs per target (the median is reported)")
+    args = parser.parse_args()
+
+    print(f"{'target':<22}{'wall ms':>9}{'imports ms':>12}  heavy packages imported at startup (ms)")
+    for name, app_dir, start in TARGETS:
+        runs = [measure(os.path.join(ROOT, app_dir), start) for _ in range(args.runs)]
+        if runs[-1]["error"]:
+            print(f"{name:<22}{'':>9}{'':>12}  failed: {runs[-1]['error']}")
+            continue
+        heaviest = sorted(runs[-1]["heavy"].items(), key=lambda item: -item[1])
+        print(f"{name:<22}{median(r['wall'] for r in runs) * 1000:>9.0f}{median(r['imports'] for r in runs) * 1000:>12.0f}  "
+              + (", ".join(f"{module} {micros / 1000:.0f}" for module, micros in heaviest) or "none"))
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""
+Offline stand-in for every API the apps call, for load tests and regression runs.
+
+    python benchmarks/stub_server.py --port 8765 --latency lognormal:0.4,0.5 --rate-limit-rate 0.05
+
+Endpoints:
+  * Gemini REST:  POST /v1beta/models/<model>:generateContent, :streamGenerateContent, :countTokens
+                  (point the SDK at it with GEMINI_API_ENDPOINT=http://127.0.0.1:8765)
+  * OpenAI-compatible: POST /v1/chat/completions, streamed or not
+                  (RESEARCH_LLM_BASE_URL=http://127.0.0.1:8765/v1 for `setup_llm`)
+  * Clarifai predict: POST .../outputs
+  * Imgflip:      GET /get_memes, plus the template images it lists under /images/
+  * GET /stats:   requests served per endpoint, injected errors
+
+Model endpoints wait for a sampled latency before answering, stream their reply
+in word chunks, and fail a configurable share of requests with 429 (with
+Retry-After) or 503. Replies are canned text derived from the prompt, so the
+same prompt always gets the same answer, or fixed texts from `--payloads`.
+"""
+import re
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from io import BytesIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "students explore the idea through a short activity then discuss what they noticed and "
+    "connect it to everyday examples before practising with a partner and sharing results "
+    "the teacher checks understanding with quick questions and adjusts the pace as needed"
+).split()
+
+MEME_TEMPLATES = [
+    ("181913649", "Drake Hotline Bling"), ("87743020", "Two Buttons"), ("112126428", "Distracted Boyfriend"),
+    ("131087935", "Running Away Balloon"), ("217743513", "UNO Draw 25 Cards"), ("124822590", "Left Exit 12 Off Ramp"),
+]
+
+
+class Latency:
+    """
+    A latency distribution in seconds, parsed from "0.3", "fixed:0.3",
+    "uniform:0.1,0.5" or "lognormal:<median>,<sigma>".
+    """
+
+    def __init__(self, spec: str = "fixed:0"):
+        self.spec = spec
+        kind, _, args = spec.partition(":") if ":" in spec else ("fixed", "", spec)
+        self.kind = kind
+        self.args = [float(value) for value in args.split(",") if value]
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(*self.args)
+        if self.kind == "lognormal":
+            median, sigma = self.args
+            return median * math.exp(rng.gauss(0, sigma))
+        return self.args[0] if self.args else 0.0
+
+
+def canned_text(prompt: str, words: int) -> str:
+    """Deterministic reply for `prompt`: two lines of filler words."""
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+    reply = [rng.choice(WORDS) for _ in range(max(2, words))]
+    middle = len(reply) // 2
+    return " ".join(reply[:middle]).capitalize() + "\n" + " ".join(reply[middle:]).capitalize()
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StubServer:
+    """
+    The stub as an in-process server: `StubServer(...).start()` serves on a
+    free port in a background thread; `url` is its base address.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: str = "fixed:0",
+        chunk_delay: float = 0.02,
+        chunk_words: int = 8,
+        reply_words: int = 120,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        payloads: dict = None,
+        seed: int = None
+    ):
+        self.latency = Latency(latency)
+        self.chunk_delay = chunk_delay
+        self.chunk_words = chunk_words
+        self.reply_words = reply_words
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.payloads = payloads or {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {}
+        self._images = {}
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- Behaviour shared by the endpoints ---
+
+    def count(self, name: str):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def draw(self):
+        """Returns None, "rate_limit" or "error" for the next model request, and its latency."""
+        with self._lock:
+            roll = self._rng.random()
+            latency = self.latency.sample(self._rng)
+        if roll < self.rate_limit_rate:
+            return "rate_limit", latency
+        if roll < self.rate_limit_rate + self.error_rate:
+            return "error", latency
+        return None, max(0.0, latency)
+
+    def reply(self, kind: str, prompt: str) -> str:
+        return self.payloads.get(kind) or canned_text(prompt, self.reply_words)
+
+    def chunks(self, text: str):
+        words = text.split(" ")
+        for start in range(0, len(words), self.chunk_words):
+            piece = " ".join(words[start:start + self.chunk_words])
+            yield piece if start + self.chunk_words >= len(words) else piece + " "
+
+    def template_image(self, name: str) -> bytes:
+        with self._lock:
+            image = self._images.get(name)
+        if image is None:
+            from PIL import Image
+
+            shade = int(hashlib.sha256(name.encode()).hexdigest()[:2], 16)
+            buffer = BytesIO()
+            Image.new("RGB", (600, 400), (shade, 120, 255 - shade)).save(buffer, format="PNG")
+            image = buffer.getvalue()
+            with self._lock:
+                self._images[name] = image
+        return image
+
+# --- Request handling ---
+
+def _gemini_prompt(body: dict) -> str:
+    texts = []
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            texts.append(part.get("text") or "")
+            if "inlineData" in part or "inline_data" in part:
+                texts.append(hashlib.sha256(json.dumps(part, sort_keys=True).encode()).hexdigest())
+    return "\n".join(texts)
+
+def _gemini_reply_text(stub: StubServer, body: dict, prompt: str) -> str:
+    config = body.get("generationConfig") or {}
+    schema = config.get("responseSchema") or {}
+    if config.get("responseMimeType") == "application/json" and schema.get("properties"):
+        # Structured requests get an object with every requested property
+        return json.dumps({name: stub.reply("gemini", prompt + name).replace("\n", " ") for name in schema["properties"]})
+    return stub.reply("gemini", prompt)
+
+def _gemini_chunk(text: str, prompt: str, final_text: str = None) -> dict:
+    chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}]}
+    if final_text is not None:
+        chunk["candidates"][0]["finishReason"] = "STOP"
+        prompt_tokens, output_tokens = _approx_tokens(prompt), _approx_tokens(final_text)
+        chunk["usageMetadata"] = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens
+        }
+    return chunk
+
+def _make_handler(stub: StubServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        # --- Responses ---
+
+        def send_json(self, status: int, payload, headers: dict = None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def start_stream(self, content_type: str):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+        def write_chunk(self, data: str):
+            raw = data.encode("utf-8")
+            self.wfile.write(f"{len(raw):x}\r\n".encode() + raw + b"\r\n")
+            self.wfile.flush()
+
+        def end_stream(self):
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+        def read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def injected_failure(self, endpoint: str) -> bool:
+            """Sleeps the sampled latency; answers with an injected error if one is drawn."""
+            failure, latency = stub.draw()
+            time.sleep(latency)
+            if failure is None:
+                return False
+            stub.count(f"injected.{failure}")
+            if failure == "rate_limit":
+                status, message, code = 429, "Resource has been exhausted (e.g. check quota).", "RESOURCE_EXHAUSTED"
+            else:
+                status, message, code = 503, "The service is currently unavailable.", "UNAVAILABLE"
+            headers = {"Retry-After": f"{stub.retry_after:g}"} if status == 429 else {}
+            if endpoint == "clarifai":
+                payload = {"status": {"code": 11006 if status == 429 else 21317, "description": message}}
+            else:
+                payload = {"error": {"code": status, "message": message, "status": code}}
+            self.send_json(status, payload, headers)
+            return True
+
+        # --- Routes ---
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/stats":
+                with stub._lock:
+                    return self.send_json(200, dict(stub.counts))
+            if path.endswith("/get_memes"):
+                stub.count("imgflip.get_memes")
+                memes = [
+                    {"id": meme_id, "name": name, "url": f"{stub.url}/images/{meme_id}.png",
+                     "width": 600, "height": 400, "box_count": 2}
+                    for meme_id, name in MEME_TEMPLATES
+                ]
+                data = json.dumps({"success": True, "data": {"memes": memes}}).encode("utf-8")
+                etag = '"' + hashlib.sha256(data).hexdigest()[:16] + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    return self.end_headers()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                return self.wfile.write(data)
+            match = re.match(r"^/images/([\w-]+)\.png$", path)
+            if match:
+                stub.count("imgflip.image")
+                image = stub.template_image(match.group(1))
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(image)))
+                self.end_headers()
+                return self.wfile.write(image)
+            self.send_json(404, {"error": {"code": 404, "message": f"No stub for GET {path}", "status": "NOT_FOUND"}})
+
+        def do_POST(self):
+            path = self.path.split("?", 1)[0]
+            body = self.read_json()
+            match = re.match(r"^/v1(?:beta)?/models/([^:]+):(generateContent|streamGenerateContent|countTokens)$", path)
+            if match:
+                return self.gemini(match.group(2), body)
+            if path.endswith("/chat/completions"):
+                return self.openai(body)
+            if path.endswith("/outputs"):
+                return self.clarifai(body)
+            # Anything else (e.g. cachedContents) is unsupported, which callers must tolerate
+            stub.count("unsupported")
+            self.send_json(400, {"error": {"code": 400, "message": f"No stub for POST {path}", "status": "INVALID_ARGUMENT"}})
+
+        def gemini(self, method: str, body: dict):
+            stub.count(f"gemini.{method}")
+            prompt = _gemini_prompt(body)
+            if method == "countTokens":
+                return self.send_json(200, {"totalTokens": _approx_tokens(prompt)})
+            if self.injected_failure("gemini"):
+                return
+            text = _gemini_reply_text(stub, body, prompt)
+            if method == "generateContent":
+                return self.send_json(200, _gemini_chunk(text, prompt, final_text=text))
+            # The REST transport reads a streamed JSON array
+            self.start_stream("application/json")
+            pieces = list(stub.chunks(text))
+            for position, piece in enumerate(pieces):
+                last = position == len(pieces) - 1
+                chunk = _gemini_chunk(piece, prompt, final_text=text if last else None)
+                self.write_chunk(("[" if position == 0 else ",\r\n") + json.dumps(chunk) + ("]" if last else ""))
+                if not last:
+                    time.sleep(stub.chunk_delay)
+            self.end_stream()
+
+        def openai(self, body: dict):
+            stub.count("openai.chat_completions")
+            prompt = "\n".join(str(message.get("content") or "") for message in body.get("messages", []))
+            if self.injected_failure("openai"):
+                return
+            text = stub.reply("openai", prompt)
+            model = body.get("model", "stub")
+            created = int(time.time())
+            usage = {"prompt_tokens": _approx_tokens(prompt), "completion_tokens": _approx_tokens(text),
+                     "total_tokens": _approx_tokens(prompt) + _approx_tokens(text)}
+            if not body.get("stream"):
+                return self.send_json(200, {
+                    "id": "chatcmpl-stub", "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": usage
+                })
+            self.start_stream("text/event-stream")
+            for piece in stub.chunks(text):
+                event = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                self.write_chunk(f"data: {json.dumps(event)}\n\n")
+                time.sleep(stub.chunk_delay)
+            final = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+            self.write_chunk(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n")
+            self.end_stream()
+
+        def clarifai(self, body: dict):
+            stub.count("clarifai.predict")
+            if self.injected_failure("clarifai"):
+                return
+            outputs = []
+            for item in body.get("inputs", []):
+                raw = ((item.get("data") or {}).get("text") or {}).get("raw") or ""
+                outputs.append({
+                    "id": hashlib.sha256(raw.encode()).hexdigest()[:32],
+                    "status": {"code": 10000, "description": "Ok"},
+                    "input": {"id": item.get("id", "")},
+                    "data": {"text": {"raw": stub.reply("clarifai", raw)}}
+                })
+            self.send_json(200, {"status": {"code": 10000, "description": "Ok"}, "outputs": outputs})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="lognormal:0.4,0.5",
+                        help='"0.3", "uniform:0.1,0.5" or "lognormal:<median>,<sigma>" (seconds)')
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="Seconds between streamed chunks")
+    parser.add_argument("--chunk-words", type=int, default=8)
+    parser.add_argument("--reply-words", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--payloads", help='JSON file of fixed replies: {"gemini": ..., "openai": ..., "clarifai": ...}')
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    payloads = None
+    if args.payloads:
+        with open(args.payloads, "r", encoding="utf-8") as f:
+            payloads = json.load(f)
+    stub = StubServer(
+        args.host, args.port, latency=args.latency, chunk_delay=args.chunk_delay, chunk_words=args.chunk_words,
+        reply_words=args.reply_words, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after, payloads=payloads, seed=args.seed
+    )
+    print(f"Stub APIs on {stub.url}")
+    print(f"  GEMINI_API_ENDPOINT={stub.url}")
+    print(f"  RESEARCH_LLM_BASE_URL={stub.url}/v1")
+    print(f"  IMGFLIP_MEMES_URL={stub.url}/get_memes")
+    try:
+        stub.httpd.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Helpers shared by the Gen-AI apps and the Clarifai scripts.
+
+The apps are run as plain scripts (`streamlit run ...` / `python ...`), so they
+add the repository root to `sys.path` before importing from this package.
+"""
@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from common.ratelimit import get_scheduler
+from common.singleflight import get_singleflight
+from common.tracing import get_tracer
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mlh-genai")
+
+# --- Cache keys ---
+
+def _hash_part(part) -> str:
+    """
+    Returns a stable fingerprint for one piece of `generate_content` input.
+    Text is hashed as-is, images are hashed by their pixel/encoded bytes.
+    """
+    if isinstance(part, str):
+        return "text:" + hashlib.sha256(part.encode("utf-8")).hexdigest()
+    if isinstance(part, (bytes, bytearray)):
+        return "bytes:" + hashlib.sha256(part).hexdigest()
+    if isinstance(part, dict) and "data" in part:
+        # Inline blob, e.g. {"mime_type": "image/jpeg", "data": b"..."}
+        return f"blob:{part.get('mime_type', '')}:" + hashlib.sha256(part["data"]).hexdigest()
+    if hasattr(part, "tobytes") and hasattr(part, "size"):
+        # PIL image
+        digest = hashlib.sha256(part.tobytes()).hexdigest()
+        return f"image:{part.mode}:{part.size[0]}x{part.size[1]}:{digest}"
+    return "repr:" + hashlib.sha256(repr(part).encode("utf-8")).hexdigest()
+
+def make_key(model_name: str, contents) -> str:
+    """
+    Builds a content-addressed cache key from the model name and the prompt parts.
+    """
+    if not isinstance(contents, (list, tuple)):
+        contents = [contents]
+    h = hashlib.sha256(model_name.encode("utf-8"))
+    for part in contents:
+        h.update(b"\0")
+        h.update(_hash_part(part).encode("utf-8"))
+    return h.hexdigest()
+
+# --- Cache tiers ---
+
+class MemoryTier:
+    """
+    Small in-process LRU with a per-entry TTL.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> int:
+        """Stores a value and returns how many entries were evicted."""
+        evicted = 0
+        with self._lock:
+            self._data[key] = (value, time.time() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteTier:
+    """
+    On-disk tier that survives restarts. Entries expire after `ttl` seconds and
+    the least recently used ones are dropped once the table grows past `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Streamlit runs each session in its own thread, so share one connection behind a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if created_at + self.ttl < now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return value
+
+    def set(self, key, value) -> int:
+        """Stores a value and returns how many entries were evicted."""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            evicted = self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)
+            ).rowcount
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                # Walk the oldest entries until we are back under budget
+                for old_key, old_size in self._conn.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+                ).fetchall():
+                    if total <= self.max_bytes or old_key == key:
+                        break
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                    total -= old_size
+                    evicted += 1
+        return evicted
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+# --- Two-tier cache ---
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU + SQLite) cache for model text responses.
+
+    Example:
+        cache = ResponseCache()
+        text = cached_generate(model, prompt, cache=cache)
+        print(cache.stats())
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        max_entries: int = 256,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+        ttl: float = 7 * 24 * 3600
+    ):
+        if path is None:
+            path = os.path.join(os.getenv("GENAI_CACHE_DIR", DEFAULT_CACHE_DIR), "responses.sqlite3")
+        self.memory = MemoryTier(max_entries=max_entries, ttl=ttl)
+        self.disk = SQLiteTier(path, max_bytes=max_disk_bytes, ttl=ttl) if path != ":memory:" else None
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self._count("disk_hits")
+                # Promote so the next lookup skips SQLite
+                self._count("evictions", self.memory.set(key, value))
+                return value
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        evicted = self.memory.set(key, value)
+        if self.disk is not None:
+            evicted += self.disk.set(key, value)
+        self._count("evictions", evicted)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache() -> ResponseCache:
+    """
+    Returns the process-wide cache shared by all apps.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+def no_response_cache() -> ResponseCache:
+    """
+    A cache that keeps nothing, for `cached_generate` calls that must reach the
+    model (e.g. the user asked for a new answer to the same prompt).
+    """
+    return ResponseCache(path=":memory:", max_entries=0)
+
+def _model_identity(model) -> str:
+    """
+    Model name plus its system instruction / cached content, so the same
+    prompt sent to two personas doesn't share a cache entry.
+    """
+    name = getattr(model, "model_name", type(model).__name__)
+    instruction = getattr(model, "_system_instruction", None)
+    if instruction is None:
+        instruction = getattr(model, "cached_content", None)
+    if instruction is None:
+        return name
+    return f"{name}:" + hashlib.sha256(repr(instruction).encode("utf-8")).hexdigest()[:16]
+
+def cached_generate(model, contents, cache: ResponseCache = None, generation_config: dict = None) -> str:
+    """
+    Calls `model.generate_content(contents)` and returns `response.text`, serving
+    identical (model, prompt, image, config) requests from the cache. Concurrent
+    misses for the same key share one call, which goes through the shared
+    `ModelScheduler`; errors are raised, never cached.
+    """
+    if cache is None:
+        cache = get_default_cache()
+    model_name = getattr(model, "model_name", type(model).__name__)
+    key_parts = list(contents) if isinstance(contents, (list, tuple)) else [contents]
+    if generation_config:
+        key_parts.append("config:" + json.dumps(generation_config, sort_keys=True, default=str))
+    key = make_key(_model_identity(model), key_parts)
+    tracer = get_tracer()
+    text = cache.get(key)
+    if text is not None:
+        tracer.count("cache.hits")
+        return text
+    tracer.count("cache.misses")
+
+    def generate():
+        # A call for this key may have finished between our lookup and now
+        text = cache.memory.get(key)
+        if text is not None:
+            return text
+        with tracer.span("generate_content", model=model_name):
+            if generation_config:
+                response = get_scheduler().call(model.generate_content, contents, generation_config=generation_config)
+            else:
+                response = get_scheduler().call(model.generate_content, contents)
+            text = response.text
+        tracer.record_usage(response)
+        cache.set(key, text)
+        return text
+
+    # Identical requests already in flight (e.g. a class submitting the same
+    # topic at once) wait for that call instead of making their own
+    text, _ = get_singleflight().do(key, generate)
+    return text
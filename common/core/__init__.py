@@ -0,0 +1,12 @@
+"""
+Shared asyncio generation engine for all apps.
+
+    from common.core import lessons, run_sync
+    plan = run_sync(lessons.generate_lesson_plan("Fractions", "4th Grade", "45 minutes"))
+
+Every generator here is a coroutine (or async generator), so fan-out such as
+several caption styles or lesson sections runs concurrently. Scripts and batch
+runners use `run_sync`/`iter_sync`; Streamlit apps use `streamlit_adapter`.
+"""
+from common.core.runtime import agenerate, aiter_thread, map_bounded, run_sync, iter_sync
+from common.core import captions, chat, lessons, memes
@@ -0,0 +1,100 @@
+import json
+import asyncio
+
+from common.models import DEFAULT_MODEL, get_model
+from common.images import preprocess_image
+from common.ratelimit import CircuitOpenError, is_retryable_error
+from common.core.runtime import agenerate
+
+# --- Prompts ---
+
+def build_caption_prompt(caption_style: str = "descriptive") -> str:
+    """
+    Returns the prompt text for the given caption style.
+    """
+    if caption_style == "fun":
+        return "Generate a fun and lighthearted caption for this image:"
+    elif caption_style == "quirky":
+        return "Generate a quirky, imaginative, and slightly unusual caption for this image:"
+    else: # descriptive
+        return "Generate a detailed and descriptive caption for this image:"
+
+CAPTION_STYLES = ("descriptive", "fun", "quirky")
+
+STYLE_DESCRIPTIONS = {
+    "descriptive": "a detailed and descriptive caption",
+    "fun": "a fun and lighthearted caption",
+    "quirky": "a quirky, imaginative, and slightly unusual caption"
+}
+
+def build_multi_style_request(styles):
+    """
+    Returns (prompt, generation_config) asking for every style in one JSON object.
+    """
+    lines = [f'- "{style}": {STYLE_DESCRIPTIONS.get(style, f"a {style} caption")}' for style in styles]
+    prompt = "Write one caption for this image in each of the following styles:\n" + "\n".join(lines)
+    generation_config = {
+        "response_mime_type": "application/json",
+        "response_schema": {
+            "type": "object",
+            "properties": {style: {"type": "string"} for style in styles},
+            "required": list(styles)
+        }
+    }
+    return prompt, generation_config
+
+def parse_multi_style_response(text: str, styles) -> dict:
+    """
+    Returns {style: caption}. Raises ValueError if any style is missing.
+    """
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    captions = {style: data.get(style) for style in styles}
+    missing = [style for style, caption in captions.items() if not isinstance(caption, str) or not caption.strip()]
+    if missing:
+        raise ValueError(f"Missing captions for: {', '.join(missing)}")
+    return {style: caption.strip() for style, caption in captions.items()}
+
+# --- Generation ---
+
+async def caption_image(model, image_blob, caption_style: str = "descriptive") -> str:
+    """
+    One caption for an already preprocessed image blob.
+    """
+    # Identical image + prompt pairs are answered from the shared response cache
+    return await agenerate(model, [build_caption_prompt(caption_style), image_blob])
+
+async def styled_captions(model, image_blob, styles=CAPTION_STYLES) -> dict:
+    """
+    Generates captions for several styles with a single request and one image
+    upload, using a JSON-schema response. If that request fails or its JSON
+    can't be parsed, falls back to one request per style, run concurrently.
+    Quota and availability errors are raised rather than multiplied by the fallback.
+
+    Returns:
+        dict: {style: caption}
+    """
+    styles = list(styles)
+    if len(styles) == 1:
+        # Nothing to batch: a plain prompt reads better than a one-key JSON object
+        return {styles[0]: await caption_image(model, image_blob, styles[0])}
+    prompt, generation_config = build_multi_style_request(styles)
+    try:
+        text = await agenerate(model, [prompt, image_blob], generation_config=generation_config)
+        return parse_multi_style_response(text, styles)
+    except Exception as e:
+        if isinstance(e, CircuitOpenError) or is_retryable_error(e):
+            raise
+
+    captions = await asyncio.gather(*(caption_image(model, image_blob, style) for style in styles))
+    return dict(zip(styles, captions))
+
+async def caption_image_file(image_path: str, styles=("descriptive",), model=None, max_side: int = None) -> dict:
+    """
+    Preprocesses an image file (off the event loop) and captions it in every
+    style. Raises FileNotFoundError and API errors.
+    """
+    model = model or get_model(DEFAULT_MODEL)
+    prepared = await asyncio.to_thread(preprocess_image, image_path, max_side)
+    return await styled_captions(model, prepared.blob, styles)
@@ -0,0 +1,19 @@
+import asyncio
+
+from common.core.runtime import aiter_thread
+
+
+async def chat_turn(session, user_input: str) -> str:
+    """
+    One chat turn on a `ChatSession`-like object (e.g. `ConversationMemory`).
+    """
+    response = await asyncio.to_thread(session.send_message, user_input)
+    return response.text
+
+async def stream_chat_turn(session, user_input: str):
+    """
+    Yields the reply's text chunks as they arrive. The turn is recorded by the
+    session once the stream is exhausted.
+    """
+    async for chunk in aiter_thread(lambda: session.send_message(user_input, stream=True)):
+        yield chunk.text
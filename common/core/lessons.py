@@ -0,0 +1,212 @@
+import time
+
+from common.models import DEFAULT_MODEL, get_model
+from common.prompt_cache import PrefixCachedModel, get_prefix_model
+from common.ratelimit import get_scheduler
+from common.tracing import get_tracer
+from common.core.runtime import agenerate, aiter_thread, map_bounded
+
+# (heading, instructions) for every section of a lesson plan, in order
+SECTIONS = [
+    ("1. Learning Objectives",
+     '[List 3-5 clear, measurable learning objectives (e.g., "Students will be able to explain...", "Students will be able to identify...")]'),
+    ("2. Materials and Resources",
+     "[List all necessary materials, e.g., whiteboard, markers, handouts, projector, specific websites/videos, physical objects]"),
+    ("3. Introduction (Engage) - [Suggested Time: X min]",
+     "[Brief activity or discussion to hook students and activate prior knowledge]"),
+    ("4. Direct Instruction (Explore/Explain) - [Suggested Time: X min]",
+     "[Core content delivery, key concepts, explanations]"),
+    ("5. Guided Practice (Elaborate) - [Suggested Time: X min]",
+     "[Activities where students practice with teacher support, e.g., group work, guided exercises]"),
+    ("6. Independent Practice (Evaluate) - [Suggested Time: X min]",
+     "[Activities where students apply knowledge independently, e.g., worksheets, short assignments]"),
+    ("7. Assessment",
+     "[How student understanding will be checked (formative/summative, e.g., quick quiz, observation, exit ticket, project rubric)]"),
+    ("8. Differentiation Strategies",
+     "[Ideas for supporting struggling learners and challenging advanced learners]"),
+    ("9. Homework/Extension Activities (Optional)",
+     "[Suggestions for follow-up work or deeper exploration]"),
+]
+
+# Sections written up front in "outline" mode; the rest are filled in parallel
+OUTLINE_SECTIONS = SECTIONS[:2]
+FANOUT_SECTIONS = SECTIONS[2:]
+
+OUTLINE_MARKER = "---OUTLINE---"
+
+# --- Prompt building ---
+
+def style_instructions(learning_style: str) -> str:
+    if learning_style == "Active Learning":
+        return "Emphasize active student participation, group work, and hands-on activities."
+    elif learning_style == "Project-Based":
+        return "Design the lesson around a central project or investigation, with students building or creating something."
+    elif learning_style == "Inquiry-Based":
+        return "Focus on student-led questions, exploration, and discovery."
+    elif learning_style == "Discussion-Heavy":
+        return "Structure the lesson around facilitated discussions and debates."
+    else: # "Standard" or default
+        return "Provide a balanced lesson plan suitable for a general classroom setting."
+
+def build_context(topic, grade_level, duration, learning_style="standard", additional_notes="") -> str:
+    """
+    The lesson details shared by every prompt.
+    """
+    notes_prompt = f"Additional notes/requirements: {additional_notes}" if additional_notes else ""
+    return f"""
+    You are an expert educator and curriculum designer. Your task is to generate a comprehensive and engaging lesson plan based on the following details.
+
+    **Topic:** {topic}
+    **Grade Level:** {grade_level}
+    **Duration:** {duration}
+    **Learning Style Emphasis:** {style_instructions(learning_style)}
+    {notes_prompt}
+    """
+
+def _section_template(sections) -> str:
+    return "\n".join(f"    ### {heading}\n    * {instructions}\n" for heading, instructions in sections)
+
+# The fixed part of the single-request prompt: most of its input tokens, and the
+# same for every lesson, so it is sent as a (server-side cached) system instruction
+LESSON_TEMPLATE = f"""
+    You are an expert educator and curriculum designer. Your task is to generate a comprehensive and engaging lesson plan based on the lesson details you are given.
+
+    Please structure the lesson plan clearly with the following sections using Markdown formatting:
+
+    ## Lesson Plan: [Your Suggested Lesson Title]
+
+{_section_template(SECTIONS)}
+    Ensure the suggested times for each section add up approximately to the total lesson duration.
+    """
+
+def build_lesson_details(topic, grade_level, duration, learning_style="standard", additional_notes="") -> str:
+    """
+    The per-request part of the prompt when LESSON_TEMPLATE is the system instruction.
+    """
+    notes_prompt = f"Additional notes/requirements: {additional_notes}" if additional_notes else ""
+    return f"""
+    **Topic:** {topic}
+    **Grade Level:** {grade_level}
+    **Duration:** {duration}
+    **Learning Style Emphasis:** {style_instructions(learning_style)}
+    {notes_prompt}
+    """
+
+def build_lesson_prompt(topic, grade_level, duration, learning_style="standard", additional_notes="") -> str:
+    """
+    The single prompt asking for the whole lesson plan (template + details),
+    for models that don't carry LESSON_TEMPLATE as their system instruction.
+    """
+    start = time.perf_counter()
+    prompt = LESSON_TEMPLATE + build_lesson_details(topic, grade_level, duration, learning_style, additional_notes)
+    get_tracer().observe("build_prompt", time.perf_counter() - start)
+    return prompt
+
+def lesson_model() -> PrefixCachedModel:
+    """
+    The default model for single-request plans: LESSON_TEMPLATE is uploaded once
+    as cached content and shared by every request and session, once it is long
+    enough for the API to cache (see prompt_cache.MIN_CACHE_TOKENS).
+    """
+    return get_prefix_model(DEFAULT_MODEL, LESSON_TEMPLATE)
+
+def _lesson_request(model, details) -> tuple:
+    """Returns (model, prompt), sending only the details when the model carries the template."""
+    model = model or lesson_model()
+    if isinstance(model, PrefixCachedModel) and model.system_instruction == LESSON_TEMPLATE:
+        return model, build_lesson_details(*details)
+    return model, build_lesson_prompt(*details)
+
+def build_outline_prompt(topic, grade_level, duration, learning_style="standard", additional_notes="") -> str:
+    section_list = "\n".join(f"    - {heading}" for heading, _ in FANOUT_SECTIONS)
+    return f"""
+    {build_context(topic, grade_level, duration, learning_style, additional_notes)}
+
+    Write only the beginning of the lesson plan in Markdown:
+
+    ## Lesson Plan: [Your Suggested Lesson Title]
+
+{_section_template(OUTLINE_SECTIONS)}
+    Then write a line containing only {OUTLINE_MARKER} followed by a short outline of the remaining
+    sections, one line each with its key idea and suggested time. The times must add up
+    approximately to the total lesson duration:
+{section_list}
+    """
+
+def build_section_prompt(section, header: str, outline: str, topic, grade_level, duration,
+                         learning_style="standard", additional_notes="") -> str:
+    heading, instructions = section
+    return f"""
+    {build_context(topic, grade_level, duration, learning_style, additional_notes)}
+
+    The lesson plan so far:
+    {header}
+
+    Outline of the remaining sections:
+    {outline}
+
+    Write ONLY the following section, following the outline, in Markdown. Start with the heading line exactly as given:
+
+    ### {heading}
+    * {instructions}
+    """
+
+# --- Generation modes ---
+
+async def generate_lesson_plan(topic, grade_level, duration, learning_style="standard", additional_notes="", model=None) -> str:
+    """
+    Generates the whole plan with one request. Raises on API errors.
+    """
+    model, prompt = _lesson_request(model, (topic, grade_level, duration, learning_style, additional_notes))
+    # The default form values are requested over and over, so serve repeats from the cache
+    return await agenerate(model, prompt)
+
+async def stream_lesson_plan(topic, grade_level, duration, learning_style="standard", additional_notes="", model=None):
+    """
+    Yields the plan's Markdown in chunks as the model produces them.
+    """
+    model, prompt = _lesson_request(model, (topic, grade_level, duration, learning_style, additional_notes))
+    with get_tracer().span("generate_content", mode="stream"):
+        async for chunk in aiter_thread(lambda: get_scheduler().call(model.generate_content, prompt, stream=True)):
+            yield chunk.text
+
+def split_outline(text: str):
+    """
+    Splits the outline response into (plan header, outline of remaining sections).
+    """
+    if OUTLINE_MARKER in text:
+        header, outline = text.split(OUTLINE_MARKER, 1)
+        return header.strip(), outline.strip()
+    # The model ignored the marker: use everything both as header and as outline
+    return text.strip(), text.strip()
+
+async def generate_lesson_plan_fanout(topic, grade_level, duration, learning_style="standard", additional_notes="",
+                                      model=None, max_workers: int = len(FANOUT_SECTIONS), on_update=None) -> str:
+    """
+    "Outline then fan-out": generates the title, objectives, materials and an
+    outline first, then writes sections 3-9 concurrently from that outline.
+
+    `on_update(markdown)` is called on the event loop with the plan so far
+    (sections in order) each time a part finishes, for progressive display.
+    """
+    model = model or get_model(DEFAULT_MODEL)
+    details = (topic, grade_level, duration, learning_style, additional_notes)
+
+    with get_tracer().span("lesson_outline"):
+        header, outline = split_outline(await agenerate(model, build_outline_prompt(*details)))
+    if on_update:
+        on_update(header)
+
+    def write_section(i):
+        return agenerate(model, build_section_prompt(FANOUT_SECTIONS[i], header, outline, *details))
+
+    sections = [None] * len(FANOUT_SECTIONS)
+    async for i, text, error in map_bounded(write_section, range(len(FANOUT_SECTIONS)), max_workers):
+        if error is not None:
+            raise error
+        sections[i] = text.strip()
+        if on_update:
+            # Show every section that is ready, keeping the plan's order
+            on_update("\n\n".join([header] + [s for s in sections if s is not None]))
+
+    return "\n\n".join([header] + sections)
@@ -0,0 +1,42 @@
+import asyncio
+
+from common.cache import no_response_cache
+from common.models import DEFAULT_MODEL, get_model
+from common.core.runtime import agenerate
+
+# Captions are reused for near-identical topics for this long
+MEME_CACHE_TTL = 24 * 3600
+
+
+def build_meme_prompt(topic: str) -> str:
+    return f"Generate a short, witty, and humorous meme caption about '{topic}' in two parts. Just return the top text and bottom text as two lines, without labels like 'Top text' or 'Bottom text'."
+
+def split_caption(caption):
+    """
+    Splits a generated caption into (top_text, bottom_text).
+    """
+    try:
+        top_text, bottom_text = caption.split('\n', 1)
+    except ValueError:
+        top_text = caption
+        bottom_text = ""
+    return top_text, bottom_text
+
+async def meme_caption(topic: str, model=None, fresh: bool = False) -> str:
+    """
+    Generates a humorous two-line meme caption for `topic`. A caption made for
+    a near-identical topic is reused unless `fresh` asks for a new one, which
+    also skips the exact-match response cache and replaces the stored caption.
+    """
+    # Imported here: numpy would otherwise load with every app that imports common.core
+    from common.semantic_cache import get_semantic_cache
+    cache = get_semantic_cache("meme", ttl=MEME_CACHE_TTL)
+    if not fresh:
+        # SQLite and NumPy work: keep it off the event loop like the model call
+        hit = await asyncio.to_thread(cache.lookup, topic)
+        if hit is not None:
+            return hit.value
+    model = model or get_model(DEFAULT_MODEL)
+    caption = await agenerate(model, build_meme_prompt(topic), cache=no_response_cache() if fresh else None)
+    await asyncio.to_thread(cache.add, topic, caption)
+    return caption
@@ -0,0 +1,82 @@
+import asyncio
+
+from common.cache import cached_generate
+
+
+async def agenerate(model, contents, generation_config: dict = None, cache=None) -> str:
+    """
+    `cached_generate` without blocking the event loop. The SDK call runs in a
+    worker thread; context variables (e.g. the queue priority) go with it.
+    """
+    return await asyncio.to_thread(cached_generate, model, contents, cache, generation_config)
+
+async def aiter_thread(make_iterator):
+    """
+    Iterates a blocking iterator (a streaming response) from a worker thread,
+    yielding each item to the event loop as it arrives.
+    """
+    iterator = await asyncio.to_thread(lambda: iter(make_iterator()))
+    done = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+async def map_bounded(fn, items, limit: int):
+    """
+    Runs `await fn(item)` for every item, at most `limit` at a time, and yields
+    (item, result, error) in completion order. Errors are returned, not raised.
+    `items` is read lazily, so it can be a generator over a huge input.
+    """
+    async def run(item):
+        try:
+            return item, await fn(item), None
+        except Exception as e:
+            return item, None, e
+
+    items = iter(items)
+    done = object()
+    running = set()
+    while True:
+        while len(running) < max(1, limit):
+            item = next(items, done)
+            if item is done:
+                break
+            running.add(asyncio.ensure_future(run(item)))
+        if not running:
+            return
+        finished, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for task in finished:
+            yield task.result()
+
+# --- Sync wrappers ---
+
+def run_sync(coro):
+    """
+    Runs a coroutine to completion from synchronous code (a script, a batch
+    runner or the Streamlit script thread) and returns its result. Callbacks
+    the coroutine makes run in the calling thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    coro.close()
+    raise RuntimeError("run_sync() called from a running event loop; await the coroutine instead")
+
+def iter_sync(async_iterator):
+    """
+    Iterates an async generator from synchronous code, in the calling thread.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(async_iterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(async_iterator.aclose())
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
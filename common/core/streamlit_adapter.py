@@ -0,0 +1,33 @@
+import time
+
+from common.core.runtime import iter_sync, run_sync
+
+
+def run_or_error(st, coro, error_message: str = "Something went wrong"):
+    """
+    Runs a core coroutine from the Streamlit script thread. On failure shows
+    `st.error` and returns None, so an error never ends up rendered as content.
+    """
+    try:
+        return run_sync(coro)
+    except Exception as e:
+        st.error(f"{error_message}: {e}")
+        return None
+
+def stream_markdown(placeholder, chunks, cursor: str = "▌"):
+    """
+    Renders an async generator of text chunks into `placeholder` as they arrive.
+
+    Returns:
+        tuple: (full text, seconds to first chunk, total seconds)
+    """
+    start = time.perf_counter()
+    first_chunk_seconds = None
+    text = ""
+    for chunk in iter_sync(chunks):
+        if first_chunk_seconds is None:
+            first_chunk_seconds = time.perf_counter() - start
+        text += chunk
+        placeholder.markdown(text + cursor)
+    placeholder.markdown(text)
+    return text, first_chunk_seconds, time.perf_counter() - start
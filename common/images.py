@@ -0,0 +1,159 @@
+import os
+import time
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict, namedtuple
+
+from common.tracing import get_tracer
+
+# Used to estimate the upload time saved by sending fewer bytes
+UPLINK_MBPS = float(os.getenv("GENAI_UPLINK_MBPS", "10"))
+
+PreparedImage = namedtuple(
+    "PreparedImage",
+    ["blob", "size", "original_bytes", "sent_bytes", "preprocess_seconds", "cached"]
+)
+
+
+def _read_source(source):
+    """
+    Returns (raw bytes, PIL image or None) for a path, bytes, file-like object
+    (e.g. a Streamlit upload) or an already opened PIL image.
+    """
+    # Only an already opened image needs PIL here; don't import it for bytes or paths
+    if type(source).__module__.startswith("PIL."):
+        return None, source
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source), None
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read(), None
+    if hasattr(source, "getvalue"):
+        return source.getvalue(), None
+    return source.read(), None
+
+
+class ImagePreprocessor:
+    """
+    Shrinks images before they are sent to the model.
+
+    JPEGs are decoded at reduced size with `Image.draft` (the decoder skips the
+    detail we would throw away anyway), EXIF orientation is applied, the image is
+    resized to `max_side` and re-encoded compactly. Results are cached by content
+    hash, so re-captioning the same upload costs nothing.
+    """
+
+    def __init__(self, max_side: int = 1024, format: str = "JPEG", quality: int = 85, max_entries: int = 64):
+        self.max_side = max_side
+        self.format = format.upper()
+        self.quality = quality
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._totals = {"requests": 0, "cache_hits": 0, "original_bytes": 0, "sent_bytes": 0}
+
+    @property
+    def mime_type(self) -> str:
+        return "image/webp" if self.format == "WEBP" else "image/jpeg"
+
+    def _encode(self, img):
+        """Returns (encoded bytes, (width, height))."""
+        from PIL import Image, ImageOps
+        # JPEG reduce-on-load: only applies to JPEG sources, a no-op otherwise
+        img.draft("RGB", (self.max_side, self.max_side))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+        buffer = BytesIO()
+        img.save(buffer, format=self.format, quality=self.quality, optimize=True)
+        return buffer.getvalue(), img.size
+
+    def prepare(self, source) -> PreparedImage:
+        start = time.perf_counter()
+        raw, img = _read_source(source)
+        if raw is not None:
+            digest = hashlib.sha256(raw).hexdigest()
+            original_bytes = len(raw)
+        else:
+            digest = hashlib.sha256(img.tobytes()).hexdigest()
+            original_bytes = len(img.tobytes())
+        key = (digest, self.max_side, self.format, self.quality)
+
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+
+        if hit is None:
+            with get_tracer().span("image_preprocess", format=self.format):
+                if img is None:
+                    from PIL import Image
+                    img = Image.open(BytesIO(raw))
+                data, size = self._encode(img)
+            hit = ({"mime_type": self.mime_type, "data": data}, size)
+            with self._lock:
+                self._cache[key] = hit
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+            cached = False
+        else:
+            cached = True
+
+        blob, size = hit
+        prepared = PreparedImage(
+            blob=blob,
+            size=size,
+            original_bytes=original_bytes,
+            sent_bytes=len(blob["data"]),
+            preprocess_seconds=time.perf_counter() - start,
+            cached=cached
+        )
+        with self._lock:
+            self._totals["requests"] += 1
+            self._totals["cache_hits"] += int(cached)
+            self._totals["original_bytes"] += prepared.original_bytes
+            self._totals["sent_bytes"] += prepared.sent_bytes
+        get_tracer().count("image.bytes_saved", bytes_saved(prepared))
+        return prepared
+
+    def stats(self) -> dict:
+        with self._lock:
+            totals = dict(self._totals)
+        totals["bytes_saved"] = max(0, totals["original_bytes"] - totals["sent_bytes"])
+        totals["est_upload_seconds_saved"] = upload_seconds(totals["bytes_saved"])
+        return totals
+
+
+def bytes_saved(prepared: PreparedImage) -> int:
+    return max(0, prepared.original_bytes - prepared.sent_bytes)
+
+def upload_seconds(num_bytes: int) -> float:
+    return num_bytes * 8 / (UPLINK_MBPS * 1_000_000)
+
+def latency_saved(prepared: PreparedImage) -> float:
+    """
+    Estimated request latency saved: upload time for the bytes we didn't send,
+    minus the time spent preprocessing.
+    """
+    return upload_seconds(bytes_saved(prepared)) - prepared.preprocess_seconds
+
+
+DEFAULT_MAX_SIDE = int(os.getenv("GENAI_IMAGE_MAX_SIDE", "1024"))
+
+_preprocessors = {}
+_preprocessors_lock = threading.Lock()
+
+def get_preprocessor(max_side: int = None) -> ImagePreprocessor:
+    """
+    Returns the shared preprocessor for this size (GENAI_IMAGE_MAX_SIDE by default).
+    """
+    max_side = max_side or DEFAULT_MAX_SIDE
+    with _preprocessors_lock:
+        if max_side not in _preprocessors:
+            _preprocessors[max_side] = ImagePreprocessor(max_side=max_side)
+        return _preprocessors[max_side]
+
+def preprocess_image(source, max_side: int = None) -> PreparedImage:
+    return get_preprocessor(max_side).prepare(source)
@@ -0,0 +1,119 @@
+import os
+import threading
+
+# One model name for every Gemini app unless a caller asks for something else
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+_models = {}
+_lock = threading.Lock()
+_settings = None
+_genai = None
+_warm_ups = {}
+
+
+def configure(api_key: str = None, endpoint: str = None):
+    """
+    Configures the Gemini SDK once per process. Later calls are no-ops.
+
+    `endpoint` (or GEMINI_API_ENDPOINT) points the SDK at another server over
+    REST, e.g. the local stub in benchmarks/stub_server.py.
+
+    The SDK itself takes about a second to import, so this only records the
+    settings; they are applied when the first model is built.
+    """
+    global _settings
+    with _lock:
+        if _settings is None:
+            endpoint = endpoint or os.getenv("GEMINI_API_ENDPOINT")
+            if endpoint:
+                _settings = {"api_key": api_key or os.getenv("GEMINI_API_KEY") or "stub", "transport": "rest",
+                             "client_options": {"api_endpoint": endpoint}}
+            else:
+                _settings = {"api_key": api_key or os.getenv("GEMINI_API_KEY")}
+            if _genai is not None:
+                _genai.configure(**_settings)
+
+
+def sdk():
+    """
+    Returns the `google.generativeai` module, importing and configuring it on
+    first use.
+    """
+    global _genai
+    if _genai is not None:
+        return _genai
+    import google.generativeai as genai
+    with _lock:
+        if _genai is None:
+            if _settings is not None:
+                genai.configure(**_settings)
+            _genai = genai
+        return _genai
+
+
+def get_model(model_name: str = DEFAULT_MODEL, system_instruction: str = None):
+    """
+    Returns the shared `GenerativeModel` for this (model name, system instruction)
+    pair, building it on first use.
+
+    All models built here go through the SDK's default generative client, so
+    every caller shares the same warm connection instead of paying for a fresh
+    model object (and proto conversion of the system instruction) per request.
+    """
+    key = (model_name, system_instruction)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    sdk()
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            model = _genai.GenerativeModel(model_name=model_name, system_instruction=system_instruction)
+            _models[key] = model
+        return model
+
+
+def warm_up(model_name: str = DEFAULT_MODEL, system_instruction: str = None):
+    """
+    Builds the model and opens its connection with a cheap `count_tokens` call,
+    so the first real request does not pay for the handshake.
+    """
+    model = get_model(model_name, system_instruction)
+    model.count_tokens("ping")
+    return model
+
+
+def start_warm_up(model_name: str = DEFAULT_MODEL, system_instruction: str = None, modules=()):
+    """
+    Runs `warm_up` (and imports `modules`) on a background thread, once per
+    process and model, so the SDK import and connection setup overlap with the
+    user reading the page instead of delaying the first request. Failures are
+    ignored: the first real request simply pays for the setup itself.
+    """
+    key = (model_name, system_instruction)
+    with _lock:
+        if key in _warm_ups:
+            return _warm_ups[key]
+
+        def run():
+            try:
+                for module in modules:
+                    __import__(module)
+                warm_up(model_name, system_instruction)
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=run, name="gemini-warm-up", daemon=True)
+        _warm_ups[key] = thread
+    thread.start()
+    return thread
+
+
+def registered_models() -> list:
+    with _lock:
+        return list(_models.keys())
+
+
+def clear():
+    with _lock:
+        _models.clear()
@@ -0,0 +1,258 @@
+"""
+Server-side caching of long, fixed prompt prefixes (personas, templates).
+
+    from common.prompt_cache import get_prefix_model
+    model = get_prefix_model(DEFAULT_MODEL, system_instruction=LONG_TEMPLATE)
+    response = model.generate_content(details)   # only `details` is billed in full
+
+The prefix is uploaded once as Gemini cached content and every request that
+uses the returned model refers to it instead of resending it. The upload runs
+in the background; until it is ready, and for prefixes the API won't cache
+(too short, unsupported model, no permission), requests transparently use a
+normal model with the same system instruction.
+"""
+import time
+import hashlib
+import datetime
+import threading
+from collections import deque
+
+from common.models import DEFAULT_MODEL, get_model, sdk
+from common.tracing import get_tracer
+
+# How long an uploaded prefix lives, and how early before expiry it is extended
+DEFAULT_TTL = 3600
+REFRESH_MARGIN = 300
+# After a failed upload, wait this long before trying that prefix again
+RETRY_UNSUPPORTED_AFTER = 3600
+# Gemini refuses cached content with fewer tokens than this (gemini-2.0-flash)
+MIN_CACHE_TOKENS = 4096
+
+
+def _is_missing_cache_error(error: Exception) -> bool:
+    text = f"{type(error).__name__} {error}".lower()
+    return "notfound" in text or "not found" in text or "cachedcontent" in text or "cached content" in text
+
+
+class PrefixCachedModel:
+    """
+    Model proxy that sends requests through cached content for its system
+    instruction, extending the cache when it is about to expire and
+    recreating it once it has. Safe to share between sessions and threads.
+
+    Anything that takes a model (cached_generate, ConversationMemory, ...)
+    accepts this in its place.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, system_instruction: str = None, ttl: float = DEFAULT_TTL):
+        self.plain = get_model(model_name, system_instruction)
+        self.system_instruction = system_instruction
+        self.ttl = ttl
+        self.version = hashlib.sha256(f"{model_name}\0{system_instruction}".encode("utf-8")).hexdigest()[:12]
+        self._cached = None
+        self._cached_model = None
+        self._expires_at = 0.0
+        self._unsupported_until = 0.0
+        self.prefix_tokens = None # counted before the first upload
+        self._updating = False # a create or refresh is in flight
+        self._updater = None
+        self._lock = threading.Lock()
+        self.recent = deque(maxlen=100) # token_savings() of the latest requests
+        self._stats = {"requests": 0, "cached_requests": 0, "creates": 0, "refreshes": 0, "fallbacks": 0,
+                       "prompt_tokens": 0, "cached_tokens": 0}
+
+    # Look like the plain model to callers that inspect it
+    @property
+    def model_name(self) -> str:
+        return self.plain.model_name
+
+    @property
+    def _system_instruction(self):
+        return self.plain._system_instruction
+
+    def count_tokens(self, *args, **kwargs):
+        return self.plain.count_tokens(*args, **kwargs)
+
+    # --- Cache handle ---
+
+    def _resolve(self):
+        """
+        Returns the model to use right now: cached-content backed, or plain.
+
+        Never waits on the network: creating or extending the cache runs on a
+        background thread, and requests use the current model meanwhile.
+        """
+        now = time.time()
+        with self._lock:
+            if now < self._unsupported_until:
+                return self.plain
+            live = self._cached is not None and now < self._expires_at
+            current = self._cached_model if live else self.plain
+            if self._updating or (live and self._expires_at - now >= REFRESH_MARGIN):
+                return current
+            self._updating = True
+            handle = self._cached if live else None
+            self._updater = threading.Thread(
+                target=self._update, args=(handle,), name=f"prompt-cache-{self.version}", daemon=True
+            )
+        self._updater.start()
+        return current
+
+    def _update(self, handle):
+        try:
+            if handle is not None and self._extend(handle):
+                return
+            # Never created, expired while the app was idle, or gone from the server
+            if self._large_enough():
+                self._create()
+        finally:
+            with self._lock:
+                self._updating = False
+
+    def _large_enough(self) -> bool:
+        """
+        Counts the prefix once; shorter than MIN_CACHE_TOKENS it is never
+        uploaded, since the API would refuse it.
+        """
+        if self.prefix_tokens is None:
+            try:
+                self.prefix_tokens = self.plain.count_tokens(self.system_instruction).total_tokens
+            except Exception:
+                return True # can't tell: let the upload decide
+        if self.prefix_tokens >= MIN_CACHE_TOKENS:
+            return True
+        with self._lock:
+            self._unsupported_until = float("inf")
+            self._stats["fallbacks"] += 1
+        get_tracer().count("prompt_cache.too_short")
+        return False
+
+    def _extend(self, handle) -> bool:
+        """Pushes the expiry of a live cache back; False if the server no longer has it."""
+        try:
+            handle.update(ttl=datetime.timedelta(seconds=self.ttl))
+        except Exception as e:
+            # Anything else is likely transient: keep using the cache until it expires
+            return not _is_missing_cache_error(e)
+        with self._lock:
+            self._expires_at = time.time() + self.ttl
+            self._stats["refreshes"] += 1
+        return True
+
+    def _create(self):
+        """Uploads the prefix; falls back to the plain model if the API refuses it."""
+        genai = sdk()
+        try:
+            cached = genai.caching.CachedContent.create(
+                model=self.plain.model_name,
+                display_name=f"prefix-{self.version}",
+                system_instruction=self.system_instruction,
+                ttl=datetime.timedelta(seconds=self.ttl)
+            )
+            cached_model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+        except Exception:
+            # Too short to cache, model without caching support, no permission, ...
+            with self._lock:
+                self._cached = self._cached_model = None
+                self._unsupported_until = time.time() + RETRY_UNSUPPORTED_AFTER
+                self._stats["fallbacks"] += 1
+            get_tracer().count("prompt_cache.fallbacks")
+            return self.plain
+        with self._lock:
+            self._cached, self._cached_model = cached, cached_model
+            self._expires_at = time.time() + self.ttl
+            self._stats["creates"] += 1
+        get_tracer().count("prompt_cache.creates")
+        return cached_model
+
+    def invalidate(self):
+        with self._lock:
+            self._cached = self._cached_model = None
+
+    # --- Generation ---
+
+    def generate_content(self, contents, **kwargs):
+        model = self._resolve()
+        try:
+            response = model.generate_content(contents, **kwargs)
+        except Exception as e:
+            if model is self.plain or not _is_missing_cache_error(e):
+                raise
+            # The server dropped the cache early: recreate it on the next request
+            self.invalidate()
+            model = self.plain
+            response = model.generate_content(contents, **kwargs)
+        if kwargs.get("stream"):
+            return self._stream(response, cached=model is not self.plain)
+        self._record(response, cached=model is not self.plain)
+        return response
+
+    def _stream(self, response, cached: bool):
+        # The last chunk carries the usage of the whole response
+        last = None
+        for chunk in response:
+            last = chunk
+            yield chunk
+        if last is not None:
+            self._record(last, cached)
+
+    def _record(self, response, cached: bool):
+        savings = token_savings(response)
+        with self._lock:
+            self.recent.append(savings)
+            self._stats["requests"] += 1
+            self._stats["cached_requests"] += int(cached)
+            self._stats["prompt_tokens"] += savings["prompt_tokens"]
+            self._stats["cached_tokens"] += savings["cached_tokens"]
+        get_tracer().count("prompt_cache.tokens_saved", savings["cached_tokens"])
+
+    def stats(self) -> dict:
+        """
+        Request counts and the share of input tokens served from the cache.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["last_request"] = self.recent[-1] if self.recent else None
+        stats["input_token_reduction"] = (
+            stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+        )
+        stats["active"] = self._cached is not None
+        stats["prefix_tokens"] = self.prefix_tokens
+        return stats
+
+
+def token_savings(response) -> dict:
+    """
+    Per-request report: prompt tokens, how many of them came from cached
+    content and the resulting input-token reduction.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    cached_tokens = getattr(usage, "cached_content_token_count", 0) or 0
+    return {
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "reduction": cached_tokens / prompt_tokens if prompt_tokens else 0.0
+    }
+
+
+_prefix_models = {}
+_prefix_models_lock = threading.Lock()
+
+def get_prefix_model(model_name: str = DEFAULT_MODEL, system_instruction: str = None,
+                     ttl: float = DEFAULT_TTL) -> PrefixCachedModel:
+    """
+    Returns the shared prefix-cached model for this (model, instruction). A new
+    instruction text is a new version and gets its own cache.
+    """
+    key = (model_name, system_instruction)
+    with _prefix_models_lock:
+        model = _prefix_models.get(key)
+        if model is None:
+            model = _prefix_models[key] = PrefixCachedModel(model_name, system_instruction, ttl)
+        return model
+
+def all_prefix_stats() -> dict:
+    with _prefix_models_lock:
+        models = list(_prefix_models.values())
+    return {model.version: model.stats() for model in models}
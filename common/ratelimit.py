@@ -0,0 +1,447 @@
+"""
+Client-side rate limiting and retries for model calls.
+
+    from common.ratelimit import BATCH, get_scheduler, use_priority
+    text = get_scheduler().call(model.generate_content, prompt).text
+
+    with use_priority(BATCH):   # batch jobs yield to interactive requests
+        ...
+
+All apps in one process share the scheduler from `get_scheduler()`, sized by
+GENAI_RPM (requests/minute) and GENAI_TPM (tokens/minute).
+"""
+import os
+import re
+import heapq
+import random
+import time
+import threading
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from common.tracing import get_tracer
+
+# Lower numbers are served first
+INTERACTIVE = 0
+BATCH = 10
+
+# Gemini bills an inline image as a fixed number of tokens
+IMAGE_TOKENS = 258
+CHARS_PER_TOKEN = 4
+
+
+# --- Clocks ---
+
+class MonotonicClock:
+    def now(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    def wait(self, condition: threading.Condition, timeout: float):
+        """Waits on `condition` (held by the caller) for at most `timeout` seconds."""
+        condition.wait(timeout)
+
+
+class FakeClock:
+    """
+    Deterministic clock for tests: sleeping and waiting advance time instantly.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.time = start
+        self.slept = []
+
+    def now(self) -> float:
+        return self.time
+
+    def sleep(self, seconds: float):
+        self.slept.append(seconds)
+        self.time += max(0.0, seconds)
+
+    def wait(self, condition, timeout: float):
+        self.sleep(timeout)
+
+# --- Errors ---
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the model while the circuit breaker is open."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Model calls are paused after repeated failures; retrying in {retry_in:.0f}s.")
+        self.retry_in = retry_in
+
+
+# HTTP statuses worth retrying
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+# Exception classes (matched by name anywhere in the class hierarchy, so the SDKs
+# don't have to be imported) for server errors, timeouts and dropped connections:
+# google.api_core.exceptions and requests.exceptions
+RETRYABLE_ERROR_CLASSES = {
+    "ServerError", "ServiceUnavailable", "InternalServerError", "BadGateway", "GatewayTimeout",
+    "DeadlineExceeded", "TooManyRequests", "ResourceExhausted", "Timeout", "ConnectionError",
+    "ChunkedEncodingError"
+}
+RETRYABLE_MESSAGE = re.compile(
+    r"\b(?:429|50[0234])\b|service unavailable|internal server error|deadline exceeded|timed out|"
+    r"connection (?:reset|refused|aborted|closed)",
+    re.IGNORECASE
+)
+
+
+def status_code(error: Exception):
+    """
+    The HTTP status an error carries (`GoogleAPICallError.code`, or the status of
+    an attached `requests` response), or None.
+    """
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and 100 <= code < 600:
+        return code
+    code = getattr(getattr(error, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+def is_rate_limit_error(error: Exception) -> bool:
+    status = status_code(error)
+    if status is not None:
+        return status == 429
+    text = f"{type(error).__name__} {error}".lower()
+    return ("ratelimit" in text or "rate limit" in text or re.search(r"\b429\b", text) is not None
+            or "too many requests" in text or "resourceexhausted" in text or "quota" in text)
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Rate limits, server errors and timeouts are worth retrying; bad requests are not.
+
+    The error's status code decides when it has one; otherwise its class, and
+    only then whole status codes and phrases in the message (so "limit is 5000
+    bytes" is not mistaken for a 500).
+    """
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in RETRYABLE_ERROR_CLASSES for cls in type(error).__mro__):
+        return True
+    return is_rate_limit_error(error) or RETRYABLE_MESSAGE.search(str(error)) is not None
+
+def retry_after_seconds(error: Exception):
+    """
+    Returns the server's Retry-After hint when the error carries one, either as
+    an HTTP header or as a retry delay in the message.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        match = re.search(r"retry[ _-]?(?:after|delay|in)\D{0,20}(\d+(?:\.\d+)?)", str(error), re.IGNORECASE)
+        value = match.group(1) if match else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def backoff_delay(attempt: int, error: Exception, base_delay: float = 1.0, max_delay: float = 60.0) -> float:
+    """
+    Seconds to wait before retrying after `error` on attempt `attempt` (0-based):
+    the server's retry-after hint when it sent one, otherwise jittered
+    exponential backoff, four times longer for rate limits.
+    """
+    hint = retry_after_seconds(error)
+    if hint is not None:
+        return min(hint, max_delay)
+    # Rate limits need a longer cool-down than ordinary failures
+    base = base_delay * (4 if is_rate_limit_error(error) else 1)
+    delay = min(max_delay, base * 2 ** attempt)
+    return delay * random.uniform(0.5, 1.0)
+
+def estimate_tokens(contents) -> int:
+    """
+    Rough token count of `generate_content` input, used to charge the
+    tokens/minute bucket before the real count is known.
+    """
+    if isinstance(contents, str):
+        return max(1, len(contents) // CHARS_PER_TOKEN)
+    if isinstance(contents, dict):
+        if "parts" in contents:
+            return estimate_tokens(contents["parts"])
+        return IMAGE_TOKENS if "data" in contents else 0
+    if isinstance(contents, (list, tuple)):
+        return sum(estimate_tokens(part) for part in contents)
+    # PIL images and anything else we can't measure
+    return IMAGE_TOKENS
+
+# --- Building blocks ---
+
+class TokenBucket:
+    """
+    Holds up to `capacity` units and refills at `per_minute` units per minute.
+    `take` may drive the level negative, which is how a call that turned out
+    bigger than estimated pays off its debt.
+    """
+
+    def __init__(self, per_minute: float, capacity: float = None, clock=None):
+        self.clock = clock or MonotonicClock()
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.level = self.capacity
+        self._updated = self.clock.now()
+
+    def _refill(self):
+        now = self.clock.now()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)."""
+        self._refill()
+        # Requests bigger than the bucket only wait for a full one
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+    def set_rate(self, per_minute: float, capacity: float = None):
+        self._refill()
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.level = min(self.level, self.capacity)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds; then lets one trial call through (half-open) and
+    closes again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=None):
+        self.clock = clock or MonotonicClock()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Raises `CircuitOpenError` when calls should not go through."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            remaining = self._opened_at + self.reset_timeout - self.clock.now()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"
+                return
+            raise CircuitOpenError(max(0.0, remaining))
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    get_tracer().count("ratelimit.circuit_opened")
+                self.state = "open"
+                self._opened_at = self.clock.now()
+
+# --- Scheduler ---
+
+_priority = ContextVar("genai_priority", default=INTERACTIVE)
+
+@contextmanager
+def use_priority(priority: int):
+    """
+    Model calls made inside the block (in this thread) are queued at `priority`.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class ModelScheduler:
+    """
+    Admits model calls under a requests/minute and a tokens/minute budget.
+
+    Waiting callers are served in priority order (then arrival order), so an
+    interactive chat turn overtakes a queue of batch jobs. Retryable failures
+    are retried with jittered exponential backoff, honouring the server's
+    retry-after hint, and feed a circuit breaker that fails fast while the
+    API is down.
+
+    Pass a `FakeClock` to test the scheduling without sleeping.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 60,
+        tokens_per_minute: float = 1_000_000,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        expected_output_tokens: int = 500,
+        breaker: CircuitBreaker = None,
+        clock=None
+    ):
+        self.clock = clock or MonotonicClock()
+        self.requests = TokenBucket(requests_per_minute, capacity=max(1.0, requests_per_minute / 10), clock=self.clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock=self.clock)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.expected_output_tokens = expected_output_tokens
+        self.breaker = breaker or CircuitBreaker(clock=self.clock)
+        self._queue = [] # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._stats = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0, "max_queue_depth": 0, "wait_seconds": 0.0}
+
+    # --- Admission ---
+
+    def acquire(self, tokens: int = 0, priority: int = None) -> float:
+        """
+        Blocks until this caller is first in line and both buckets have room,
+        then charges them. Returns the seconds spent waiting.
+        """
+        priority = _priority.get() if priority is None else priority
+        ticket = (priority, next(self._sequence))
+        start = self.clock.now()
+        with self._condition:
+            heapq.heappush(self._queue, ticket)
+            depth = len(self._queue)
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], depth)
+            try:
+                while True:
+                    if self._queue[0] == ticket:
+                        wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            break
+                    else:
+                        # Someone ahead of us; they will wake us when they leave
+                        wait = self.max_delay
+                    self.clock.wait(self._condition, wait)
+            finally:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._condition.notify_all()
+        waited = self.clock.now() - start
+        self._count("wait_seconds", waited)
+        get_tracer().observe("ratelimit.wait", waited)
+        return waited
+
+    def _count(self, name, amount=1):
+        with self._condition:
+            self._stats[name] += amount
+
+    def set_rate(self, requests_per_minute: float = None, tokens_per_minute: float = None):
+        """
+        Changes the budgets, e.g. from a batch runner's --rpm flag. Waiting
+        callers re-check against the new rate.
+        """
+        with self._condition:
+            if requests_per_minute:
+                self.requests.set_rate(requests_per_minute, capacity=max(1.0, requests_per_minute / 10))
+            if tokens_per_minute:
+                self.tokens.set_rate(tokens_per_minute)
+            self._condition.notify_all()
+
+    def queue_depth(self) -> int:
+        with self._condition:
+            return len(self._queue)
+
+    # --- Calls ---
+
+    def call(self, fn, *args, priority: int = None, tokens: int = None, **kwargs):
+        """
+        Runs `fn(*args, **kwargs)` once admitted, retrying retryable errors.
+        `tokens` defaults to an estimate from the first positional argument.
+        Raises the last error, or `CircuitOpenError` while the breaker is open.
+        """
+        if tokens is None:
+            tokens = (estimate_tokens(args[0]) if args else 0) + self.expected_output_tokens
+        tracer = get_tracer()
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.breaker.allow()
+            except CircuitOpenError:
+                self._count("rejected")
+                tracer.count("ratelimit.rejected")
+                raise
+            self.acquire(tokens, priority)
+            self._count("calls")
+            healthy = False
+            error = None
+            try:
+                result = fn(*args, **kwargs)
+                healthy = True
+            except Exception as e:
+                if not is_retryable_error(e):
+                    # A bad request still means the service answered
+                    healthy = True
+                    raise
+                error = e
+            finally:
+                # Every call settles the breaker, so a half-open trial can't stay pending
+                if healthy:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+            if error is None:
+                self._settle(tokens, result)
+                return result
+            self._count("failures")
+            if attempt == self.max_retries:
+                raise error
+            self._count("retries")
+            tracer.count("ratelimit.retries")
+            self.clock.sleep(backoff_delay(attempt, error, self.base_delay, self.max_delay))
+
+    def _settle(self, estimated: int, response):
+        """Corrects the tokens/minute bucket once the real usage is known."""
+        usage = getattr(response, "usage_metadata", None)
+        actual = getattr(usage, "total_token_count", None)
+        if actual:
+            with self._condition:
+                self.tokens.take(actual - estimated)
+
+    def generate(self, model, contents, priority: int = None, **kwargs):
+        """Scheduled `model.generate_content(contents, **kwargs)`."""
+        return self.call(model.generate_content, contents, priority=priority, **kwargs)
+
+    def stats(self) -> dict:
+        with self._condition:
+            stats = dict(self._stats)
+            stats["queue_depth"] = len(self._queue)
+        stats["circuit"] = self.breaker.state
+        return stats
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> ModelScheduler:
+    """
+    Returns the process-wide scheduler (GENAI_RPM / GENAI_TPM, defaults 60 and 1M).
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ModelScheduler(
+                requests_per_minute=float(os.getenv("GENAI_RPM", "60")),
+                tokens_per_minute=float(os.getenv("GENAI_TPM", "1000000"))
+            )
+        return _scheduler
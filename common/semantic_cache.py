@@ -0,0 +1,310 @@
+"""
+Near-duplicate cache for free-text requests (research topics, meme topics).
+
+    from common.semantic_cache import get_semantic_cache
+    cache = get_semantic_cache("research")
+    report, hit = cache.get_or_compute(topic, lambda: run_research(topic), fresh=user_wants_new)
+
+"quantum computing" and "Quantum Computing trends" are the same request as far
+as the cache is concerned: topics are compared as TF-IDF vectors (words plus
+character trigrams, research filler words dropped) and any stored answer with
+cosine similarity above `threshold` that is younger than `ttl` is reused.
+
+Search is NumPy brute force. With `hnswlib` installed, large caches use an HNSW
+index for candidates and re-rank them exactly. Any `embed(texts) -> array`
+callable (e.g. a local sentence-transformers model) can replace TF-IDF.
+"""
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from common.cache import DEFAULT_CACHE_DIR
+from common.tracing import get_tracer
+
+DEFAULT_THRESHOLD = float(os.getenv("GENAI_SEMANTIC_THRESHOLD", "0.85"))
+# Use an ANN index (when hnswlib is installed) once a namespace holds this many entries
+ANN_MIN_ENTRIES = 2000
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from how in into is it its of on or the to what when where which who why with
+about latest recent current new trends trend overview introduction developments development update updates
+state today future news analysis
+""".split())
+
+SemanticHit = namedtuple("SemanticHit", ["text", "value", "similarity", "created_at"])
+
+# --- Vectors ---
+
+def tokenize(text: str) -> list:
+    """Content words of `text`, lowercased, without stopwords."""
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS]
+
+def features(text: str) -> list:
+    """Words plus their character trigrams, so "computers" still matches "computing"."""
+    words = tokenize(text)
+    grams = [f"#{gram}" for word in words for gram in (word[i:i + 3] for i in range(max(1, len(word) - 2)))]
+    return words + grams
+
+
+class TfidfVectorizer:
+    """
+    Hashed TF-IDF for short texts. Rows hold sublinear term counts; IDF comes
+    from document frequencies updated as texts are added, and is applied at
+    query time so old rows never need re-encoding.
+    """
+
+    def __init__(self, dim: int = 2048):
+        self.dim = dim
+        self.doc_freq = np.zeros(dim, dtype=np.float32)
+        self.docs = 0
+
+    def _bucket(self, feature: str) -> int:
+        return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest(), "little") % self.dim
+
+    def term_vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in features(text):
+            # Trigrams count for less than whole words
+            vector[self._bucket(feature)] += 0.5 if feature.startswith("#") else 1.0
+        nonzero = vector > 0
+        vector[nonzero] = 1 + np.log(vector[nonzero])
+        return vector
+
+    def add(self, term_vector: np.ndarray):
+        self.doc_freq += term_vector > 0
+        self.docs += 1
+
+    def idf(self) -> np.ndarray:
+        return np.log((1 + self.docs) / (1 + self.doc_freq)) + 1
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+# --- Cache ---
+
+class SemanticCache:
+    """
+    Answers stored by the text that produced them, looked up by similarity.
+
+    Entries live in SQLite (shared with the other caches' directory) and are
+    re-vectorised into memory on first use. `threshold` is the cosine
+    similarity above which a stored answer counts as a duplicate; `ttl` is how
+    long an answer stays fresh. `embed(texts) -> (n, d) array` swaps TF-IDF for
+    an embedding model.
+    """
+
+    def __init__(self, namespace: str, path: str = None, threshold: float = DEFAULT_THRESHOLD,
+                 ttl: float = 7 * 24 * 3600, embed=None, use_ann: bool = True, dim: int = 2048):
+        if path is None:
+            path = os.path.join(os.getenv("GENAI_CACHE_DIR", DEFAULT_CACHE_DIR), "semantic_cache.sqlite3")
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.namespace = namespace
+        self.threshold = threshold
+        self.ttl = ttl
+        self.embed = embed
+        self.use_ann = use_ann
+        self.vectorizer = TfidfVectorizer(dim)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._rows = [] # (entry id, text, created_at), aligned with self._matrix
+        self._positions = {} # text -> its position in self._rows
+        self._created_at = np.zeros(0) # created_at of each row, for masking expired ones
+        self._matrix = None
+        self._weighted_matrix = None # normalised TF-IDF of _matrix, rebuilt after each add
+        self._ann = None
+        self._ann_size = 0
+        self._counters = {"hits": 0, "misses": 0, "bypassed": 0}
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS semantic_entries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    namespace TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS semantic_namespace ON semantic_entries (namespace, created_at)")
+
+    # --- Index ---
+
+    def _vectors(self, texts) -> np.ndarray:
+        if self.embed is not None:
+            return np.asarray(self.embed(list(texts)), dtype=np.float32)
+        return np.stack([self.vectorizer.term_vector(text) for text in texts])
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM semantic_entries WHERE namespace = ? AND created_at < ?",
+                (self.namespace, time.time() - self.ttl)
+            )
+        rows = self._conn.execute(
+            "SELECT id, text, created_at FROM semantic_entries WHERE namespace = ? ORDER BY id", (self.namespace,)
+        ).fetchall()
+        self._rows = list(rows)
+        self._positions = {text: position for position, (_, text, _) in enumerate(rows)}
+        self._created_at = np.array([created_at for _, _, created_at in rows], dtype=np.float64)
+        if rows:
+            self._matrix = self._vectors([text for _, text, _ in rows])
+            if self.embed is None:
+                for vector in self._matrix:
+                    self.vectorizer.add(vector)
+        self._loaded = True
+
+    def _weighted(self, matrix: np.ndarray) -> np.ndarray:
+        if self.embed is not None:
+            return _normalize(matrix)
+        return _normalize(matrix * self.vectorizer.idf())
+
+    def _candidates(self, query: np.ndarray, k: int = 10):
+        """Row positions worth scoring: all of them, or the ANN's nearest `k`."""
+        if not self.use_ann or len(self._rows) < ANN_MIN_ENTRIES:
+            return None
+        try:
+            import hnswlib
+        except ImportError:
+            return None
+        if self._ann is None or self._ann_size < len(self._rows):
+            # Built with today's IDF; results are re-ranked with the current one anyway
+            vectors = self._weighted(self._matrix)
+            if self._ann is None:
+                self._ann = hnswlib.Index(space="cosine", dim=vectors.shape[1])
+                self._ann.init_index(max_elements=max(len(vectors) * 2, 1024), ef_construction=200, M=16)
+            elif self._ann.get_max_elements() < len(vectors):
+                self._ann.resize_index(len(vectors) * 2)
+            self._ann.add_items(vectors[self._ann_size:], np.arange(self._ann_size, len(vectors)))
+            self._ann_size = len(vectors)
+        labels, _ = self._ann.knn_query(query, k=min(k, self._ann_size))
+        return labels[0]
+
+    # --- Lookups ---
+
+    def lookup(self, text: str):
+        """
+        Returns the most similar fresh entry as a `SemanticHit`, or None if
+        nothing is similar enough.
+        """
+        hit = self._lookup(text)
+        self._count("hits" if hit is not None else "misses")
+        get_tracer().count("semantic_cache.hits" if hit is not None else "semantic_cache.misses")
+        return hit
+
+    def _lookup(self, text: str):
+        with self._lock:
+            self._ensure_loaded()
+            if not self._rows:
+                return None
+            query_terms = self._vectors([text])
+            query = self._weighted(query_terms)[0]
+            candidates = self._candidates(query)
+            if candidates is None:
+                if self._weighted_matrix is None:
+                    self._weighted_matrix = self._weighted(self._matrix)
+                similarities = self._weighted_matrix @ query
+            else:
+                similarities = self._weighted(self._matrix[candidates]) @ query
+            # Expired entries never win, even over a slightly less similar fresh one
+            created_at = self._created_at if candidates is None else self._created_at[candidates]
+            similarities = np.where(created_at >= time.time() - self.ttl, similarities, -np.inf)
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            position = best if candidates is None else int(candidates[best])
+            entry_id, stored_text, created_at = self._rows[position]
+        if similarity < self.threshold:
+            return None
+        row = self._conn.execute("SELECT value FROM semantic_entries WHERE id = ?", (entry_id,)).fetchone()
+        if row is None:
+            return None
+        return SemanticHit(stored_text, row[0], similarity, created_at)
+
+    def add(self, text: str, value: str):
+        """Stores `value` for `text`, replacing the answer already stored for exactly this text."""
+        now = time.time()
+        with self._lock:
+            self._ensure_loaded()
+            position = self._positions.get(text)
+            if position is not None:
+                entry_id = self._rows[position][0]
+                with self._conn:
+                    self._conn.execute(
+                        "UPDATE semantic_entries SET value = ?, created_at = ? WHERE id = ?", (value, now, entry_id)
+                    )
+                self._rows[position] = (entry_id, text, now)
+                self._created_at[position] = now
+                return
+            with self._conn:
+                entry_id = self._conn.execute(
+                    "INSERT INTO semantic_entries (namespace, text, value, created_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, text, value, now)
+                ).lastrowid
+            vector = self._vectors([text])
+            if self.embed is None:
+                self.vectorizer.add(vector[0])
+            self._matrix = vector if self._matrix is None else np.vstack([self._matrix, vector])
+            self._weighted_matrix = None
+            self._positions[text] = len(self._rows)
+            self._rows.append((entry_id, text, now))
+            self._created_at = np.append(self._created_at, now)
+
+    def get_or_compute(self, text: str, compute, fresh: bool = False):
+        """
+        Returns (value, hit): a stored answer to a near-duplicate of `text`, or
+        `compute()`'s result, which is then stored. `fresh=True` always computes
+        (the user asked for a new answer); `hit` is the `SemanticHit` or None.
+        """
+        if fresh:
+            self._count("bypassed")
+        else:
+            hit = self.lookup(text)
+            if hit is not None:
+                return hit.value, hit
+        value = compute()
+        self.add(text, value)
+        return value, None
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._rows)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM semantic_entries WHERE namespace = ?", (self.namespace,))
+            self._rows, self._matrix, self._weighted_matrix, self._ann, self._ann_size = [], None, None, None, 0
+            self._positions, self._created_at = {}, np.zeros(0)
+            self.vectorizer = TfidfVectorizer(self.vectorizer.dim)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_semantic_cache(namespace: str, **kwargs) -> SemanticCache:
+    """
+    Returns the process-wide cache for `namespace` ("research", "meme", ...).
+    `kwargs` only apply when the cache is first created.
+    """
+    with _caches_lock:
+        if namespace not in _caches:
+            _caches[namespace] = SemanticCache(namespace, **kwargs)
+        return _caches[namespace]
@@ -0,0 +1,87 @@
+import threading
+
+from common.tracing import get_tracer
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one.
+
+    The first caller for a key runs the function; everyone who asks for the
+    same key while it is still running waits and gets the same result (or the
+    same exception). Once the call finishes the key is forgotten, so this only
+    covers the in-flight window; the response cache covers the rest.
+
+    Streamlit runs every session in its own thread of one process, so a shared
+    instance coalesces identical requests across sessions.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {"leaders": 0, "coalesced": 0}
+
+    def do(self, key, fn):
+        """
+        Returns (result, shared) where `shared` is True when the result came
+        from another caller's in-flight call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._counters["coalesced"] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._counters["leaders"] += 1
+                leader = True
+
+        tracer = get_tracer()
+        if not leader:
+            tracer.count("singleflight.coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        tracer.count("singleflight.leaders")
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+        total = stats["leaders"] + stats["coalesced"]
+        # Share of requests that were answered by someone else's call
+        stats["coalescing_ratio"] = stats["coalesced"] / total if total else 0.0
+        return stats
+
+
+_default_flight = SingleFlight()
+
+def get_singleflight() -> SingleFlight:
+    """
+    Returns the process-wide instance shared by all apps and sessions.
+    """
+    return _default_flight
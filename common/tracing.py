@@ -0,0 +1,250 @@
+"""
+Lightweight in-process tracing: spans, counters and histograms.
+
+    from common.tracing import get_tracer
+    tracer = get_tracer()
+    with tracer.span("generate_content", model="gemini-2.0-flash"):
+        response = model.generate_content(prompt)
+    tracer.record_usage(response)
+
+Set GENAI_TRACE_JSONL=<path> to append every span to a JSONL file and
+GENAI_TRACE_PROM=<path> to keep a Prometheus text-format snapshot up to date.
+Set GENAI_SHOW_METRICS=1 to show the sidebar panel in the Streamlit apps.
+"""
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Recent samples kept per histogram for percentiles
+RESERVOIR_SIZE = 2048
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class JsonlSink:
+    """Appends one JSON line per finished span."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def emit(self, event: dict):
+        line = json.dumps(event) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class PrometheusFileSink:
+    """Rewrites a Prometheus text-format file at most every `interval` seconds."""
+
+    def __init__(self, path: str, interval: float = 10.0):
+        self.path = path
+        self.interval = interval
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+
+    def emit(self, event: dict, tracer=None):
+        now = time.monotonic()
+        with self._lock:
+            if tracer is None or now - self._last_write < self.interval:
+                return
+            self._last_write = now
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(tracer.to_prometheus())
+        os.replace(tmp_path, self.path)
+
+
+class Tracer:
+    def __init__(self, app: str = "genai", sinks=None):
+        self.app = app
+        self.sinks = list(sinks or [])
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    # --- Recording ---
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        Times the block and records it under the `<name>` latency histogram.
+        Exceptions are counted as `<name>.errors` and re-raised.
+        """
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attributes
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe(name, seconds)
+            if error is not None:
+                self.count(f"{name}.errors")
+            event = {
+                "ts": time.time(), "app": self.app, "span": name,
+                "seconds": round(seconds, 6), **attributes
+            }
+            if error is not None:
+                event["error"] = type(error).__name__
+            self._emit(event)
+
+    def record_usage(self, response, prefix: str = "tokens"):
+        """
+        Adds the token counts from a Gemini response's `usage_metadata`.
+        """
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        for field, name in (
+            ("prompt_token_count", "prompt"),
+            ("candidates_token_count", "output"),
+            ("cached_content_token_count", "cached")
+        ):
+            value = getattr(usage, field, None)
+            if value:
+                self.count(f"{prefix}.{name}", value)
+
+    def _emit(self, event: dict):
+        for sink in self.sinks:
+            try:
+                if isinstance(sink, PrometheusFileSink):
+                    sink.emit(event, self)
+                else:
+                    sink.emit(event)
+            except OSError:
+                # Tracing must never break the app
+                pass
+
+    # --- Reading ---
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            spans = {
+                name: {
+                    "count": h.count,
+                    "mean": h.total / h.count if h.count else 0.0,
+                    "p50": h.percentile(0.50),
+                    "p95": h.percentile(0.95)
+                }
+                for name, h in self._histograms.items()
+            }
+            counters = dict(self._counters)
+        return {"app": self.app, "spans": spans, "counters": counters}
+
+    def to_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        app = snapshot["app"]
+        lines = [
+            "# TYPE genai_span_seconds summary",
+        ]
+        for name, s in sorted(snapshot["spans"].items()):
+            labels = f'app="{app}",span="{name}"'
+            lines.append(f'genai_span_seconds{{{labels},quantile="0.5"}} {s["p50"]:.6f}')
+            lines.append(f'genai_span_seconds{{{labels},quantile="0.95"}} {s["p95"]:.6f}')
+            lines.append(f'genai_span_seconds_count{{{labels}}} {s["count"]}')
+            lines.append(f'genai_span_seconds_sum{{{labels}}} {s["mean"] * s["count"]:.6f}')
+        lines.append("# TYPE genai_counter_total counter")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'genai_counter_total{{app="{app}",name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+def get_tracer() -> Tracer:
+    """
+    Returns the process-wide tracer, creating it with sinks from the environment.
+    """
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            sinks = []
+            if os.getenv("GENAI_TRACE_JSONL"):
+                sinks.append(JsonlSink(os.getenv("GENAI_TRACE_JSONL")))
+            if os.getenv("GENAI_TRACE_PROM"):
+                sinks.append(PrometheusFileSink(os.getenv("GENAI_TRACE_PROM")))
+            _tracer = Tracer(sinks=sinks)
+        return _tracer
+
+def init_tracing(app: str) -> Tracer:
+    """
+    Names the app that this process's spans belong to.
+    """
+    tracer = get_tracer()
+    tracer.app = app
+    return tracer
+
+# --- Streamlit ---
+
+def render_streamlit_panel(st, tracer: Tracer = None):
+    """
+    Shows p50/p95 latency per span and token usage in the sidebar.
+    Only rendered when GENAI_SHOW_METRICS=1.
+    """
+    if os.getenv("GENAI_SHOW_METRICS") != "1":
+        return
+    snapshot = (tracer or get_tracer()).snapshot()
+    with st.sidebar.expander(f"Performance ({snapshot['app']})"):
+        if not snapshot["spans"]:
+            st.caption("No requests yet.")
+            return
+        st.table([
+            {
+                "span": name,
+                "count": s["count"],
+                "p50 (ms)": round(s["p50"] * 1000, 1),
+                "p95 (ms)": round(s["p95"] * 1000, 1)
+            }
+            for name, s in sorted(snapshot["spans"].items())
+        ])
+        tokens = {name: value for name, value in snapshot["counters"].items() if name.startswith("tokens.")}
+        if tokens:
+            st.caption(" · ".join(f"{name[len('tokens.'):]}: {int(value)} tokens" for name, value in sorted(tokens.items())))
+        limits = {name: value for name, value in snapshot["counters"].items() if name.startswith("ratelimit.")}
+        if limits:
+            st.caption(" · ".join(f"{name[len('ratelimit.'):]}: {int(value)}" for name, value in sorted(limits.items())))
+        coalesced = snapshot["counters"].get("singleflight.coalesced", 0)
+        if coalesced:
+            total = coalesced + snapshot["counters"].get("singleflight.leaders", 0)
+            st.caption(f"Coalesced {int(coalesced)} of {int(total)} uncached requests ({coalesced / total:.0%})")
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import common.ratelimit as ratelimit
+
+
+@pytest.fixture(autouse=True)
+def unthrottled_scheduler(monkeypatch):
+    """Each test gets its own scheduler, so model calls in one never wait on another's budget."""
+    scheduler = ratelimit.ModelScheduler(requests_per_minute=1_000_000, tokens_per_minute=1e12)
+    monkeypatch.setattr(ratelimit, "_scheduler", scheduler)
+    return scheduler
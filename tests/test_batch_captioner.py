@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Gen-AI", "image-caption-generator")))
+import common.cache
+import batch_captioner
+
+
+class CountingModel:
+    model_name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, contents, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(text=f"caption #{self.calls}", usage_metadata=None)
+
+
+@pytest.fixture
+def images(tmp_path, monkeypatch):
+    from PIL import Image
+
+    monkeypatch.setattr(common.cache, "_default_cache", common.cache.ResponseCache(path=":memory:", max_entries=0))
+    folder = tmp_path / "images"
+    (folder / "nested").mkdir(parents=True)
+    for name, color in (("a.png", "red"), ("b.png", "green"), ("nested/c.jpg", "blue")):
+        Image.new("RGB", (64, 48), color).save(folder / name)
+    (folder / "broken.png").write_bytes(b"not an image")
+    return folder
+
+def read_records(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_rerun_skips_captioned_images_and_retries_failures(images, tmp_path):
+    output = str(tmp_path / "captions.jsonl")
+    model = CountingModel()
+    first = batch_captioner.caption_directory(str(images), output, model=model, workers=2)
+    assert (first["captioned"], first["failed"], first["skipped"]) == (3, 1, 0)
+
+    second = batch_captioner.caption_directory(str(images), output, model=model, workers=2)
+    assert (second["captioned"], second["failed"], second["skipped"]) == (0, 1, 3)
+    assert model.calls == 3
+    # Only the broken image was attempted again
+    assert [record["path"] for record in read_records(output) if "error" in record] == [
+        str(images / "broken.png")
+    ] * 2
+
+def test_resume_is_per_style_and_ignores_a_torn_last_line(images, tmp_path):
+    output = tmp_path / "captions.jsonl"
+    batch_captioner.caption_directory(str(images), str(output), model=CountingModel())
+    with open(output, "a", encoding="utf-8") as f:
+        f.write('{"path": "half-writ')
+    assert len(batch_captioner.load_completed(str(output), "descriptive")) == 3
+    assert batch_captioner.load_completed(str(output), "fun") == set()
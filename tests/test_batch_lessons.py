@@ -0,0 +1,75 @@
+import os
+import sys
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Gen-AI", "lesson-plan-generator")))
+import common.cache
+import batch_lessons
+
+
+class PlanModel:
+    model_name = "plans"
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.prompts = []
+
+    def generate_content(self, contents, **kwargs):
+        self.prompts.append(contents)
+        if self.fail_on and self.fail_on in contents:
+            raise ValueError(f"400 cannot plan {self.fail_on}")
+        return SimpleNamespace(text=f"# Plan {len(self.prompts)}", usage_metadata=None)
+
+
+@pytest.fixture(autouse=True)
+def no_response_cache(monkeypatch):
+    monkeypatch.setattr(common.cache, "_default_cache", common.cache.ResponseCache(path=":memory:", max_entries=0))
+
+@pytest.fixture
+def csv_rows(tmp_path):
+    path = tmp_path / "curriculum.csv"
+    path.write_text(
+        "topic,grade_level,duration,learning_style,notes\n"
+        "Fractions,4th Grade,45 minutes,Visual,\n"
+        "  fractions ,4th  grade,45 Minutes,visual,\n"
+        "Volcanoes,6th Grade,60 minutes,,\n"
+        "Photosynthesis,7th Grade,50 minutes,Hands-on,\n"
+        ",5th Grade,30 minutes,,missing topic\n",
+        encoding="utf-8"
+    )
+    return batch_lessons.read_rows(str(path))
+
+
+def test_identical_rows_share_one_plan(csv_rows, tmp_path):
+    assert len(csv_rows) == 4 # the row without a topic is dropped
+    assert csv_rows[2]["learning_style"] == "Standard"
+    model = PlanModel()
+    stats = batch_lessons.generate_curriculum(csv_rows, str(tmp_path / "plans.zip"), model=model)
+    assert (stats["unique"], stats["generated"], stats["failed"]) == (3, 3, 0)
+    assert len(model.prompts) == 3
+    with zipfile.ZipFile(tmp_path / "plans.zip") as bundle:
+        index = bundle.read("index.csv").decode("utf-8").splitlines()
+    # Both spellings of the fractions row point at the same file
+    assert index[1].split(",")[-2] == index[2].split(",")[-2] == "001_fractions_4th_grade.md"
+
+def test_rerun_resumes_from_checkpoint(csv_rows, tmp_path):
+    output = str(tmp_path / "plans.zip")
+    first = batch_lessons.generate_curriculum(csv_rows, output, model=PlanModel(fail_on="Volcanoes"))
+    assert (first["generated"], first["failed"]) == (2, 1)
+
+    model = PlanModel()
+    second = batch_lessons.generate_curriculum(csv_rows, output, model=model)
+    assert (second["resumed"], second["generated"], second["failed"]) == (2, 1, 0)
+    assert len(model.prompts) == 1 and "Volcanoes" in model.prompts[0]
+    with zipfile.ZipFile(output) as bundle:
+        plans = sorted(name for name in bundle.namelist() if name.endswith(".md") and name != "index.md")
+    assert plans == ["001_fractions_4th_grade.md", "002_volcanoes_6th_grade.md", "003_photosynthesis_7th_grade.md"]
+
+def test_torn_checkpoint_line_is_ignored(tmp_path):
+    path = tmp_path / "plans.zip.checkpoint.jsonl"
+    path.write_text('{"key": "abc", "file": "001_x.md", "markdown": "# X"}\n{"key": "de', encoding="utf-8")
+    assert list(batch_lessons.load_checkpoint(str(path))) == ["abc"]
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Clarifai")))
+from batch_predict import BatchPredictor, FakeModel, is_fatal_error
+
+
+class FailingModel(FakeModel):
+    def __init__(self, message):
+        super().__init__(latency=0, per_input_latency=0)
+        self.message = message
+
+    def predict(self, inputs, inference_params=None):
+        self.calls += 1
+        raise RuntimeError(self.message)
+
+
+def test_bad_input_is_isolated_by_splitting():
+    model = FakeModel(latency=0, per_input_latency=0)
+    prompts = ["FAIL" if i == 300 else f"prompt {i}" for i in range(500)]
+    results = BatchPredictor(model, batch_size=128).predict(prompts)
+    assert [result["id"] for result in results] == list(range(500))
+    assert [result["id"] for result in results if "error" in result] == [300]
+
+def test_auth_error_stops_the_run_without_splitting():
+    model = FailingModel("Model Predict failed: CONN_KEY_INVALID, API key not found (401)")
+    with pytest.raises(RuntimeError, match="401"):
+        BatchPredictor(model, batch_size=128, in_flight=1, max_retries=0).predict(["prompt"] * 1000)
+    assert model.calls == 1
+
+@pytest.mark.parametrize("message, fatal", [
+    ("Model does not exist", True),
+    ("Resource not found: model 'gpt-x' not found in app", True),
+    ("input not found", False),
+    ("Model Predict failed: input not found", False),
+    ("Invalid input: referenced URL returned 404", False),
+])
+def test_only_model_level_not_found_is_fatal(message, fatal):
+    assert is_fatal_error(RuntimeError(message)) is fatal
+
+def test_status_code_decides_before_the_message():
+    class StatusError(Exception):
+        def __init__(self, code, message):
+            super().__init__(message)
+            self.code = code
+
+    assert is_fatal_error(StatusError(401, "please try again"))
+    assert not is_fatal_error(StatusError(404, "input 17 not found"))
+    assert is_fatal_error(StatusError(404, "model not found"))
+
+def test_other_errors_fail_the_batch_without_splitting():
+    model = FailingModel("Model is still loading, try again later")
+    results = BatchPredictor(model, batch_size=128, in_flight=1, max_retries=0).predict(["prompt"] * 256)
+    assert all("error" in result for result in results)
+    assert model.calls == 2
@@ -0,0 +1,57 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import common.cache as cache
+from common.cache import ResponseCache, SQLiteTier
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(time=1000.0)
+    monkeypatch.setattr(cache.time, "time", lambda: now.time)
+    return now
+
+
+def test_entries_expire_after_ttl_in_both_tiers(clock, tmp_path):
+    responses = ResponseCache(path=str(tmp_path / "responses.sqlite3"), ttl=60)
+    responses.set("k", "v")
+    clock.time += 30
+    assert responses.get("k") == "v"
+    clock.time += 31
+    assert responses.get("k") is None
+    # Expired rows are deleted, not just hidden
+    assert responses.disk._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 0
+
+def test_disk_tier_evicts_least_recently_used_past_its_size(clock, tmp_path):
+    disk = SQLiteTier(str(tmp_path / "responses.sqlite3"), max_bytes=250)
+    for key in ("a", "b"):
+        disk.set(key, "x" * 100)
+        clock.time += 1
+    disk.get("a") # "b" is now the least recently used
+    clock.time += 1
+    assert disk.set("c", "x" * 100) == 1
+    assert disk.get("b") is None
+    assert disk.get("a") is not None and disk.get("c") is not None
+
+def test_stats_count_memory_and_disk_hits(tmp_path):
+    path = str(tmp_path / "responses.sqlite3")
+    ResponseCache(path=path).set("k", "v")
+    # A new process starts with an empty memory tier but the same file
+    responses = ResponseCache(path=path)
+    assert responses.get("k") == "v"
+    assert responses.get("k") == "v"
+    assert responses.get("missing") is None
+    stats = responses.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+def test_memory_tier_evictions_are_counted():
+    responses = ResponseCache(path=":memory:", max_entries=2)
+    for key in ("a", "b", "c"):
+        responses.set(key, key)
+    assert responses.get("a") is None
+    assert responses.stats()["evictions"] == 1
@@ -0,0 +1,38 @@
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Gen-AI", "character-chatbot")))
+from conversation_memory import ConversationMemory
+
+
+class ReplyModel:
+    def generate_content(self, contents, stream=False):
+        chunks = [SimpleNamespace(text="reply", usage_metadata=None)]
+        return iter(chunks) if stream else chunks[0]
+
+
+class BlockingSummarizer:
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        self.release.wait(5)
+        return SimpleNamespace(text="summary", usage_metadata=None)
+
+
+def test_stream_ends_before_the_summarizer_runs():
+    summarizer = BlockingSummarizer()
+    memory = ConversationMemory(ReplyModel(), summary_model=summarizer, token_budget=100_000, keep_last_turns=1)
+    memory.send_message("first")
+    # The second turn fills the window; its reply must not wait for the summary
+    assert [chunk.text for chunk in memory.send_message("second", stream=True)] == ["reply"]
+    assert memory.state() == ("", 2)
+
+    summarizer.release.set()
+    memory.wait_for_compaction()
+    assert summarizer.calls == 1
+    assert memory.state() == ("summary", 1)
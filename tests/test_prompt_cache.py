@@ -0,0 +1,108 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import common.prompt_cache as prompt_cache
+
+
+class FakeModel:
+    prefix_tokens = 5000
+
+    def __init__(self, name, cached_tokens=0):
+        self.model_name = name
+        self.cached_tokens = cached_tokens
+
+    def count_tokens(self, contents):
+        return SimpleNamespace(total_tokens=self.prefix_tokens)
+
+    def generate_content(self, contents, stream=False):
+        usage = SimpleNamespace(prompt_token_count=1000, cached_content_token_count=self.cached_tokens)
+        if stream:
+            return iter([SimpleNamespace(text="a", usage_metadata=None),
+                         SimpleNamespace(text="b", usage_metadata=usage)])
+        return SimpleNamespace(text="ab", usage_metadata=usage)
+
+
+class FakeCachedContent:
+    created = []
+
+    def __init__(self):
+        self.expired = False
+
+    @classmethod
+    def create(cls, **kwargs):
+        handle = cls()
+        cls.created.append(handle)
+        return handle
+
+    def update(self, ttl):
+        if self.expired:
+            raise RuntimeError("404 CachedContent not found (or permission denied)")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(time=1000.0)
+    monkeypatch.setattr(prompt_cache.time, "time", lambda: now.time)
+    FakeCachedContent.created = []
+    fake_sdk = SimpleNamespace(
+        caching=SimpleNamespace(CachedContent=FakeCachedContent),
+        GenerativeModel=SimpleNamespace(from_cached_content=lambda cached_content: FakeModel("cached", 900))
+    )
+    monkeypatch.setattr(prompt_cache, "sdk", lambda: fake_sdk)
+    monkeypatch.setattr(prompt_cache, "get_model", lambda name, instruction: FakeModel(name))
+    return now
+
+def resolve(model):
+    """`_resolve`, then wait for the background upload it started."""
+    model._resolve()
+    if model._updater is not None:
+        model._updater.join()
+    return model._resolve()
+
+
+def test_cache_is_recreated_after_idle_expiry(clock):
+    model = prompt_cache.PrefixCachedModel("m", "persona", ttl=3600)
+    assert resolve(model).model_name == "cached"
+    FakeCachedContent.created[0].expired = True
+    clock.time += 5 * 3600 # idle longer than the TTL
+    assert resolve(model).model_name == "cached"
+    assert len(FakeCachedContent.created) == 2
+    assert model.stats()["fallbacks"] == 0
+
+def test_refresh_of_a_dropped_cache_recreates_it(clock):
+    model = prompt_cache.PrefixCachedModel("m", "persona", ttl=3600)
+    resolve(model)
+    FakeCachedContent.created[0].expired = True
+    clock.time += 3600 - 60 # inside the refresh margin
+    assert resolve(model).model_name == "cached"
+    assert len(FakeCachedContent.created) == 2
+
+def test_first_request_does_not_wait_for_the_upload(clock):
+    model = prompt_cache.PrefixCachedModel("m", "persona", ttl=3600)
+    assert model._resolve() is model.plain
+    model._updater.join()
+    assert model._resolve().model_name == "cached"
+
+def test_short_prefix_is_never_uploaded(clock, monkeypatch):
+    monkeypatch.setattr(FakeModel, "prefix_tokens", 60)
+    model = prompt_cache.PrefixCachedModel("m", "persona", ttl=3600)
+    assert resolve(model) is model.plain
+    clock.time += 10 * 3600
+    assert model._resolve() is model.plain
+    assert model._updater is None or not model._updater.is_alive()
+    assert FakeCachedContent.created == []
+    assert model.stats()["prefix_tokens"] == 60
+
+def test_streamed_requests_are_recorded(clock):
+    model = prompt_cache.PrefixCachedModel("m", "persona", ttl=3600)
+    resolve(model)
+    chunks = model.generate_content("hi", stream=True)
+    assert model.stats()["requests"] == 0
+    assert "".join(chunk.text for chunk in chunks) == "ab"
+    stats = model.stats()
+    assert stats["requests"] == 1 and stats["cached_requests"] == 1
+    assert stats["last_request"]["cached_tokens"] == 900
@@ -0,0 +1,114 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.ratelimit import (
+    CircuitBreaker, CircuitOpenError, FakeClock, ModelScheduler, backoff_delay, is_rate_limit_error,
+    is_retryable_error
+)
+
+
+def make_scheduler(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30, clock=clock)
+    return ModelScheduler(requests_per_minute=1_000_000, max_retries=0, breaker=breaker, clock=clock)
+
+def fail(error):
+    def call():
+        raise error
+    return call
+
+
+def test_breaker_opens_after_repeated_server_errors():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    for _ in range(5):
+        with pytest.raises(RuntimeError):
+            scheduler.call(fail(RuntimeError("503 Service Unavailable")))
+    assert scheduler.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        scheduler.call(lambda: "ok")
+
+def test_half_open_trial_rejected_as_bad_request_closes_breaker():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    for _ in range(10):
+        with pytest.raises((RuntimeError, CircuitOpenError)):
+            scheduler.call(fail(RuntimeError("503 Service Unavailable")))
+    clock.sleep(1000)
+    with pytest.raises(ValueError):
+        scheduler.call(fail(ValueError("400 Request payload size exceeds the limit")))
+    # The service answered the trial, so calls go through again
+    assert scheduler.breaker.state == "closed"
+    assert scheduler.call(lambda: "ok") == "ok"
+
+def test_failed_half_open_trial_reopens_breaker():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    for _ in range(5):
+        with pytest.raises(RuntimeError):
+            scheduler.call(fail(RuntimeError("503 Service Unavailable")))
+    clock.sleep(31)
+    with pytest.raises(RuntimeError):
+        scheduler.call(fail(RuntimeError("503 Service Unavailable")))
+    assert scheduler.breaker.state == "open"
+    clock.sleep(31)
+    assert scheduler.call(lambda: "ok") == "ok"
+    assert scheduler.breaker.state == "closed"
+
+def test_retries_use_the_clock_and_succeed():
+    clock = FakeClock()
+    scheduler = ModelScheduler(requests_per_minute=1_000_000, max_retries=3, base_delay=1, clock=clock)
+    attempts = []
+
+    def flaky():
+        attempts.append(clock.now())
+        if len(attempts) < 3:
+            raise RuntimeError("503 Service Unavailable")
+        return "ok"
+
+    assert scheduler.call(flaky) == "ok"
+    assert len(attempts) == 3
+    assert scheduler.stats()["retries"] == 2
+    assert scheduler.breaker.state == "closed"
+
+def test_set_rate_changes_the_request_budget():
+    clock = FakeClock()
+    scheduler = ModelScheduler(requests_per_minute=60, clock=clock)
+    scheduler.set_rate(requests_per_minute=120)
+    waits = [scheduler.acquire() for _ in range(10)]
+    # Six calls use the initial burst; the other four wait half a second each (a second at the old rate)
+    assert waits[:6] == [0.0] * 6
+    assert waits[6:] == [0.5] * 4
+
+def test_backoff_delay_prefers_retry_hint_and_caps():
+    hinted = RuntimeError("429 Too Many Requests, retry after 7s")
+    assert backoff_delay(0, hinted, base_delay=1, max_delay=60) == 7
+    assert backoff_delay(0, hinted, base_delay=1, max_delay=5) == 5
+    plain = RuntimeError("503 Service Unavailable")
+    assert 4 <= backoff_delay(3, plain, base_delay=1, max_delay=60) <= 8
+    assert backoff_delay(10, plain, base_delay=1, max_delay=60) <= 60
+
+
+class StatusError(Exception):
+    def __init__(self, code, message=""):
+        super().__init__(message)
+        self.code = code
+
+@pytest.mark.parametrize("error, retryable", [
+    (ValueError("400 limit is 5000 bytes"), False),
+    (ValueError("invalid argument: timeout must be at most 600"), False),
+    (RuntimeError("503 Service Unavailable"), True),
+    (RuntimeError("Connection reset by peer"), True),
+    (TimeoutError(), True),
+    (StatusError(400, "upstream returned 503"), False),
+    (StatusError(503), True),
+    (StatusError(429), True),
+])
+def test_is_retryable_error(error, retryable):
+    assert is_retryable_error(error) is retryable
+
+def test_rate_limit_needs_a_whole_status_code():
+    assert is_rate_limit_error(RuntimeError("429 Too Many Requests"))
+    assert not is_rate_limit_error(ValueError("400 field 14290 is invalid"))
@@ -0,0 +1,41 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.core import map_bounded, run_sync
+
+
+def test_map_bounded_reads_items_lazily_and_caps_concurrency():
+    pulled = []
+    running = {"now": 0, "max": 0}
+
+    def items():
+        for i in range(20):
+            pulled.append(i)
+            yield i
+
+    async def work(i):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0)
+        running["now"] -= 1
+        if i == 7:
+            raise ValueError("bad item")
+        return i * 2
+
+    async def collect():
+        results = []
+        async for item, result, error in map_bounded(work, items(), 3):
+            # Never more than the limit pulled ahead of what has been yielded
+            assert len(pulled) - len(results) <= 3
+            results.append((item, result, error))
+        return results
+
+    results = run_sync(collect())
+    assert running["max"] == 3
+    assert sorted(item for item, _, _ in results) == list(range(20))
+    assert {item: result for item, result, error in results if error is None} == {
+        i: i * 2 for i in range(20) if i != 7
+    }
+    assert [item for item, _, error in results if error is not None] == [7]
@@ -0,0 +1,64 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import common.cache
+import common.semantic_cache
+from common.core import memes, run_sync
+from common.semantic_cache import SemanticCache
+
+
+class CountingModel:
+    model_name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, contents, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(text=f"caption #{self.calls}", usage_metadata=None)
+
+
+def test_rewording_hits_and_unrelated_topic_misses():
+    cache = SemanticCache("test", path=":memory:")
+    cache.add("quantum computing", "report")
+    assert cache.lookup("Quantum Computing trends").value == "report"
+    assert cache.lookup("history of jazz") is None
+
+def test_adding_the_same_text_replaces_its_answer():
+    cache = SemanticCache("test", path=":memory:")
+    cache.add("quantum computing", "old")
+    cache.add("quantum computing", "new")
+    assert cache.lookup("quantum computing").value == "new"
+    assert cache._conn.execute("SELECT COUNT(*) FROM semantic_entries").fetchone()[0] == 1
+
+def test_add_after_clear():
+    cache = SemanticCache("test", path=":memory:")
+    cache.add("quantum computing", "old")
+    cache.add("history of jazz", "jazz")
+    cache.clear()
+    cache.add("quantum computing", "new")
+    assert cache.lookup("quantum computing").value == "new"
+    assert cache.stats()["entries"] == 1
+
+def test_expired_best_match_does_not_hide_a_fresh_one(monkeypatch):
+    now = SimpleNamespace(time=1000.0)
+    monkeypatch.setattr(common.semantic_cache.time, "time", lambda: now.time)
+    cache = SemanticCache("test", path=":memory:", ttl=3600)
+    cache.add("quantum computing", "stale")
+    now.time += 3000
+    cache.add("quantum computing trends", "fresh")
+    now.time += 1000 # the first entry is now past its TTL
+    hit = cache.lookup("quantum computing")
+    assert hit is not None and hit.value == "fresh"
+
+def test_fresh_meme_caption_reaches_the_model(monkeypatch):
+    semantic = SemanticCache("meme", path=":memory:")
+    monkeypatch.setattr(common.semantic_cache, "get_semantic_cache", lambda namespace, **kwargs: semantic)
+    monkeypatch.setattr(common.cache, "_default_cache", common.cache.ResponseCache(path=":memory:"))
+    model = CountingModel()
+    captions = [run_sync(memes.meme_caption("cats at work", model=model, fresh=fresh))
+                for fresh in (False, True, True, False)]
+    assert captions == ["caption #1", "caption #2", "caption #3", "caption #3"]
+    assert model.calls == 3
@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Gen-AI", "character-chatbot")))
+from session_store import SessionStore
+
+
+def chat(store, conversation_id, turns):
+    for i in range(turns):
+        store.append_message(conversation_id, "user", f"question {i}")
+        store.append_message(conversation_id, "assistant", f"answer {i}")
+
+
+def test_messages_page_backwards_from_the_newest(tmp_path):
+    store = SessionStore(str(tmp_path / "chat.sqlite3"))
+    conversation_id = store.get_or_create_conversation("user-1", "Einstein")
+    chat(store, conversation_id, 30)
+    newest = store.load_messages(conversation_id, limit=50)
+    assert [m["content"] for m in newest[:2]] == ["question 5", "answer 5"]
+    assert newest[-1]["content"] == "answer 29"
+    older = store.load_messages(conversation_id, before_id=newest[0]["id"], limit=50)
+    assert [m["content"] for m in older] == [f"{kind} {i}" for i in range(5) for kind in ("question", "answer")]
+    assert store.count_messages(conversation_id, before_id=newest[0]["id"]) == 10
+
+def test_memory_state_reloads_only_the_verbatim_window(tmp_path):
+    path = str(tmp_path / "chat.sqlite3")
+    store = SessionStore(path)
+    conversation_id = store.get_or_create_conversation("user-1", "Einstein")
+    store.append_message(conversation_id, "assistant", "Greetings!")
+    chat(store, conversation_id, 10)
+    store.append_message(conversation_id, "user", "unanswered") # the reply failed
+    store.save_memory_state(conversation_id, "They talked about physics.", 3)
+
+    # A restart reopens the same file
+    reopened = SessionStore(path)
+    assert reopened.get_or_create_conversation("user-1", "Einstein") == conversation_id
+    summary, turns = reopened.load_memory_state(conversation_id)
+    assert summary == "They talked about physics."
+    assert turns == [(f"question {i}", f"answer {i}") for i in (7, 8, 9)]
+
+def test_memory_state_of_a_new_conversation_is_empty(tmp_path):
+    store = SessionStore(str(tmp_path / "chat.sqlite3"))
+    conversation_id = store.get_or_create_conversation("user-1", "Cleopatra")
+    chat(store, conversation_id, 2)
+    assert store.load_memory_state(conversation_id) == ("", [])
+    assert store.load_memory_state(conversation_id + 1) == ("", [])
@@ -0,0 +1,90 @@
+import os
+import sys
+import json
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Gen-AI", "meme-generator")))
+import template_store
+from template_store import ImageStore, LocalFetcher, TemplateCatalog
+
+
+class RecordingFetcher(LocalFetcher):
+    """LocalFetcher that remembers the status of every response."""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.statuses = []
+
+    def fetch(self, url, headers=None):
+        result = super().fetch(url, headers)
+        self.statuses.append(result.status)
+        return result
+
+
+class DownFetcher:
+    def fetch(self, url, headers=None):
+        raise ConnectionError("imgflip unreachable")
+
+
+def write_catalog(root, names):
+    memes = [{"id": str(i), "name": name, "url": f"https://i.imgflip.com/{i}.jpg"} for i, name in enumerate(names)]
+    with open(os.path.join(root, "catalog.json"), "w", encoding="utf-8") as f:
+        json.dump({"success": True, "data": {"memes": memes}}, f)
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(time=1000.0)
+    monkeypatch.setattr(template_store.time, "time", lambda: now.time)
+    return now
+
+
+def test_catalog_revalidates_with_etag_after_ttl(clock, tmp_path):
+    write_catalog(tmp_path, ["Drake", "Distracted Boyfriend"])
+    fetcher = RecordingFetcher(str(tmp_path))
+    catalog = TemplateCatalog(cache_dir=str(tmp_path / "cache"), fetcher=fetcher, ttl=60)
+    assert [t["name"] for t in catalog.get_templates()] == ["Drake", "Distracted Boyfriend"]
+
+    clock.time += 30
+    catalog.get_templates()
+    assert fetcher.statuses == [200] # fresh copy: no request at all
+
+    clock.time += 60
+    assert len(catalog.get_templates()) == 2
+    assert fetcher.statuses == [200, 304]
+    clock.time += 30
+    catalog.get_templates()
+    assert fetcher.statuses == [200, 304] # the 304 restarted the TTL
+
+def test_changed_catalog_is_downloaded_again(clock, tmp_path):
+    write_catalog(tmp_path, ["Drake"])
+    fetcher = RecordingFetcher(str(tmp_path))
+    catalog = TemplateCatalog(cache_dir=str(tmp_path / "cache"), fetcher=fetcher, ttl=60)
+    catalog.get_templates()
+    write_catalog(tmp_path, ["Drake", "Two Buttons"])
+    clock.time += 61
+    assert [t["name"] for t in catalog.get_templates()] == ["Drake", "Two Buttons"]
+    assert fetcher.statuses == [200, 200]
+
+def test_stale_catalog_is_served_when_imgflip_is_down(clock, tmp_path):
+    write_catalog(tmp_path, ["Drake"])
+    catalog = TemplateCatalog(cache_dir=str(tmp_path / "cache"), fetcher=LocalFetcher(str(tmp_path)), ttl=60)
+    catalog.get_templates()
+    clock.time += 61
+    catalog.fetcher = DownFetcher()
+    assert [t["name"] for t in catalog.get_templates()] == ["Drake"]
+
+def test_image_store_downloads_each_template_once(tmp_path):
+    (tmp_path / "0.jpg").write_bytes(b"same bytes")
+    (tmp_path / "copy.jpg").write_bytes(b"same bytes")
+    fetcher = LocalFetcher(str(tmp_path))
+    store = ImageStore(cache_dir=str(tmp_path / "cache"), fetcher=fetcher)
+    path = store.get_path("https://i.imgflip.com/0.jpg")
+    assert store.get_path("https://i.imgflip.com/0.jpg") == path
+    assert fetcher.requests == 1
+    # Identical bytes under another URL share one file
+    assert store.get_path("https://i.imgflip.com/copy.jpg") == path
+    # The URL index survives a restart
+    assert ImageStore(cache_dir=str(tmp_path / "cache"), fetcher=fetcher).get_path("https://i.imgflip.com/0.jpg") == path
+    assert fetcher.requests == 2